@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from content_extractor.budget import ContentBudget, estimate_tokens
+from content_extractor.cache import DiskCache, LRUCache
+from .prompt_packer import PromptPacker
+
+# 分块摘要提示词版本，提示词变化时递增以使旧的缓存摘要失效
+SUMMARY_PROMPT_VERSION = 1
+
+DEFAULT_CHUNK_TOKENS = int(os.getenv('LONG_DOCUMENT_CHUNK_TOKENS', '6000'))
+DEFAULT_SUMMARY_WORKERS = int(os.getenv('LONG_DOCUMENT_WORKERS', '4'))
+DEFAULT_SUMMARY_MAX_TOKENS = int(os.getenv('LONG_DOCUMENT_SUMMARY_TOKENS', '800'))
+
+_SUMMARY_PROMPTS = {
+    'zh': (
+        "你是一个资料整理助手。下面是一份长文档中的一部分，请提炼这一部分的核心观点、关键事实、数据和有代表性的例子，"
+        "按原文顺序写成一段连贯的摘要，控制在500字以内。只输出摘要本身，不要添加任何说明。"
+    ),
+    'en': (
+        "You are a research assistant. Below is one part of a long document. Extract the core ideas, key facts, "
+        "figures and representative examples of this part and write them as one coherent summary in the original "
+        "order, under 300 words. Output only the summary, without any explanation."
+    ),
+}
+
+# 一个文档分块：涉及的章节标题和渲染后的正文
+Chunk = Tuple[List[str], str]
+
+# 一句话：到句末标点（含后面的引号括号）、英文句号后的空白或换行为止
+_SENTENCE_PATTERN = re.compile(r'.+?(?:[。！？!?；;…]+[”’"」』）)]*|\.(?=\s)|\n|$)\s*', re.S)
+
+
+def split_block(text: str, max_tokens: int) -> List[str]:
+    """
+    将超出分块大小的内容块按句子边界拆成多段，每段不超过 max_tokens，
+    单句仍然超长时按token数硬切，拆分后的各段按顺序拼接即为原文（不计首尾空白）
+
+    Args:
+        text: 内容块文本
+        max_tokens: 每段的最大估算token数
+
+    Returns:
+        List[str]: 按顺序排列的各段
+    """
+    max_tokens = max(max_tokens, 1)
+    pieces, current = [], ""
+    for sentence in _SENTENCE_PATTERN.findall(text):
+        if estimate_tokens(current + sentence) <= max_tokens:
+            current += sentence
+            continue
+        if current:
+            pieces.append(current)
+            current = ""
+        while estimate_tokens(sentence) > max_tokens:
+            head = ContentBudget(max_tokens=max_tokens).consume(sentence) or sentence[0]
+            pieces.append(head)
+            sentence = sentence[len(head):]
+        current = sentence
+    if current:
+        pieces.append(current)
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+class ChunkSummarizer:
+    """
+    长文档的分块摘要（map阶段）
+
+    按章节将提取结果切分为不超过指定token数的分块，用有界线程池并发调用LLM生成摘要；
+    摘要按分块内容缓存，只更换播客模式或角色设置重新生成时不会重复摘要。
+    """
+
+    def __init__(self,
+                 call_llm: Callable[..., str],
+                 model: str = "",
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 max_workers: int = DEFAULT_SUMMARY_WORKERS,
+                 summary_max_tokens: int = DEFAULT_SUMMARY_MAX_TOKENS,
+                 cache_dir: Optional[str] = None,
+                 max_memory_entries: int = 1024):
+        """
+        Args:
+            call_llm: 调用LLM的函数，参数为 (system_prompt, user_prompt, max_tokens)
+            model: 模型标识，参与缓存键计算
+            chunk_tokens: 每个分块的最大估算token数
+            max_workers: 并发摘要的最大线程数
+            summary_max_tokens: 单个摘要的最大输出token数
+            cache_dir: 摘要磁盘缓存目录，None表示只使用内存缓存
+            max_memory_entries: 内存缓存的最大条目数
+        """
+        self.call_llm = call_llm
+        self.model = model
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max(1, max_workers)
+        self.summary_max_tokens = summary_max_tokens
+        self.memory = LRUCache(max_memory_entries)
+        self.disk = DiskCache(cache_dir) if cache_dir else None
+        self._packer = PromptPacker()
+
+    def split(self, content: Dict) -> List[Chunk]:
+        """
+        按章节将提取结果切分为分块，单个章节超出分块大小时按内容块继续切分，
+        单个内容块超出分块大小时按句子拆到连续的多个分块中，不丢弃任何内容
+
+        Args:
+            content: 内容提取器的输出
+
+        Returns:
+            List[Chunk]: 按原文顺序排列的分块
+        """
+        chunks = []
+        titles, parts, used = [], [], 0
+
+        def flush():
+            nonlocal titles, parts, used
+            if parts:
+                chunks.append((titles, "\n".join(parts)))
+            titles, parts, used = [], [], 0
+
+        for title, blocks in self._packer.group_sections(content.get('content', [])):
+            heading = f"### {title}" if title else ""
+            heading_tokens = estimate_tokens(heading + "\n")
+            # 拆分后的每段连同章节标题必须能放进一个新分块
+            piece_limit = self.chunk_tokens - heading_tokens - 1
+            for text, tokens, _ in blocks:
+                pieces = [(text, tokens)]
+                if tokens > self.chunk_tokens - heading_tokens:
+                    pieces = [(piece, estimate_tokens(piece + "\n")) for piece in split_block(text, piece_limit)]
+                for piece, piece_tokens in pieces:
+                    if used and used + piece_tokens > self.chunk_tokens:
+                        flush()
+                    if not parts or (title and title not in titles):
+                        if heading:
+                            parts.append(heading)
+                            used += heading_tokens
+                        if title and title not in titles:
+                            titles.append(title)
+                    parts.append(piece)
+                    used += piece_tokens
+        flush()
+        return chunks
+
+    def summarize(self, content: Dict, language: str = 'zh') -> List[Dict]:
+        """
+        并发摘要所有分块
+
+        Args:
+            content: 内容提取器的输出
+            language: 'zh' 或 'en'
+
+        Returns:
+            List[Dict]: 按原文顺序排列的摘要内容项，可直接作为提取结果的 content 字段
+        """
+        chunks = self.split(content)
+        if not chunks:
+            return []
+        workers = min(self.max_workers, len(chunks))
+        if workers == 1:
+            summaries = [self._summarize_chunk(chunk, language) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                summaries = list(executor.map(lambda chunk: self._summarize_chunk(chunk, language), chunks))
+
+        items = []
+        for (titles, _), summary in zip(chunks, summaries):
+            if titles:
+                section_title = titles[0] if len(titles) == 1 else f"{titles[0]} ~ {titles[-1]}"
+            else:
+                section_title = ""
+            items.append({"section_title": section_title, "text": summary, "content_type": "paragraph"})
+        return items
+
+    def _summarize_chunk(self, chunk: Chunk, language: str) -> str:
+        _, text = chunk
+        key = self._cache_key(text, language)
+        summary = self._get_cached(key)
+        if summary is not None:
+            return summary
+
+        system_prompt = _SUMMARY_PROMPTS['en' if language == 'en' else 'zh']
+        summary = self.call_llm(system_prompt, text, self.summary_max_tokens).strip()
+        self.memory.set(key, summary)
+        if self.disk is not None:
+            self.disk.set(key, summary)
+        return summary
+
+    def _cache_key(self, text: str, language: str) -> str:
+        payload = json.dumps({
+            "version": SUMMARY_PROMPT_VERSION,
+            "model": self.model,
+            "language": language,
+            "max_tokens": self.summary_max_tokens,
+            "text": text
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[str]:
+        summary = self.memory.get(key)
+        if summary is None and self.disk is not None:
+            summary = self.disk.get(key)
+            if summary is not None:
+                self.memory.set(key, summary)
+        return summary
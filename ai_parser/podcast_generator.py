@@ -1,30 +1,16 @@
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
 from dotenv import load_dotenv
-from volcenginesdkarkruntime import Ark
-import requests
-from flask import Flask, jsonify
+from content_extractor.budget import estimate_tokens, item_text
+from .chunk_summarizer import ChunkSummarizer
+from .prompt_packer import PromptPacker
+from .response_cache import LLMResponseCache
 
 load_dotenv()
 
-# 模拟LLM API调用
-# 在实际应用中，您将在这里集成如OpenAI、Google Gemini等的SDK或API调用。
-
-app = Flask(__name__)
-
-@app.route('/api/available_voices', methods=['GET'])
-def get_available_voices():
-    try:
-        # 替换为你的key
-        api_url = "https://platform.minimaxi.com/document/get_voice?key=67ad69b6de78c19cae68b199"
-        resp = requests.get(api_url, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-        # 假设返回格式为 {"success": true, "voices": [...]}
-        voices = data.get("voices", [])
-        return jsonify({"success": True, "voices": voices})
-    except Exception as e:
-        return jsonify({"success": False, "message": f'加载音色失败: {e}'}), 500
+# 原文估算token数超过该值时先分块摘要再生成脚本
+LONG_DOCUMENT_THRESHOLD = int(os.getenv('LONG_DOCUMENT_THRESHOLD', '24000'))
 
 class PodcastGenerator:
     def __init__(self):
@@ -33,16 +19,39 @@ class PodcastGenerator:
         # 添加调试打印
         print(f"DEBUG (PodcastGenerator init): ARK_API_KEY: {'已设置' if self.api_key else '未设置'}")
 
-        # 初始化Ark客户端
-        self.ark_client = Ark(
-            api_key=self.api_key,
-            base_url="https://ark.cn-beijing.volces.com/api/v3"
-        )
+        # Ark客户端在首次调用时创建，避免启动时导入SDK
+        self._ark_client = None
         
         # 自定义推理接入点ID，从控制台获取
         self.model = "ep-20250205180503-zhjq7"
+        self.temperature = 0.7
+
+        # 可选的响应缓存：设置 LLM_CACHE_DIR 后，相同内容和设置的重复生成直接返回缓存结果
+        self.response_cache = LLMResponseCache.from_env()
+
+        # 按脚本长度限制素材token数，避免原文过长时提示词无限增长
+        self.prompt_packer = PromptPacker()
+
+        # 长文档先并发分块摘要，摘要结果缓存后可供不同播客模式、角色设置复用
+        self.long_document_threshold = LONG_DOCUMENT_THRESHOLD
+        self.chunk_summarizer = ChunkSummarizer(
+            lambda system_prompt, user_prompt, max_tokens: self._call_ark_api(system_prompt, user_prompt, max_tokens),
+            model=self.model,
+            cache_dir=os.getenv('SUMMARY_CACHE_DIR') or None
+        )
+
+    @property
+    def ark_client(self):
+        """火山引擎Ark客户端，首次访问时导入SDK并创建"""
+        if self._ark_client is None:
+            from volcenginesdkarkruntime import Ark
+            self._ark_client = Ark(
+                api_key=self.api_key,
+                base_url="https://ark.cn-beijing.volces.com/api/v3"
+            )
+        return self._ark_client
 
-    def _call_ark_api(self, system_prompt: str, user_prompt: str) -> str:
+    def _call_ark_api(self, system_prompt: str, user_prompt: str, max_tokens: int = 2000) -> str:
         """调用火山引擎Ark API"""
         try:
             messages = [
@@ -54,8 +63,8 @@ class PodcastGenerator:
             completion = self.ark_client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=0.7,
-                max_tokens=2000
+                temperature=self.temperature,
+                max_tokens=max_tokens
             )
             
             # 打印调试信息
@@ -69,7 +78,125 @@ class PodcastGenerator:
             print(f"ERROR: Ark API调用失败: {str(e)}")
             raise Exception(f"生成播客脚本失败: {str(e)}")
 
+    def _response_cache_key(self, system_prompt: str, user_prompt: str, max_tokens: int = 2000) -> str:
+        return LLMResponseCache.make_key(self.model, system_prompt, user_prompt,
+                                         {"temperature": self.temperature, "max_tokens": max_tokens})
+
+    def _call_ark_api_cached(self,
+                             system_prompt: str,
+                             user_prompt: str,
+                             max_tokens: int = 2000,
+                             use_cache: bool = True) -> Tuple[str, bool]:
+        """
+        带响应缓存的Ark API调用
+
+        Args:
+            system_prompt: 系统提示词
+            user_prompt: 用户提示词
+            max_tokens: 最大输出token数
+            use_cache: 为False时跳过缓存读取，仍会写入新结果
+
+        Returns:
+            Tuple[str, bool]: 响应文本，以及是否来自缓存
+        """
+        if self.response_cache is None:
+            return self._call_ark_api(system_prompt, user_prompt, max_tokens), False
+
+        key = self._response_cache_key(system_prompt, user_prompt, max_tokens)
+        if use_cache:
+            start = time.perf_counter()
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                print(f"DEBUG: Ark API响应缓存命中，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+                return cached, True
+
+        result = self._call_ark_api(system_prompt, user_prompt, max_tokens)
+        if result:
+            self.response_cache.set(key, result)
+        return result, False
+
+    def _stream_ark_api(self, system_prompt: str, user_prompt: str, max_tokens: int = 2000) -> Iterator[str]:
+        """以流式方式调用火山引擎Ark API，逐段返回生成的文本"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        try:
+            stream = self.ark_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"ERROR: Ark API流式调用失败: {str(e)}")
+            raise Exception(f"生成播客脚本失败: {str(e)}")
+
     def generate_podcast_script(
+        self,
+        content: dict,
+        use_cache: bool = True,
+        return_info: bool = False,
+        **options
+    ) -> Union[str, Tuple[str, Dict[str, Any]]]:
+        """
+        根据模式和角色参数生成结构化播客脚本。
+
+        Args:
+            content: 内容提取器的输出
+            use_cache: 启用响应缓存时，为False可跳过缓存强制重新生成
+            return_info: 为True时额外返回 {"cached": ..., "long_document": ...}
+            **options: 播客模式、角色、脚本长度等设置，见 build_script_prompts
+
+        Returns:
+            生成的脚本文本，return_info=True 时为 (脚本, 信息)
+        """
+        system_prompt, user_prompt, long_document = self.build_script_prompts(content, **options)
+        response_text, cached = self._call_ark_api_cached(system_prompt, user_prompt, use_cache=use_cache)
+        script = response_text.strip()
+
+        if return_info:
+            return script, {"cached": cached, "long_document": long_document}
+        return script
+
+    def stream_podcast_script(self, content: dict, use_cache: bool = True, **options) -> Iterator[Dict[str, Any]]:
+        """
+        流式生成播客脚本，生成过程中逐段返回文本
+
+        Args:
+            content: 内容提取器的输出
+            use_cache: 启用响应缓存时，为False可跳过缓存强制重新生成
+            **options: 同 generate_podcast_script
+
+        Returns:
+            Iterator[Dict]: 依次产出 {"type": "delta", "text": ...} 事件，
+            最后产出 {"type": "done", "script": ..., "cached": ..., "long_document": ...}
+        """
+        system_prompt, user_prompt, long_document = self.build_script_prompts(content, **options)
+
+        key = None
+        if self.response_cache is not None:
+            key = self._response_cache_key(system_prompt, user_prompt)
+            cached = self.response_cache.get(key) if use_cache else None
+            if cached is not None:
+                yield {"type": "delta", "text": cached}
+                yield {"type": "done", "script": cached.strip(), "cached": True, "long_document": long_document}
+                return
+
+        parts = []
+        for text in self._stream_ark_api(system_prompt, user_prompt):
+            parts.append(text)
+            yield {"type": "delta", "text": text}
+        result = "".join(parts)
+        if key is not None and result:
+            self.response_cache.set(key, result)
+        yield {"type": "done", "script": result.strip(), "cached": False, "long_document": long_document}
+
+    def build_script_prompts(
         self,
         content: dict,
         podcast_title: str = None,
@@ -81,15 +208,27 @@ class PodcastGenerator:
         roleA_name: str = None, roleA_style: str = None, roleA_duty: str = None,
         roleB_name: str = None, roleB_style: str = None, roleB_duty: str = None,
         podcast_host: str = None,
-        language: str = 'zh'
-    ) -> str:
+        language: str = 'zh',
+        long_document: Optional[bool] = None
+    ) -> Tuple[str, str, bool]:
         """
-        根据模式和角色参数生成结构化播客脚本。
+        根据模式和角色参数构造生成播客脚本的系统提示词和用户提示词。
+
+        long_document 为 None 时按原文估算token数自动判断是否使用长文档模式：
+        先并发摘要各分块，再根据摘要生成脚本。
+
+        Returns:
+            Tuple[str, str, bool]: 系统提示词、用户提示词、是否使用了长文档模式
         """
         if not content or not content.get('content'):
             raise ValueError("传入的内容为空或无效，无法生成播客脚本。")
-        
-        content_text = self._format_content_for_llm(content, language)
+
+        if long_document is None:
+            long_document = self.is_long_document(content)
+        if long_document:
+            content = self.summarize_long_document(content, language)
+
+        content_text = self._format_content_for_llm(content, language, script_length)
 
         # 根据script_length设置不同的指令
         if language == 'zh':
@@ -151,7 +290,7 @@ Podcast title: {podcast_title or ''}{extra_preview}.
 {intro_rule}
 All output must be in English. Translate any non-English content to English before generating the script.
 Note: The text field should only contain what the character says, no sound effects, background music, or action descriptions."""
-            user_prompt = self._get_user_prompt_en(self._format_content_for_llm(content, language))
+            user_prompt = self._get_user_prompt_en(content_text)
         else:
             if podcast_mode == 'single':
                 role = role1_name or ''
@@ -193,91 +332,33 @@ Note: The text field should only contain what the character says, no sound effec
 播客名称：{podcast_title or ''}{extra_preview}。
 {intro_rule}
 注意：text字段只包含角色说的话，不要包含任何音效描述、背景音、动作提示等内容。"""
-            user_prompt = self._get_user_prompt(self._format_content_for_llm(content, language))
-        
-        # 生成播客脚本
-        response_text = self._call_ark_api(system_prompt, user_prompt)
+            user_prompt = self._get_user_prompt(content_text)
         
-        return response_text.strip()
+        return system_prompt, user_prompt, bool(long_document)
 
-    def _format_content_for_llm(self, content: dict, language: str = 'zh') -> str:
-        """将提取的内容格式化为适合LLM输入的文本。支持中英文结构。"""
-        if language == 'en':
-            title = content.get('title', 'Unknown Title')
-            metadata = content.get('metadata', {})
-            sections = content.get('content', [])
-            key_points = content.get('key_points', [])
-            cautions = content.get('cautions', '')
-
-            formatted_text = f"# Title: {title}\n\n"
-
-            if metadata:
-                formatted_text += "## Metadata:\n"
-                for key, value in metadata.items():
-                    if value:
-                        formatted_text += f"- {key.replace('_', ' ').title()}: {value}\n"
-                formatted_text += "\n"
-
-            if sections:
-                formatted_text += "## Content:\n"
-                for item in sections:
-                    if item.get('section_title'):
-                        formatted_text += f"### {item['section_title']}\n"
-                    if item.get('text'):
-                        formatted_text += f"{item['text']}\n"
-                    if item.get('content_type') == 'list' and isinstance(item.get('items'), list):
-                        for li in item['items']:
-                            formatted_text += f"- {li}\n"
-                    formatted_text += "\n"
-
-            if key_points:
-                formatted_text += "## Key Points:\n"
-                for point in key_points:
-                    formatted_text += f"- {point}\n"
-                formatted_text += "\n"
-
-            if cautions:
-                formatted_text += f"## Cautions:\n{cautions}\n\n"
-
-            return formatted_text
-        else:
-            title = content.get('title', '未知标题')
-            metadata = content.get('metadata', {})
-            sections = content.get('content', [])
-            key_points = content.get('key_points', [])
-            cautions = content.get('cautions', '')
-
-            formatted_text = f"# 标题: {title}\n\n"
-
-            if metadata:
-                formatted_text += "## 元数据:\n"
-                for key, value in metadata.items():
-                    if value:
-                        formatted_text += f"- {key.replace('_', ' ').title()}: {value}\n"
-                formatted_text += "\n"
-
-            if sections:
-                formatted_text += "## 内容:\n"
-                for item in sections:
-                    if item.get('section_title'):
-                        formatted_text += f"### {item['section_title']}\n"
-                    if item.get('text'):
-                        formatted_text += f"{item['text']}\n"
-                    if item.get('content_type') == 'list' and isinstance(item.get('items'), list):
-                        for li in item['items']:
-                            formatted_text += f"- {li}\n"
-                    formatted_text += "\n"
-
-            if key_points:
-                formatted_text += "## 关键点:\n"
-                for point in key_points:
-                    formatted_text += f"- {point}\n"
-                formatted_text += "\n"
-
-            if cautions:
-                formatted_text += f"## 注意事项:\n{cautions}\n\n"
-
-            return formatted_text
+    def is_long_document(self, content: dict) -> bool:
+        """原文估算token数是否超过长文档阈值"""
+        total = sum(estimate_tokens(item_text(item)) for item in content.get('content', []))
+        return total > self.long_document_threshold
+
+    def summarize_long_document(self, content: dict, language: str = 'zh') -> dict:
+        """
+        长文档的map阶段：分块并发摘要，返回以摘要替换正文后的提取结果
+
+        Args:
+            content: 内容提取器的输出
+            language: 'zh' 或 'en'
+
+        Returns:
+            dict: 正文替换为各分块摘要的提取结果，标题、元数据等字段保持不变
+        """
+        summaries = self.chunk_summarizer.summarize(content, language)
+        print(f"DEBUG: 长文档模式，{len(summaries)} 个分块摘要")
+        return dict(content, content=summaries)
+
+    def _format_content_for_llm(self, content: dict, language: str = 'zh', script_length: str = 'medium') -> str:
+        """将提取的内容按脚本长度对应的token预算格式化为适合LLM输入的文本。支持中英文结构。"""
+        return self.prompt_packer.pack(content, language, script_length)
 
     def _get_user_prompt(self, content: str) -> str:
         """获取用户提示词"""
@@ -0,0 +1,214 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from content_extractor.budget import ContentBudget, estimate_tokens
+
+# 各脚本长度对应的素材token预算，可用环境变量覆盖
+DEFAULT_TOKEN_BUDGETS = {
+    'short': int(os.getenv('PROMPT_TOKEN_BUDGET_SHORT', '3000')),
+    'medium': int(os.getenv('PROMPT_TOKEN_BUDGET_MEDIUM', '6000')),
+    'long': int(os.getenv('PROMPT_TOKEN_BUDGET_LONG', '12000')),
+}
+
+# 对脚本创作有帮助的元数据，其余（网页meta标签、文件大小、编码等）不进入提示词
+METADATA_ALLOWLIST = (
+    'author', 'subject', 'description', 'og:description', 'keywords',
+    'og:site_name', 'domain', 'created', 'creation_date', 'date', 'article:published_time',
+)
+
+_LABELS = {
+    'zh': {
+        'title': '标题', 'unknown': '未知标题', 'metadata': '元数据', 'content': '内容',
+        'key_points': '关键点', 'cautions': '注意事项',
+        'excerpt': '（原文较长，以下为按章节均衡选取的节选）', 'omitted': '……',
+    },
+    'en': {
+        'title': 'Title', 'unknown': 'Unknown Title', 'metadata': 'Metadata', 'content': 'Content',
+        'key_points': 'Key Points', 'cautions': 'Cautions',
+        'excerpt': '(The source is long; the following is an excerpt balanced across sections.)', 'omitted': '...',
+    },
+}
+
+# 一个内容块：渲染后的文本、估算token数、是否允许截断
+Block = Tuple[str, int, bool]
+
+
+class PromptPacker:
+    """
+    将提取结果打包为LLM提示词素材
+
+    按章节估算token数，列表和表格以紧凑文本呈现，只保留白名单内的元数据；
+    原文超出预算时按章节均衡分配预算，保证提示词大小不随原文增长。
+    """
+
+    def __init__(self, token_budgets: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            token_budgets: 各脚本长度（short/medium/long）对应的素材token预算
+        """
+        self.token_budgets = dict(DEFAULT_TOKEN_BUDGETS, **(token_budgets or {}))
+
+    def budget_for(self, script_length: str) -> int:
+        """获取脚本长度对应的token预算，未知长度按 medium 处理"""
+        return self.token_budgets.get(script_length, self.token_budgets['medium'])
+
+    def pack(self, content: Dict, language: str = 'zh', script_length: str = 'medium') -> str:
+        """
+        将提取结果打包为提示词素材
+
+        Args:
+            content: 内容提取器的输出
+            language: 'zh' 或 'en'
+            script_length: 脚本长度，决定token预算
+
+        Returns:
+            str: 不超过预算（估算）的素材文本
+        """
+        labels = _LABELS['en' if language == 'en' else 'zh']
+        budget = self.budget_for(script_length)
+
+        header = self._render_header(content, labels)
+        footer = self._render_footer(content, labels)
+        remaining = budget - estimate_tokens(header) - estimate_tokens(footer)
+
+        groups = self.group_sections(content.get('content', []))
+        total = sum(self._group_size(title, blocks) for title, blocks in groups)
+        parts = [header]
+        if groups:
+            content_heading = f"## {labels['content']}:\n"
+            parts.append(content_heading)
+            remaining -= estimate_tokens(content_heading)
+            if total > remaining:
+                parts.append(labels['excerpt'] + "\n\n")
+                remaining -= estimate_tokens(labels['excerpt'] + "\n\n")
+                allocations = self._allocate(groups, max(remaining, 0))
+            else:
+                allocations = [None] * len(groups)
+            for (title, blocks), allocation in zip(groups, allocations):
+                rendered = self._render_group(title, blocks, allocation, labels)
+                if rendered:
+                    parts.append(rendered)
+        parts.append(footer)
+        return "".join(parts)
+
+    def _render_header(self, content: Dict, labels: Dict[str, str]) -> str:
+        lines = [f"# {labels['title']}: {content.get('title') or labels['unknown']}\n"]
+        metadata = content.get('metadata') or {}
+        selected = [(key, metadata[key]) for key in METADATA_ALLOWLIST
+                    if isinstance(metadata.get(key), (str, int, float)) and str(metadata[key]).strip()]
+        if selected:
+            lines.append(f"## {labels['metadata']}:")
+            for key, value in selected:
+                label = key.split(':')[-1].replace('_', ' ').title()
+                lines.append(f"- {label}: {str(value).strip()[:200]}")
+            lines.append("")
+        return "\n".join(lines) + "\n"
+
+    def _render_footer(self, content: Dict, labels: Dict[str, str]) -> str:
+        parts = []
+        key_points = [str(point) for point in content.get('key_points') or [] if point]
+        if key_points:
+            parts.append(f"## {labels['key_points']}:\n" + "".join(f"- {point}\n" for point in key_points) + "\n")
+        if content.get('cautions'):
+            parts.append(f"## {labels['cautions']}:\n{content['cautions']}\n\n")
+        return "".join(parts)
+
+    def group_sections(self, items: List[Dict]) -> List[Tuple[str, List[Block]]]:
+        """按章节标题将内容项分组，并渲染为估算过token数的内容块"""
+        groups = []
+        for item in items:
+            content_type = item.get('content_type')
+            title = item.get('section_title') or ''
+            if content_type == 'heading' or not groups or groups[-1][0] != title:
+                groups.append((title, []))
+            if content_type == 'heading':
+                continue
+            rendered = self._render_item(item)
+            if rendered:
+                # 估算时计入块之间的换行符
+                tokens = estimate_tokens(rendered + "\n")
+                groups[-1][1].append((rendered, tokens, content_type not in ('list', 'table')))
+        return [(title, blocks) for title, blocks in groups if blocks]
+
+    def _render_item(self, item: Dict) -> str:
+        """将单个内容项渲染为紧凑文本"""
+        text = item.get('text')
+        content_type = item.get('content_type')
+        if content_type == 'list' and isinstance(text, list):
+            numbered = item.get('list_type') == 'number'
+            lines = []
+            for index, entry in enumerate(text, 1):
+                entry_text = entry.get('text', '') if isinstance(entry, dict) else str(entry)
+                if entry_text:
+                    lines.append(f"{index}. {entry_text}" if numbered else f"- {entry_text}")
+            return "\n".join(lines)
+        if content_type == 'table' and isinstance(text, list):
+            lines = []
+            for row in text:
+                cells = row if isinstance(row, list) else [row]
+                compact = []
+                for cell in cells:
+                    cell = str(cell).strip()
+                    # 合并单元格会在相邻列重复出现，只保留一次
+                    if cell and (not compact or compact[-1] != cell):
+                        compact.append(cell)
+                if compact:
+                    lines.append(" | ".join(compact))
+            return "\n".join(lines)
+        return str(text or '').strip()
+
+    def _allocate(self, groups: List[Tuple[str, List[Block]]], budget: int) -> List[int]:
+        """
+        在章节之间均衡分配预算：篇幅小于平均份额的章节完整保留，
+        剩余预算由较长的章节平分
+        """
+        sizes = [self._group_size(title, blocks) for title, blocks in groups]
+        allocations = [0] * len(groups)
+        pending = sorted(range(len(groups)), key=lambda index: sizes[index])
+        while pending:
+            share = budget // len(pending)
+            index = pending[0]
+            if sizes[index] <= share:
+                allocations[index] = sizes[index]
+                budget -= sizes[index]
+                pending.pop(0)
+            else:
+                for index in pending:
+                    allocations[index] = share
+                break
+        return allocations
+
+    def _group_size(self, title: str, blocks: List[Block]) -> int:
+        """章节完整渲染后的估算token数，包含标题行和结尾换行"""
+        heading = f"### {title}\n" if title else ""
+        return estimate_tokens(heading + "\n\n") + sum(tokens for _, tokens, _ in blocks)
+
+    def _render_group(self,
+                      title: str,
+                      blocks: List[Block],
+                      allocation: Optional[int],
+                      labels: Dict[str, str]) -> str:
+        """渲染一个章节，提供分配额度时只保留额度内的内容块"""
+        heading = f"### {title}\n" if title else ""
+        if allocation is None or allocation >= self._group_size(title, blocks):
+            return heading + "\n".join(text for text, _, _ in blocks) + "\n\n"
+
+        # 预留省略标记和结尾换行的额度
+        reserved = estimate_tokens(heading) + estimate_tokens(labels['omitted'] + "\n\n")
+        budget = ContentBudget(max_tokens=allocation - reserved)
+        kept = []
+        for text, tokens, truncatable in blocks:
+            if budget.max_tokens - budget.used_tokens >= tokens:
+                kept.append(text)
+                budget.used_tokens += tokens
+                continue
+            if truncatable:
+                fitted = budget.consume(text)
+                if fitted:
+                    kept.append(fitted + labels['omitted'])
+            elif kept:
+                kept.append(labels['omitted'])
+            break
+        if not kept:
+            return ""
+        return heading + "\n".join(kept) + "\n\n"
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from content_extractor.cache import DiskCache
+
+# 缓存键格式版本，键的组成变化时递增以使旧条目失效
+RESPONSE_CACHE_VERSION = 1
+
+_TRAILING_SPACE = re.compile(r'[ \t]+\n')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    规范化提示词：统一换行符，去掉行尾空白和多余空行，
+    只在排版上不同的提示词得到相同的缓存键
+
+    Args:
+        text: 提示词
+
+    Returns:
+        str: 规范化后的提示词
+    """
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    text = _TRAILING_SPACE.sub('\n', text)
+    text = _BLANK_LINES.sub('\n\n', text)
+    return text.strip()
+
+
+class LLMResponseCache:
+    """
+    LLM响应的磁盘缓存
+
+    以模型、规范化后的系统/用户提示词和采样参数作为键，
+    条目超过有效期后失效，总大小超过上限时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = 24 * 3600, max_bytes: int = 128 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 缓存目录
+            ttl: 条目有效期（秒），None表示永不过期
+            max_bytes: 缓存目录的最大总字节数
+        """
+        self.disk = DiskCache(cache_dir, max_bytes, ttl=ttl)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional['LLMResponseCache']:
+        """
+        根据环境变量创建缓存，未设置 LLM_CACHE_DIR 时不启用
+
+        Returns:
+            Optional[LLMResponseCache]: 缓存实例，未启用时返回None
+        """
+        cache_dir = os.getenv('LLM_CACHE_DIR')
+        if not cache_dir:
+            return None
+        ttl = float(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))
+        return cls(
+            cache_dir,
+            ttl=ttl if ttl > 0 else None,
+            max_bytes=int(os.getenv('LLM_CACHE_MB', '128')) * 1024 * 1024
+        )
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, params: Dict[str, Any]) -> str:
+        """
+        生成缓存键
+
+        Args:
+            model: 模型或推理接入点ID
+            system_prompt: 系统提示词
+            user_prompt: 用户提示词
+            params: 采样参数（temperature、max_tokens等）
+
+        Returns:
+            str: 缓存键
+        """
+        payload = json.dumps({
+            "version": RESPONSE_CACHE_VERSION,
+            "model": model,
+            "system": normalize_prompt(system_prompt),
+            "user": normalize_prompt(user_prompt),
+            "params": params
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.disk.get(key)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.disk.set(key, value)
+        self._count("stores")
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict: 命中/未命中/写入计数及磁盘占用
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats["disk_bytes"] = self.disk.total_bytes
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
@@ -0,0 +1,117 @@
+"""
+播客音频渲染管线基准
+
+对比旧管线（TTS逐段返回MP3，每段用 pydub 启动 ffmpeg 解码；synthesize_long_text
+先把一句台词的各段重新编码为MP3，generate_audio 再解码拼接并整体编码一次，共三次有损转码）
+与新管线（TTS返回原始PCM，NumPy在内存中拼接，只在最后编码一次）渲染一期节目的耗时。
+
+输出每种管线的墙钟时间和CPU时间（含 ffmpeg 子进程），并折算为每分钟节目的耗时。
+TTS返回的音频在计时前生成，基准只衡量拼接和编解码。
+
+用法:
+    python benchmarks/bench_audio_pipeline.py [--lines 100] [--seconds 6] [--segments-per-line 2] [--format mp3]
+
+未安装 ffmpeg 时跳过旧管线，新管线可用 --format wav 运行（不需要 ffmpeg）。
+"""
+import argparse
+import io
+import os
+import resource
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webapp.audio import PCM_SAMPLE_RATE, render_audio
+
+
+def synthetic_speech(seconds, seed):
+    """生成类似语音的信号：多个谐波叠加、音节包络和少量噪声"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * PCM_SAMPLE_RATE)) / PCM_SAMPLE_RATE
+    pitch = rng.uniform(100, 220)
+    signal = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+    signal = signal * envelope + rng.normal(0, 0.02, len(t))
+    return (signal / np.max(np.abs(signal)) * 12000).astype(np.int16)
+
+
+def encode_mp3(samples):
+    from pydub import AudioSegment
+    buffer = io.BytesIO()
+    AudioSegment(samples.tobytes(), sample_width=2, frame_rate=PCM_SAMPLE_RATE, channels=1).export(
+        buffer, format="mp3", bitrate="128k")
+    return buffer.getvalue()
+
+
+def legacy_pipeline(lines_mp3):
+    """旧实现：逐段解码、每句重新编码、整期再解码拼接后编码"""
+    from pydub import AudioSegment
+    combined_audio = AudioSegment.empty()
+    for segments in lines_mp3:
+        line_audio = AudioSegment.empty()
+        for piece in segments:
+            line_audio += AudioSegment.from_file(io.BytesIO(piece), format="mp3")
+        buffer = io.BytesIO()
+        line_audio.export(buffer, format="mp3")
+        combined_audio += AudioSegment.from_file(io.BytesIO(buffer.getvalue()), format="mp3")
+    buffer = io.BytesIO()
+    combined_audio.export(buffer, format="mp3")
+    return buffer.getvalue()
+
+
+def new_pipeline(lines_pcm, output_format):
+    pieces = [piece for segments in lines_pcm for piece in segments]
+    data, _ = render_audio(pieces, output_format, input_format="pcm")
+    return data
+
+
+def measure(func, *args):
+    """返回 (墙钟秒数, CPU秒数)，CPU时间包含本进程和已结束的子进程"""
+    def cpu():
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+    cpu_start, wall_start = cpu(), time.perf_counter()
+    func(*args)
+    return time.perf_counter() - wall_start, cpu() - cpu_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=100, help='台词句数')
+    parser.add_argument('--seconds', type=float, default=6.0, help='每句台词的时长（秒）')
+    parser.add_argument('--segments-per-line', type=int, default=2, help='每句台词的TTS分段数')
+    parser.add_argument('--format', default='mp3', help='新管线的输出格式（mp3 / wav）')
+    args = parser.parse_args()
+
+    has_ffmpeg = shutil.which('ffmpeg') is not None
+    segment_seconds = args.seconds / args.segments_per_line
+    lines_pcm = [[synthetic_speech(segment_seconds, line * 100 + index).tobytes()
+                  for index in range(args.segments_per_line)] for line in range(args.lines)]
+    minutes = args.lines * args.seconds / 60
+    print(f"节目时长 {minutes:.1f} 分钟，{args.lines} 句台词，共 {args.lines * args.segments_per_line} 个TTS分段")
+
+    results = []
+    if args.format != 'mp3' or has_ffmpeg:
+        results.append((f"新管线（PCM拼接，编码一次为{args.format}）", measure(new_pipeline, lines_pcm, args.format)))
+    if has_ffmpeg:
+        lines_mp3 = [[encode_mp3(np.frombuffer(piece, dtype=np.int16)) for piece in segments] for segments in lines_pcm]
+        results.append(("旧管线（逐段MP3解码，三次转码）", measure(legacy_pipeline, lines_mp3)))
+    else:
+        print("未找到 ffmpeg，跳过旧管线和MP3编码")
+
+    print(f"{'管线':<32}{'墙钟(s)':>10}{'CPU(s)':>10}{'墙钟/分钟':>12}{'CPU/分钟':>12}")
+    for name, (wall, cpu_seconds) in results:
+        print(f"{name:<32}{wall:>10.2f}{cpu_seconds:>10.2f}{wall / minutes:>12.3f}{cpu_seconds / minutes:>12.3f}")
+    if len(results) == 2:
+        print(f"墙钟时间加速比: {results[1][1][0] / results[0][1][0]:.1f}x，"
+              f"CPU时间加速比: {results[1][1][1] / results[0][1][1]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+TXTExtractor 段落分类微基准
+
+对比旧实现（逐个模式调用 re.match，列表判断重复执行）与预编译单次分类器
+在多MB中文小说文本上的段落处理速度（段落/秒）。
+
+用法:
+    python benchmarks/bench_txt_classifier.py [小说文本路径] [--repeat N]
+
+未提供文本路径时生成约8MB的模拟中文小说。
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_extractor.extractors.txt_extractor import TXTExtractor, HEADING_PATTERNS, LIST_PATTERNS
+
+
+class LegacyTXTClassifier:
+    """旧版实现的段落分类逻辑，仅用于基准对比"""
+
+    def __init__(self):
+        self.heading_patterns = HEADING_PATTERNS
+        self.list_patterns = LIST_PATTERNS
+
+    def _is_heading(self, text):
+        if len(text) > 100 or text[-1] in '。，！？':
+            return False
+        if self._is_list_item(text):
+            return False
+        return any(re.match(pattern, text) for pattern, _ in self.heading_patterns)
+
+    def _get_heading_level(self, text):
+        for pattern, level in self.heading_patterns:
+            if re.match(pattern, text):
+                return level
+        return 1
+
+    def _is_list_item(self, text):
+        return any(re.match(pattern, text) for pattern, _ in self.list_patterns)
+
+    def _get_list_type(self, text):
+        for pattern, list_type in self.list_patterns:
+            if re.match(pattern, text):
+                return list_type
+        return 'unknown'
+
+    def _extract_list_items(self, text):
+        items = []
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            list_type = self._get_list_type(line)
+            if list_type != 'unknown':
+                item = re.sub(r'^[\d一二三四五六七八九十]+[\.、]', '', line)
+                item = re.sub(r'^[•\-\*○●◆◇■□]\s*', '', item)
+                items.append({'text': item.strip(), 'type': list_type})
+        return items
+
+    def _extract_content(self, content):
+        structured_content = []
+        current_section = "未命名章节"
+        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
+        for para in paragraphs:
+            if self._is_heading(para):
+                current_section = para
+                structured_content.append({
+                    "section_title": para, "text": "", "content_type": "heading",
+                    "level": self._get_heading_level(para)
+                })
+            elif self._is_list_item(para):
+                items = self._extract_list_items(para)
+                if items:
+                    structured_content.append({
+                        "section_title": current_section, "text": items,
+                        "content_type": "list", "list_type": items[0]['type']
+                    })
+            else:
+                structured_content.append({
+                    "section_title": current_section, "text": para, "content_type": "paragraph"
+                })
+        return structured_content
+
+
+def generate_novel(target_bytes: int = 8 * 1024 * 1024) -> str:
+    """生成模拟中文小说：章节标题、长段落、对白以及少量列表"""
+    random.seed(42)
+    chars = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理府研质"
+    chapter_numbers = "一二三四五六七八九十"
+    parts = []
+    size = 0
+    chapter = 0
+    while size < target_bytes:
+        chapter += 1
+        number = chapter_numbers[(chapter - 1) % 10]
+        chapter_parts = [f"第{number}章 {''.join(random.choices(chars, k=6))}"]
+        for _ in range(random.randint(40, 80)):
+            kind = random.random()
+            if kind < 0.05:
+                chapter_parts.append("\n".join(f"{i}、{''.join(random.choices(chars, k=12))}" for i in range(1, 4)))
+            elif kind < 0.25:
+                chapter_parts.append(f"“{''.join(random.choices(chars, k=random.randint(8, 30)))}！”")
+            else:
+                sentences = [''.join(random.choices(chars, k=random.randint(10, 40))) for _ in range(random.randint(2, 6))]
+                chapter_parts.append("，".join(sentences) + "。")
+        parts.extend(chapter_parts)
+        size += sum(len(part.encode('utf-8')) + 2 for part in chapter_parts)
+    return "\n\n".join(parts)
+
+
+def bench(label: str, extract_content, content: str, repeat: int) -> float:
+    paragraphs = len([p for p in content.split('\n\n') if p.strip()])
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_content(content)
+        best = min(best, time.perf_counter() - start)
+    rate = paragraphs / best
+    print(f"{label:<12} {best:8.3f}s  {rate:12,.0f} 段落/秒")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TXTExtractor 段落分类微基准")
+    parser.add_argument("path", nargs="?", help="UTF-8 编码的小说文本路径")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    else:
+        content = generate_novel()
+
+    paragraphs = len([p for p in content.split('\n\n') if p.strip()])
+    print(f"文本大小: {len(content.encode('utf-8')) / 1024 / 1024:.1f} MB, 段落数: {paragraphs:,}")
+
+    legacy = LegacyTXTClassifier()
+    current = TXTExtractor()
+    assert legacy._extract_content(content) == current._extract_content(content), "新旧实现结果不一致"
+
+    legacy_rate = bench("旧实现", legacy._extract_content, content, args.repeat)
+    current_rate = bench("预编译分类器", current._extract_content, content, args.repeat)
+    print(f"加速比: {current_rate / legacy_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+WebExtractor 网页解析基准
+
+对比旧实现（readability摘要交给BeautifulSoup html.parser重新解析，
+标题、段落、列表分三次 find_all，兜底提取再解析一次原始HTML）
+与lxml单次解析、按文档顺序单次遍历的实现在重型网页上的处理速度（页/秒）。
+
+用法:
+    python benchmarks/bench_web_extract.py [网页语料目录] [--repeat N]
+
+语料目录中的 *.html / *.htm 文件按UTF-8读取，可预先用浏览器或 curl 保存；
+未提供目录时生成一组带大量导航、脚本和评论区的模拟重型网页。
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+import requests
+from bs4 import BeautifulSoup
+from readability import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_extractor.extractors.web_extractor import WebExtractor
+
+
+class LegacyWebParser:
+    """旧版实现的网页解析逻辑，仅用于基准对比"""
+
+    def build(self, html):
+        doc = Document(html)
+        title = doc.title()
+        soup = BeautifulSoup(doc.summary(), 'html.parser')
+        content = self._extract_content(soup)
+        if not content:
+            content = self._extract_from_raw_html(html)
+        return title, content
+
+    def _extract_content(self, soup):
+        structured_content = []
+        current_section = "正文"
+        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+            text = heading.get_text(strip=True)
+            if text:
+                structured_content.append({"section_title": text, "text": "",
+                                           "content_type": "heading", "level": int(heading.name[1])})
+                current_section = text
+        for p in soup.find_all('p'):
+            text = p.get_text(strip=True)
+            if text and len(text) > 10:
+                structured_content.append({"section_title": current_section, "text": text,
+                                           "content_type": "paragraph"})
+        for ul in soup.find_all(['ul', 'ol']):
+            list_type = "bullet" if ul.name == 'ul' else "number"
+            items = [{"text": li.get_text(strip=True), "type": list_type}
+                     for li in ul.find_all('li') if li.get_text(strip=True)]
+            if items:
+                structured_content.append({"section_title": current_section, "text": items,
+                                           "content_type": "list", "list_type": list_type})
+        return structured_content
+
+    def _extract_from_raw_html(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        for script in soup(["script", "style"]):
+            script.decompose()
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main|article', re.I))
+        return self._extract_content(main_content) if main_content else []
+
+
+def generate_page(seed, paragraphs=400):
+    """生成一个带大量噪声节点的模拟重型网页"""
+    rng = random.Random(seed)
+    words = "播客 内容 提取 网页 解析 性能 测试 段落 章节 列表 数据 模型 文本 结构 读者".split()
+
+    def sentence():
+        return "".join(rng.choice(words) for _ in range(rng.randint(8, 30))) + "。"
+
+    nav = "".join(f'<li><a href="/n{i}">导航{i}</a></li>' for i in range(200))
+    parts = [f'<html><head><title>模拟网页 {seed}</title>',
+             '<meta name="description" content="模拟重型网页">',
+             '<script>' + "var a=1;" * 2000 + '</script>',
+             '<style>' + ".c{color:red}" * 1000 + '</style></head><body>',
+             f'<nav><ul>{nav}</ul></nav><main><article class="post-content">']
+    for index in range(paragraphs):
+        if index % 25 == 0:
+            parts.append(f'<h2>第{index // 25 + 1}节</h2>')
+        if index % 40 == 7:
+            parts.append("<ul>" + "".join(f"<li>{sentence()}</li>" for _ in range(5)) + "</ul>")
+        parts.append(f'<p>{sentence()} <span>{sentence()}</span> <a href="#">{sentence()}</a></p>')
+    parts.append('</article></main><div class="comments">')
+    parts.extend(f'<div class="comment"><p>评论 {sentence()}</p></div>' for _ in range(300))
+    parts.append('</div><footer>' + "页脚" * 500 + '</footer></body></html>')
+    return "".join(parts)
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.htm*"))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def make_response(name, html):
+    response = requests.Response()
+    response._content = html.encode('utf-8')
+    response.encoding = 'utf-8'
+    response.status_code = 200
+    response.url = f"http://bench.local/{name}"
+    response.headers['content-type'] = 'text/html; charset=utf-8'
+    return response
+
+
+def bench(label, func, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, html in pages:
+            func(name, html)
+        best = min(best, time.perf_counter() - start)
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"{label:<14} {best:8.3f}s  {len(pages) / best:8.1f} 页/秒  {total_bytes / best / 1024 / 1024:6.2f} MB/秒")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="保存的网页语料目录")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+        if not pages:
+            parser.error(f"{args.corpus} 中没有 .html 文件")
+    else:
+        pages = [(f"page{seed}.html", generate_page(seed)) for seed in range(10)]
+
+    total_mb = sum(len(html.encode('utf-8')) for _, html in pages) / 1024 / 1024
+    print(f"语料: {len(pages)} 页, {total_mb:.1f} MB")
+
+    legacy = LegacyWebParser()
+    extractor = WebExtractor()
+    legacy_time = bench("bs4 三次遍历", lambda name, html: legacy.build(html), pages, args.repeat)
+    new_time = bench("lxml 单次遍历", lambda name, html: extractor._build_result(make_response(name, html)),
+                     pages, args.repeat)
+    print(f"加速比: {legacy_time / new_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
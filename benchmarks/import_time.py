@@ -0,0 +1,85 @@
+"""
+Web服务冷启动导入耗时报告
+
+在全新的解释器中以 -X importtime 导入目标模块（默认 webapp.main，即每个uvicorn
+工作进程启动时的导入路径），汇总总耗时、耗时最多的顶层包，并检查重型依赖
+（PDF、DOCX、网页解析、音频、LLM SDK、Flask）是否在启动时被加载。
+
+用法:
+    python benchmarks/import_time.py [模块名] [--repeat N] [--top N]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 应当按需加载、不应出现在启动路径中的重型依赖
+HEAVY_MODULES = [
+    "PyPDF2", "docx", "readability", "bs4", "lxml.html", "httpx",
+    "pydub", "numpy", "volcenginesdkarkruntime", "flask",
+]
+
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_importtime(module):
+    """在子进程中导入模块，返回 [(模块名, 自身耗时us, 累计耗时us, 缩进层级)]"""
+    env = dict(os.environ)
+    # 导入 webapp 时某些服务读取该变量，这里只需非空
+    env.setdefault("ARK_API_KEY", "import-time-report")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"导入 {module} 失败")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("module", nargs="?", default="webapp.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(args.repeat)]
+    totals = []
+    for entries in runs:
+        target = [cumulative for name, _, cumulative, _ in entries if name == args.module]
+        totals.append(target[-1] / 1000 if target else 0.0)
+
+    print(f"模块: {args.module}  (运行 {args.repeat} 次)")
+    print(f"累计导入耗时: 中位数 {statistics.median(totals):.1f} ms, 最小 {min(totals):.1f} ms")
+
+    # 按顶层包汇总自身耗时（取中位数那次的运行）
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    by_package = defaultdict(int)
+    loaded = set()
+    for name, self_us, _, _ in median_run:
+        by_package[name.split(".")[0]] += self_us
+        loaded.add(name)
+
+    print(f"\n耗时最多的顶层包（自身耗时合计）:")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {package:<32} {self_us / 1000:8.1f} ms")
+
+    print("\n重型依赖是否在启动时加载:")
+    for module in HEAVY_MODULES:
+        print(f"  {module:<32} {'已加载' if module in loaded else '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
 from .extractor import ContentExtractor
+from .cache import ExtractionCache
+from .registry import ExtractorRegistry
 
 __version__ = '0.1.0'
-__all__ = ['ContentExtractor'] 
\ No newline at end of file
+__all__ = ['ContentExtractor', 'ExtractionCache', 'ExtractorRegistry', 'BatchURLExtractor']
+
+
+def __getattr__(name):
+    # 批量网页提取依赖httpx和lxml，按需导入
+    if name == 'BatchURLExtractor':
+        from .batch import BatchURLExtractor
+        return BatchURLExtractor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
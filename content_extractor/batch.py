@@ -0,0 +1,184 @@
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from .budget import ContentBudget
+from .exceptions import AccessDeniedError, ContentExtractorError, NoValidContentError
+from .extractors.web_extractor import WebExtractor
+
+
+class _HostGate:
+    """单个主机的访问控制：限制同时连接数，并保证相邻两次请求的开始时间间隔不小于 delay"""
+
+    def __init__(self, limit: int, delay: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.delay = delay
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait_turn(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next_start - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_start = loop.time() + self.delay
+
+
+class BatchURLExtractor:
+    """
+    异步批量网页提取器
+
+    使用异步HTTP客户端并发获取多个URL，全局并发数和每个主机的连接数、
+    请求间隔均有上限；HTML解析复用 WebExtractor 的逻辑并在线程中执行，
+    结果按完成顺序逐个产出，单个URL失败不影响其他URL。
+    """
+
+    def __init__(self,
+                 web_extractor: Optional[WebExtractor] = None,
+                 max_concurrency: int = 10,
+                 per_host_limit: int = 2,
+                 per_host_delay: float = 0.5,
+                 timeout: float = 20.0):
+        """
+        Args:
+            web_extractor: 提供解析逻辑和HTTP缓存的网页提取器
+            max_concurrency: 全局最大并发请求数
+            per_host_limit: 每个主机的最大并发请求数
+            per_host_delay: 同一主机相邻两次请求之间的最小间隔（秒）
+            timeout: 单个URL的请求超时（秒），不含排队等待时间
+        """
+        self.web_extractor = web_extractor or WebExtractor()
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        # 异步原语绑定事件循环，在首次使用时按当前循环创建，
+        # 同一循环内的多个批次共享全局并发上限和主机限速
+        self._loop = None
+        self._semaphore = None
+        self._hosts = {}
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._hosts = {}
+
+    def _host_gate(self, url: str) -> _HostGate:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = _HostGate(self.per_host_limit, self.per_host_delay)
+        return self._hosts[host]
+
+    def _client_headers(self) -> Dict[str, str]:
+        headers = dict(self.web_extractor.headers)
+        # httpx 未安装 brotli 时无法解码 br 压缩
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        return headers
+
+    async def extract_many(self,
+                           urls: Iterable[str],
+                           max_chars: Optional[int] = None,
+                           max_tokens: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        并发提取多个网页，按完成顺序产出结果
+
+        Args:
+            urls: 网页URL列表
+            max_chars: 每个网页的最大提取字符数
+            max_tokens: 每个网页的最大提取token数（估算）
+
+        Yields:
+            Dict: 单个URL的结果，包含 index、url、success，
+                成功时包含 content，失败时包含 error 和 error_type
+        """
+        self._bind_loop()
+        limits = httpx.Limits(max_connections=self.max_concurrency,
+                              max_keepalive_connections=self.max_concurrency)
+        async with httpx.AsyncClient(headers=self._client_headers(),
+                                     limits=limits,
+                                     timeout=self.timeout,
+                                     follow_redirects=True) as client:
+            tasks = [
+                asyncio.ensure_future(self._extract_one(client, index, url, max_chars, max_tokens))
+                for index, url in enumerate(urls)
+            ]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    yield await future
+            finally:
+                # 调用方提前停止迭代（如客户端断开）时取消剩余请求
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _extract_one(self,
+                           client: httpx.AsyncClient,
+                           index: int,
+                           url: str,
+                           max_chars: Optional[int],
+                           max_tokens: Optional[int]) -> Dict:
+        """提取单个URL，异常转换为失败结果"""
+        try:
+            if not self.web_extractor._is_valid_url(url):
+                raise NoValidContentError("无效的URL格式")
+            result = await self._fetch_and_parse(client, url)
+            budget = ContentBudget(max_chars=max_chars, max_tokens=max_tokens) if max_chars or max_tokens else None
+            result = self.web_extractor.apply_budget(result, budget)
+            return {"index": index, "url": url, "success": True, "content": result}
+        except ContentExtractorError as e:
+            return {"index": index, "url": url, "success": False, "error": str(e), "error_type": type(e).__name__}
+        except Exception as e:
+            return {"index": index, "url": url, "success": False, "error": f"提取内容失败: {str(e)}",
+                    "error_type": NoValidContentError.__name__}
+
+    async def _fetch_and_parse(self, client: httpx.AsyncClient, url: str) -> Dict:
+        """
+        在主机和全局并发限制下获取网页，释放连接名额后再解析
+
+        Args:
+            client: 异步HTTP客户端
+            url: 网页URL
+
+        Returns:
+            Dict: 提取结果
+        """
+        extractor = self.web_extractor
+        cache_key = extractor._cache_key(url)
+        cached = await asyncio.to_thread(extractor._get_cached, cache_key)
+
+        gate = self._host_gate(url)
+        async with gate.semaphore:
+            await gate.wait_turn()
+            async with self._semaphore:
+                try:
+                    response = await asyncio.wait_for(
+                        client.get(url, headers=extractor.conditional_headers(cached)),
+                        self.timeout
+                    )
+                    response.raise_for_status()
+                except asyncio.TimeoutError:
+                    raise NoValidContentError(f"获取网页内容超时: 超过{self.timeout}秒")
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code == 403:
+                        raise AccessDeniedError("访问被拒绝")
+                    raise NoValidContentError(f"获取网页内容失败: {str(e)}")
+                except httpx.HTTPError as e:
+                    raise NoValidContentError(f"获取网页内容失败: {str(e) or type(e).__name__}")
+
+        if response.status_code == 304 and cached:
+            # 内容未变化，复用上次的提取结果
+            return cached["result"]
+        return await asyncio.to_thread(self._parse_response, cache_key, response)
+
+    def _parse_response(self, cache_key: str, response: httpx.Response) -> Dict:
+        """在工作线程中解析响应并写入HTTP缓存"""
+        result = self.web_extractor.parse_document(
+            response.text, str(response.url), response.headers, response.encoding
+        )
+        self.web_extractor._store_cached(cache_key, response.headers, result)
+        return result
@@ -0,0 +1,155 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+# 中日韩文字及全角标点，按每字约1个token估算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数
+
+    中文等CJK字符按每字1个token计算，其余字符按每4个字符1个token计算，
+    不依赖具体模型的分词器。
+
+    Args:
+        text: 待估算的文本
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+
+def item_text(item: Dict) -> str:
+    """
+    获取内容项中的纯文本，列表和表格会被展平
+
+    Args:
+        item: 结构化内容项
+
+    Returns:
+        str: 内容项文本
+    """
+    text = item.get("text", "")
+    if isinstance(text, list):
+        parts = []
+        for entry in text:
+            if isinstance(entry, dict):
+                parts.append(str(entry.get("text", "")))
+            elif isinstance(entry, list):
+                parts.append(" ".join(str(cell) for cell in entry))
+            else:
+                parts.append(str(entry))
+        return "\n".join(parts)
+    return str(text or "")
+
+
+class ContentBudget:
+    """内容提取预算，限制提取的字符数或token数，预算用尽后提取器应停止读取"""
+
+    def __init__(self, max_chars: Optional[int] = None, max_tokens: Optional[int] = None):
+        """
+        Args:
+            max_chars: 最大字符数，None表示不限制
+            max_tokens: 最大估算token数，None表示不限制
+        """
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.used_chars = 0
+        self.used_tokens = 0
+        self.truncated = False
+
+    @property
+    def exhausted(self) -> bool:
+        """预算是否已用尽"""
+        if self.max_chars is not None and self.used_chars >= self.max_chars:
+            return True
+        if self.max_tokens is not None and self.used_tokens >= self.max_tokens:
+            return True
+        return False
+
+    def consume(self, text: str) -> Optional[str]:
+        """
+        从预算中扣除一段文本
+
+        Args:
+            text: 待加入的文本
+
+        Returns:
+            Optional[str]: 能放入预算的文本（可能被截断），预算已用尽时返回None
+        """
+        if self.exhausted:
+            self.truncated = True
+            return None
+
+        fitted = text
+        if self.max_chars is not None:
+            fitted = fitted[:self.max_chars - self.used_chars]
+        if self.max_tokens is not None:
+            remaining = self.max_tokens - self.used_tokens
+            if estimate_tokens(fitted) > remaining:
+                # 二分查找能放入剩余token预算的最长前缀
+                low, high = 0, len(fitted)
+                while low < high:
+                    mid = (low + high + 1) // 2
+                    if estimate_tokens(fitted[:mid]) <= remaining:
+                        low = mid
+                    else:
+                        high = mid - 1
+                fitted = fitted[:low]
+
+        if len(fitted) < len(text):
+            self.truncated = True
+        self.used_chars += len(fitted)
+        self.used_tokens += estimate_tokens(fitted)
+        return fitted or None
+
+    def fit(self, item: Dict) -> Optional[Dict]:
+        """
+        将一个内容项放入预算
+
+        标题、列表和表格整项保留或丢弃，只有普通段落会被截断。
+
+        Args:
+            item: 结构化内容项
+
+        Returns:
+            Optional[Dict]: 放入预算的内容项（段落可能被截断），预算已用尽时返回None
+        """
+        text = item_text(item)
+        if isinstance(item.get("text"), str):
+            fitted = self.consume(text) if text else ""
+            if fitted is None:
+                return None
+            if fitted != text:
+                item = dict(item, text=fitted)
+        elif self.exhausted:
+            self.truncated = True
+            return None
+        else:
+            self.used_chars += len(text)
+            self.used_tokens += estimate_tokens(text)
+        return item
+
+    def trim(self, content: List[Dict]) -> List[Dict]:
+        """
+        按预算裁剪已提取的内容列表
+
+        Args:
+            content: 结构化内容列表
+
+        Returns:
+            List[Dict]: 裁剪后的内容列表
+        """
+        trimmed = []
+        for item in content:
+            item = self.fit(item)
+            if item is None:
+                break
+            trimmed.append(item)
+        return trimmed
@@ -0,0 +1,294 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# 缓存条目格式版本，缓存结构变化时递增以使旧条目失效
+CACHE_FORMAT_VERSION = 2
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """
+    分块计算文件内容的SHA-256摘要
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 十六进制摘要
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def stream_digest(stream) -> str:
+    """
+    分块计算可定位二进制流的SHA-256摘要，计算后将流位置重置到开头
+
+    Args:
+        stream: 二进制流
+
+    Returns:
+        str: 十六进制摘要
+    """
+    sha256 = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(_HASH_CHUNK_SIZE), b''):
+        sha256.update(chunk)
+    stream.seek(0)
+    return sha256.hexdigest()
+
+
+class LRUCache:
+    """线程安全的内存LRU缓存"""
+
+    def __init__(self, max_entries: int = 128):
+        """
+        Args:
+            max_entries: 最大条目数，超出后淘汰最久未使用的条目
+        """
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    基于目录的JSON磁盘缓存
+
+    每个条目保存为一个JSON文件，读取时刷新文件修改时间；
+    总大小超过上限时按修改时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存目录的最大总字节数
+            ttl: 条目有效期（秒），None表示永不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path in self._iter_entries())
+
+    def _path_for(self, key: str) -> str:
+        # 按前两位分目录，避免单个目录下文件过多
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _iter_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    yield os.path.join(root, name)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                self.delete(key)
+                return None
+            os.utime(path)
+            return entry["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path_for(key)
+        data = json.dumps({"created": time.time(), "value": value}, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，避免并发读取到不完整的条目
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """按最近使用时间淘汰条目，直到总大小降到上限的90%以下"""
+        entries = []
+        for path in self._iter_entries():
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+        entries.sort()
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+class ExtractionCache:
+    """
+    内容寻址的提取结果缓存
+
+    以文件内容摘要、提取器名称、版本、构造参数以及提取参数作为键，
+    先查内存LRU层，再查磁盘层，命中磁盘层时回填内存层。
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_memory_entries: int = 128,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录，None表示只使用内存缓存
+            max_memory_entries: 内存层最大条目数
+            max_disk_bytes: 磁盘层最大总字节数
+        """
+        self.memory = LRUCache(max_memory_entries)
+        self.disk = DiskCache(cache_dir, max_disk_bytes) if cache_dir else None
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(digest: str, extractor: Any, options: Optional[Dict] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            digest: 文件内容摘要
+            extractor: 提取器实例，其类名、version 属性和 cache_options() 返回的构造参数参与计算
+            options: 影响提取结果的参数
+
+        Returns:
+            str: 缓存键
+        """
+        payload = json.dumps({
+            "format": CACHE_FORMAT_VERSION,
+            "digest": digest,
+            "extractor": type(extractor).__name__,
+            "version": getattr(extractor, "version", "1"),
+            "extractor_options": extractor.cache_options() if hasattr(extractor, "cache_options") else {},
+            "options": options or {}
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Dict]: 缓存的提取结果副本，未命中时返回None
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return copy.deepcopy(value)
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                self.memory.set(key, value)
+                return copy.deepcopy(value)
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Dict) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 提取结果
+        """
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("stores")
+
+    def clear(self) -> None:
+        """清空内存层并重置计数器，磁盘层保留"""
+        self.memory.clear()
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict: 命中/未命中计数、命中率及各层大小
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["disk_bytes"] = self.disk.total_bytes if self.disk is not None else 0
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
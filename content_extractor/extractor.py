@@ -1,10 +1,14 @@
+import io
 import os
 import json
-from typing import Dict, List, Union, Optional
-from .extractors.pdf_extractor import PDFExtractor
-from .extractors.doc_extractor import DocExtractor
-from .extractors.web_extractor import WebExtractor
-from .extractors.txt_extractor import TXTExtractor
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Iterator, List, Union, Optional
+from urllib.parse import urlparse
+from .budget import ContentBudget
+from .cache import ExtractionCache, file_digest, stream_digest
+from .registry import ExtractorRegistry, WEB_EXTRACTOR, load_target
+from .extractors.base_extractor import FileSource, source_name
 from .exceptions import (
     UnsupportedFormatError,
     AccessDeniedError,
@@ -12,49 +16,386 @@ from .exceptions import (
     FileNotFoundError
 )
 
+if TYPE_CHECKING:
+    from .extractors.pdf_extractor import PageSpec, ChapterSpec
+    from .extractors.web_extractor import WebExtractor
+    from .upload import UploadSpool
+
+DEFAULT_PDF_TARGET = 'content_extractor.extractors.pdf_extractor:PDFExtractor'
+
+# 工作进程内复用的提取器，每个进程只创建一次
+_worker_extractor = None
+
+# 取决于文件本身而不是文件内容的元数据字段，缓存中不保存，命中时按当前文件重新计算
+SOURCE_STAT_FIELDS = ('file_size', 'created_time', 'modified_time')
+
+
+def _source_stats(source: FileSource) -> Dict:
+    """获取文件大小和时间，内存中的二进制流没有文件时间"""
+    if isinstance(source, str):
+        file_stats = os.stat(source)
+        return {"file_size": file_stats.st_size, "created_time": str(file_stats.st_ctime),
+                "modified_time": str(file_stats.st_mtime)}
+    position = source.tell()
+    file_size = source.seek(0, io.SEEK_END)
+    source.seek(position)
+    return {"file_size": file_size, "created_time": "", "modified_time": ""}
+
+
+def _strip_source_fields(result: Dict, source: FileSource) -> Dict:
+    """
+    去掉提取结果中取决于来源文件的字段后再写入缓存
+
+    相同内容的文件可能以不同的文件名上传：用文件名代替的标题置为None，
+    文件大小和时间同样置为None，命中缓存时由 _restore_source_fields 按当前文件填回。
+    """
+    result = dict(result)
+    name = source_name(source)
+    if name and result.get("title") == name:
+        result["title"] = None
+    metadata = result.get("metadata")
+    if isinstance(metadata, dict):
+        metadata = dict(metadata)
+        if name and metadata.get("title") == name:
+            metadata["title"] = None
+        for field in SOURCE_STAT_FIELDS:
+            if field in metadata:
+                metadata[field] = None
+        result["metadata"] = metadata
+    return result
+
+
+def _restore_source_fields(result: Dict, source: FileSource) -> Dict:
+    """按当前文件填回缓存结果中被 _strip_source_fields 置空的字段"""
+    name = source_name(source)
+    if result.get("title") is None:
+        result["title"] = name
+    metadata = result.get("metadata")
+    if isinstance(metadata, dict):
+        if "title" in metadata and metadata["title"] is None:
+            metadata["title"] = name
+        if any(field in metadata and metadata[field] is None for field in SOURCE_STAT_FIELDS):
+            stats = _source_stats(source)
+            for field in SOURCE_STAT_FIELDS:
+                if field in metadata and metadata[field] is None:
+                    metadata[field] = stats[field]
+    return result
+
+
+def _process_file_in_worker(file_path: str, max_chars: Optional[int], max_tokens: Optional[int]) -> Dict:
+    """
+    在进程池中提取单个文件
+
+    工作进程内不使用缓存（缓存由主进程负责），PDF也不再嵌套开启进程池。
+    """
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = ContentExtractor()
+        _worker_extractor.extractors.register('.pdf', DEFAULT_PDF_TARGET, max_workers=1)
+    return _worker_extractor.process_file(file_path, max_chars=max_chars, max_tokens=max_tokens)
+
+
 class ContentExtractor:
     """内容提取引擎的主类"""
     
-    def __init__(self):
-        self.extractors = {
-            '.pdf': PDFExtractor(),
-            '.docx': DocExtractor(),
-            '.doc': DocExtractor(),
-            '.txt': TXTExtractor()
-        }
-        self.web_extractor = WebExtractor()
+    def __init__(self,
+                 cache: Optional[ExtractionCache] = None,
+                 http_cache_dir: Optional[str] = None,
+                 extractors: Optional[ExtractorRegistry] = None):
+        """
+        Args:
+            cache: 提取结果缓存，相同内容的文件重复提取时直接返回缓存结果
+            http_cache_dir: 网页HTTP缓存目录，重复提取未变化的网页时只需一次304条件请求
+            extractors: 文件提取器注册表，默认使用内置提取器；各提取器在首次使用时才导入
+        """
+        self.cache = cache
+        self.extractors = extractors if extractors is not None else ExtractorRegistry()
+        self.http_cache_dir = http_cache_dir
+        self._web_extractor = None
 
-    def process_file(self, file_path: str) -> Dict:
+    @property
+    def web_extractor(self) -> "WebExtractor":
+        """网页提取器，首次访问时创建"""
+        if self._web_extractor is None:
+            self._web_extractor = load_target(WEB_EXTRACTOR)(http_cache_dir=self.http_cache_dir)
+        return self._web_extractor
+
+    def process_file(self,
+                     file_path: str,
+                     pages: Optional["PageSpec"] = None,
+                     chapters: Optional["ChapterSpec"] = None,
+                     sample_pages: Optional[int] = None,
+                     max_chars: Optional[int] = None,
+                     max_tokens: Optional[int] = None) -> Dict:
         """
         处理文件并提取内容
         
         Args:
             file_path: 文件路径
+            pages: 页码范围，如 "1-5,8"（仅PDF）
+            chapters: 按目录书签选择的章节序号或标题关键字（仅PDF）
+            sample_pages: 均匀抽样的页数（仅PDF）
+            max_chars: 最大提取字符数，达到后停止提取
+            max_tokens: 最大提取token数（估算），达到后停止提取
             
         Returns:
             Dict: 包含提取内容的字典
         """
+        file_ext = self._check_file(file_path)
+        return self._extract_source(file_path, file_ext, lambda: file_digest(file_path),
+                                    pages, chapters, sample_pages, max_chars, max_tokens)
+
+    def process_stream(self,
+                       stream: Union[str, BinaryIO],
+                       filename: str,
+                       digest: Optional[str] = None,
+                       pages: Optional["PageSpec"] = None,
+                       chapters: Optional["ChapterSpec"] = None,
+                       sample_pages: Optional[int] = None,
+                       max_chars: Optional[int] = None,
+                       max_tokens: Optional[int] = None) -> Dict:
+        """
+        从二进制流中提取内容，不需要先写入磁盘
+
+        Args:
+            stream: 可定位的二进制流（也可以是已落盘的文件路径）
+            filename: 原始文件名，用于判断格式
+            digest: 内容的SHA-256摘要，未提供且启用缓存时读取流计算
+            pages: 页码范围（仅PDF）
+            chapters: 章节序号或标题关键字（仅PDF）
+            sample_pages: 均匀抽样的页数（仅PDF）
+            max_chars: 最大提取字符数
+            max_tokens: 最大提取token数（估算）
+
+        Returns:
+            Dict: 包含提取内容的字典
+        """
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in self.extractors:
+            raise UnsupportedFormatError(f"不支持的文件格式: {file_ext}")
+
+        def compute_digest():
+            if digest:
+                return digest
+            return file_digest(stream) if isinstance(stream, str) else stream_digest(stream)
+
+        return self._extract_source(stream, file_ext, compute_digest,
+                                    pages, chapters, sample_pages, max_chars, max_tokens)
+
+    def process_upload(self, spool: "UploadSpool", **options) -> Dict:
+        """
+        提取上传暂存区中的文件，直接使用写入时计算的摘要作为缓存键
+
+        Args:
+            spool: 已写入完成的上传暂存区
+            **options: 传给 process_stream 的页码与预算参数
+
+        Returns:
+            Dict: 包含提取内容的字典
+        """
+        return self.process_stream(spool.source, spool.filename, digest=spool.digest, **options)
+
+    def _extract_source(self,
+                        source: Union[str, BinaryIO],
+                        file_ext: str,
+                        compute_digest: Callable[[], str],
+                        pages: Optional["PageSpec"],
+                        chapters: Optional["ChapterSpec"],
+                        sample_pages: Optional[int],
+                        max_chars: Optional[int],
+                        max_tokens: Optional[int]) -> Dict:
+        """按扩展名选择提取器提取文件来源，启用缓存时先查缓存"""
+        page_options = {
+            key: value for key, value in
+            (("pages", pages), ("chapters", chapters), ("sample_pages", sample_pages))
+            if value
+        }
+        if page_options and file_ext != '.pdf':
+            raise UnsupportedFormatError("页码范围、章节选择和抽样仅支持PDF文件")
+            
+        extractor = self.extractors[file_ext]
+        cache_key = None
+        if self.cache is not None:
+            options = dict(page_options, max_chars=max_chars, max_tokens=max_tokens)
+            cache_key = self.cache.make_key(compute_digest(), extractor, options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return _restore_source_fields(cached, source)
+
+        result = extractor.extract(source, budget=self._make_budget(max_chars, max_tokens), **page_options)
+        if cache_key is not None:
+            self.cache.set(cache_key, _strip_source_fields(result, source))
+        return result
+
+    def _check_file(self, file_path: str) -> str:
+        """
+        检查文件是否存在且格式受支持
+
+        Returns:
+            str: 小写的文件扩展名
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            UnsupportedFormatError: 不支持的文件格式
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
-            
+
         file_ext = os.path.splitext(file_path)[1].lower()
         if file_ext not in self.extractors:
             raise UnsupportedFormatError(f"不支持的文件格式: {file_ext}")
-            
-        extractor = self.extractors[file_ext]
-        return extractor.extract(file_path)
+        return file_ext
 
-    def process_url(self, url: str) -> Dict:
+    def process_url(self,
+                    url: str,
+                    max_chars: Optional[int] = None,
+                    max_tokens: Optional[int] = None) -> Dict:
         """
         处理网页并提取内容
         
         Args:
             url: 网页URL
+            max_chars: 最大提取字符数
+            max_tokens: 最大提取token数（估算）
             
         Returns:
             Dict: 包含提取内容的字典
         """
-        return self.web_extractor.extract(url)
+        return self.web_extractor.extract(url, budget=self._make_budget(max_chars, max_tokens))
+
+    def process_urls(self,
+                     urls: Iterable[str],
+                     max_chars: Optional[int] = None,
+                     max_tokens: Optional[int] = None,
+                     **batch_options) -> AsyncIterator[Dict]:
+        """
+        并发提取多个网页，按完成顺序异步产出每个URL的结果
+        
+        Args:
+            urls: 网页URL列表
+            max_chars: 每个网页的最大提取字符数
+            max_tokens: 每个网页的最大提取token数（估算）
+            **batch_options: 传给 BatchURLExtractor 的并发与限速参数
+            
+        Returns:
+            AsyncIterator[Dict]: 单个URL的提取结果或错误信息
+        """
+        from .batch import BatchURLExtractor
+
+        batch = BatchURLExtractor(self.web_extractor, **batch_options)
+        return batch.extract_many(urls, max_chars=max_chars, max_tokens=max_tokens)
+
+    def process_many(self,
+                     sources: Iterable[str],
+                     ordered: bool = True,
+                     max_workers: Optional[int] = None,
+                     url_workers: int = 8,
+                     max_chars: Optional[int] = None,
+                     max_tokens: Optional[int] = None) -> Iterator[Dict]:
+        """
+        批量提取文件和网页
+
+        文件（PDF、DOCX、TXT）在进程池中提取，网页在线程池中获取；
+        缓存查询和写入在当前进程完成。单项失败只影响该项的结果。
+        
+        Args:
+            sources: 文件路径与URL混合的列表
+            ordered: True按提交顺序产出结果，False按完成顺序产出
+            max_workers: 文件提取进程数，默认使用CPU核数
+            url_workers: 网页获取线程数
+            max_chars: 每项的最大提取字符数
+            max_tokens: 每项的最大提取token数（估算）
+            
+        Yields:
+            Dict: 单项结果，包含 index、source、success，
+                成功时包含 content，失败时包含 error 和 error_type
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        # 限制同时在途的任务数，避免数千个文档一次性全部提交
+        window = max(max_workers, url_workers) * 4
+        process_pool = None
+        thread_pool = ThreadPoolExecutor(max_workers=url_workers)
+        pending = OrderedDict()
+        try:
+            for index, source in enumerate(sources):
+                if self._is_url(source):
+                    future, cache_key = thread_pool.submit(self.process_url, source, max_chars, max_tokens), None
+                else:
+                    if process_pool is None:
+                        process_pool = ProcessPoolExecutor(max_workers=max_workers)
+                    future, cache_key = self._submit_file(process_pool, source, max_chars, max_tokens)
+                pending[index] = (source, future, cache_key)
+                if len(pending) >= window:
+                    yield from self._collect_results(pending, ordered)
+            while pending:
+                yield from self._collect_results(pending, ordered)
+        finally:
+            for _, future, _ in pending.values():
+                future.cancel()
+            thread_pool.shutdown(wait=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=True)
+
+    def _is_url(self, source: str) -> bool:
+        """判断批量输入项是否为网页URL"""
+        return urlparse(source).scheme in ('http', 'https')
+
+    def _submit_file(self,
+                     pool: ProcessPoolExecutor,
+                     file_path: str,
+                     max_chars: Optional[int],
+                     max_tokens: Optional[int]):
+        """
+        提交单个文件的提取任务，缓存命中或文件无效时直接返回已完成的Future
+
+        Returns:
+            Tuple[Future, Optional[str]]: 任务Future和需要写入的缓存键
+        """
+        try:
+            extractor = self.extractors[self._check_file(file_path)]
+            cache_key = None
+            if self.cache is not None:
+                options = dict(max_chars=max_chars, max_tokens=max_tokens)
+                cache_key = self.cache.make_key(file_digest(file_path), extractor, options)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    future = Future()
+                    future.set_result(_restore_source_fields(cached, file_path))
+                    return future, None
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+            return future, None
+        return pool.submit(_process_file_in_worker, file_path, max_chars, max_tokens), cache_key
+
+    def _collect_results(self, pending: "OrderedDict", ordered: bool) -> Iterator[Dict]:
+        """
+        从在途任务中取出已完成的结果：有序模式取最早提交的一项，无序模式取所有已完成项
+        """
+        if ordered:
+            indices = [next(iter(pending))]
+        else:
+            futures = {future: index for index, (_, future, _) in pending.items()}
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            indices = sorted(futures[future] for future in done)
+
+        for index in indices:
+            source, future, cache_key = pending.pop(index)
+            try:
+                result = future.result()
+            except Exception as e:
+                yield {"index": index, "source": source, "success": False, "error": str(e),
+                       "error_type": type(e).__name__}
+                continue
+            if cache_key is not None:
+                self.cache.set(cache_key, _strip_source_fields(result, source))
+            yield {"index": index, "source": source, "success": True, "content": result}
+
+    def _make_budget(self, max_chars: Optional[int], max_tokens: Optional[int]) -> Optional[ContentBudget]:
+        """根据字符数和token数上限创建提取预算，均未设置时返回None"""
+        if not max_chars and not max_tokens:
+            return None
+        return ContentBudget(max_chars=max_chars or None, max_tokens=max_tokens or None)
 
     def _format_output(self, 
                       source_type: str,
@@ -1,16 +1,51 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, List, Optional, Union
+from ..budget import ContentBudget
+
+# 文件类提取器的输入：文件路径，或可定位（seek）的二进制流
+FileSource = Union[str, BinaryIO]
+
+
+def source_name(source: FileSource) -> str:
+    """
+    获取输入来源的文件名，二进制流使用其 name 属性
+
+    Args:
+        source: 文件路径或二进制流
+
+    Returns:
+        str: 不含目录的文件名，无法确定时返回空字符串
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    name = getattr(source, 'name', '')
+    return os.path.basename(name) if isinstance(name, str) else ''
+
 
 class BaseExtractor(ABC):
     """内容提取器基类"""
+
+    # 提取器版本，输出结构或提取逻辑变化时递增，使旧的缓存结果失效
+    version = "1"
+
+    def cache_options(self) -> Dict:
+        """
+        影响提取结果的构造参数，参与提取结果缓存键的计算
+
+        Returns:
+            Dict: 参数名和取值，可JSON序列化
+        """
+        return {}
     
     @abstractmethod
-    def extract(self, source: str) -> Dict:
+    def extract(self, source: str, budget: Optional[ContentBudget] = None) -> Dict:
         """
         从源中提取内容
         
         Args:
             source: 源文件路径或URL
+            budget: 提取预算，用尽后不再返回后续内容
             
         Returns:
             Dict: 包含提取内容的字典
@@ -1,56 +1,375 @@
-import os
-from typing import Dict, List, Optional
-from docx import Document
+import re
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from lxml import etree
+from ..budget import ContentBudget
 from ..exceptions import NoValidContentError
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, FileSource, source_name
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_CORE_NAMESPACES = {
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+}
+
+
+def _w(tag: str) -> str:
+    """生成 WordprocessingML 命名空间下的完整标签名"""
+    return f'{{{_W_NS}}}{tag}'
+
+
+_P, _R, _T, _TBL, _TR, _TC = _w('p'), _w('r'), _w('t'), _w('tbl'), _w('tr'), _w('tc')
+_SECT_PR, _HYPERLINK = _w('sectPr'), _w('hyperlink')
+_VAL = _w('val')
+
+# Word内置样式的内部名称（如 "heading 1"）与界面名称（如 "Heading 1"）不同，与python-docx保持一致
+_BUILTIN_HEADING = re.compile(r'^heading (\d)$')
+
+# 文本运行中除 w:t 外会产生文字的元素
+_RUN_TEXT = {
+    _w('tab'): '\t',
+    _w('ptab'): '\t',
+    _w('cr'): '\n',
+    _w('noBreakHyphen'): '-',
+}
+
 
 class DocExtractor(BaseExtractor):
     """Word文档内容提取器"""
-    
-    def extract(self, file_path: str) -> Dict:
+
+    version = "2"
+
+    def __init__(self, engine: str = 'stream'):
+        """
+        Args:
+            engine: 解析引擎，'stream' 使用增量XML解析直接读取 word/document.xml，
+                'python-docx' 使用python-docx加载完整文档对象
+        """
+        super().__init__()
+        if engine not in ('stream', 'python-docx'):
+            raise ValueError(f"不支持的Word解析引擎: {engine}")
+        self.engine = engine
+
+    def cache_options(self) -> Dict:
+        # 两种引擎的输出不完全相同，缓存结果不能混用
+        return {"engine": self.engine}
+
+    def extract(self, file_path: FileSource, budget: Optional[ContentBudget] = None) -> Dict:
         """
         从Word文档中提取内容
-        
+
         Args:
-            file_path: Word文档路径
-            
+            file_path: Word文档路径或二进制流
+            budget: 提取预算，用尽后不再返回后续内容
+
         Returns:
             Dict: 包含提取内容的字典
         """
         try:
-            doc = Document(file_path)
-            
-            # 提取元数据
-            metadata = self._extract_metadata(doc)
-            
-            # 提取内容
-            content = self._extract_content(doc)
-            
+            if self.engine == 'stream':
+                metadata, content = self._extract_streaming(file_path, budget)
+            else:
+                from docx import Document
+                doc = Document(file_path)
+
+                # 提取元数据
+                metadata = self._extract_metadata(doc)
+
+                # 提取内容
+                content = self._extract_content(doc)
+
+                if budget is not None:
+                    content = budget.trim(content)
+
+            if budget is not None:
+                metadata["truncated"] = budget.truncated
+
             if not content:
                 raise NoValidContentError("无法从Word文档中提取有效内容")
-            
+
             # 提取关键点
             key_points = self._extract_key_points(content)
-            
+
             return {
                 "source_type": "file",
-                "title": metadata.get("title", os.path.basename(file_path)),
+                "title": metadata.get("title", source_name(file_path)),
                 "metadata": metadata,
                 "content": content,
                 "key_points": key_points,
                 "cautions": "Word文档可能包含图片、表格和格式化内容，当前仅提取文本内容"
             }
-            
+
         except Exception as e:
             raise NoValidContentError(f"Word文档处理失败: {str(e)}")
-    
-    def _extract_metadata(self, doc: Document) -> Dict:
+
+    def _extract_streaming(self, file_path: FileSource, budget: Optional[ContentBudget]):
+        """
+        直接从OOXML压缩包中流式提取元数据和内容
+
+        Args:
+            file_path: Word文档路径或二进制流
+            budget: 提取预算
+
+        Returns:
+            Tuple[Dict, List[Dict]]: 元数据和内容列表
+        """
+        with zipfile.ZipFile(file_path) as package:
+            style_levels = self._load_style_levels(package)
+            counters = {"paragraph_count": 0, "section_count": 0}
+            content = []
+
+            with package.open('word/document.xml') as document:
+                for item in self._iter_document(document, style_levels, counters):
+                    if budget is not None:
+                        item = budget.fit(item)
+                        if item is None:
+                            break
+                    content.append(item)
+
+            metadata = {
+                "author": "",
+                "created": "",
+                "modified": "",
+                "paragraph_count": counters["paragraph_count"],
+                "section_count": counters["section_count"]
+            }
+            metadata.update(self._read_core_properties(package))
+            if budget is not None and budget.truncated:
+                # 提前停止时段落数和节数只统计了已读取的部分
+                metadata["counts_partial"] = True
+        return metadata, content
+
+    def _load_style_levels(self, package: zipfile.ZipFile) -> Dict:
+        """
+        读取 styles.xml，建立段落样式ID到标题层级的映射
+
+        非标题样式映射为None；映射中的 None 键对应文档默认段落样式。
+
+        Args:
+            package: docx压缩包
+
+        Returns:
+            Dict: 样式ID -> 标题层级（非标题为None）
+        """
+        levels = {None: None}
+        if 'word/styles.xml' not in package.namelist():
+            return levels
+
+        with package.open('word/styles.xml') as styles:
+            for _, style in etree.iterparse(styles, events=('end',), tag=_w('style')):
+                if style.get(_w('type')) != 'paragraph':
+                    style.clear()
+                    continue
+                name_elem = style.find(_w('name'))
+                name = name_elem.get(_VAL, '') if name_elem is not None else ''
+                builtin = _BUILTIN_HEADING.match(name.lower())
+                if builtin:
+                    name = f"Heading {builtin.group(1)}"
+                level = None
+                if name.startswith('Heading'):
+                    level = int(name[-1]) if name[-1].isdigit() else 1
+                levels[style.get(_w('styleId'))] = level
+                if style.get(_w('default')) in ('1', 'true', 'on'):
+                    levels[None] = level
+                style.clear()
+        return levels
+
+    def _iter_document(self, document, style_levels: Dict, counters: Dict) -> Iterator[Dict]:
+        """
+        增量解析 document.xml，按文档顺序产出标题、段落和表格
+
+        Args:
+            document: document.xml 文件对象
+            style_levels: 样式ID到标题层级的映射
+            counters: 累计正文段落数和节数的字典
+
+        Yields:
+            Dict: 结构化内容项
+        """
+        current_section = None
+        depth = 0
+
+        for event, elem in etree.iterparse(document, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            # 只处理 w:body 的直接子元素（document=0, body=1, 正文元素=2）
+            if depth != 2:
+                continue
+
+            if elem.tag == _P:
+                counters["paragraph_count"] += 1
+                if elem.find(f'{_w("pPr")}/{_SECT_PR}') is not None:
+                    counters["section_count"] += 1
+                text = self._paragraph_text(elem).strip()
+                if text:
+                    level = self._paragraph_level(elem, style_levels)
+                    if level is not None:
+                        current_section = text
+                        yield {
+                            "section_title": text,
+                            "text": "",
+                            "content_type": "heading",
+                            "level": level
+                        }
+                    else:
+                        if current_section is None:
+                            current_section = "未命名章节"
+                        yield {
+                            "section_title": current_section,
+                            "text": text,
+                            "content_type": "paragraph"
+                        }
+            elif elem.tag == _TBL:
+                table_content = self._table_rows(elem)
+                if table_content:
+                    yield {
+                        "section_title": current_section or "未命名章节",
+                        "text": table_content,
+                        "content_type": "table"
+                    }
+            elif elem.tag == _SECT_PR:
+                counters["section_count"] += 1
+
+            # 释放已处理的正文元素及其之前的兄弟节点
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def _paragraph_level(self, paragraph, style_levels: Dict) -> Optional[int]:
+        """
+        获取段落的标题层级
+
+        Args:
+            paragraph: w:p 元素
+            style_levels: 样式ID到标题层级的映射
+
+        Returns:
+            Optional[int]: 标题层级，非标题段落返回None
+        """
+        style = paragraph.find(f'{_w("pPr")}/{_w("pStyle")}')
+        style_id = style.get(_VAL) if style is not None else None
+        if style_id not in style_levels:
+            style_id = None
+        return style_levels[style_id]
+
+    def _paragraph_text(self, paragraph) -> str:
+        """
+        拼接段落中文本运行（含超链接内的运行）的文字，规则与python-docx的 Paragraph.text 一致
+
+        Args:
+            paragraph: w:p 元素
+
+        Returns:
+            str: 段落文本
+        """
+        parts = []
+        for child in paragraph:
+            if child.tag == _R:
+                self._append_run_text(child, parts)
+            elif child.tag == _HYPERLINK:
+                for run in child.iterchildren(_R):
+                    self._append_run_text(run, parts)
+        return ''.join(parts)
+
+    def _append_run_text(self, run, parts: List[str]) -> None:
+        for child in run:
+            if child.tag == _T:
+                parts.append(child.text or '')
+            elif child.tag == _w('br'):
+                if child.get(_w('type'), 'textWrapping') == 'textWrapping':
+                    parts.append('\n')
+            elif child.tag in _RUN_TEXT:
+                parts.append(_RUN_TEXT[child.tag])
+
+    def _table_rows(self, table) -> List[List[str]]:
+        """
+        提取表格的单元格文本
+
+        横向合并的单元格按其跨越的列数重复，纵向合并的单元格沿用上方单元格的文本，
+        与python-docx的 row.cells 结果一致，但只需线性遍历一次。
+
+        Args:
+            table: w:tbl 元素
+
+        Returns:
+            List[List[str]]: 表格行列表
+        """
+        rows = []
+        column_text = {}
+        for row in table.iterchildren(_TR):
+            row_content = []
+            column = 0
+            for cell in row.iterchildren(_TC):
+                properties = cell.find(_w('tcPr'))
+                span = 1
+                continued = False
+                if properties is not None:
+                    grid_span = properties.find(_w('gridSpan'))
+                    if grid_span is not None:
+                        span = int(grid_span.get(_VAL, '1'))
+                    v_merge = properties.find(_w('vMerge'))
+                    continued = v_merge is not None and v_merge.get(_VAL, 'continue') == 'continue'
+
+                if continued and column in column_text:
+                    text = column_text[column]
+                else:
+                    text = '\n'.join(self._paragraph_text(p) for p in cell.iterchildren(_P)).strip()
+                for offset in range(span):
+                    column_text[column + offset] = text
+                    row_content.append(text)
+                column += span
+            rows.append(row_content)
+        return rows
+
+    def _read_core_properties(self, package: zipfile.ZipFile) -> Dict:
+        """
+        读取 docProps/core.xml 中的文档属性
+
+        Args:
+            package: docx压缩包
+
+        Returns:
+            Dict: 文档属性
+        """
+        if 'docProps/core.xml' not in package.namelist():
+            return {}
+
+        with package.open('docProps/core.xml') as core:
+            root = etree.parse(core).getroot()
+
+        def value(path: str) -> str:
+            elem = root.find(path, _CORE_NAMESPACES)
+            return (elem.text or '').strip() if elem is not None else ''
+
+        return {
+            "author": value('dc:creator'),
+            "created": self._format_w3cdtf(value('dcterms:created')),
+            "modified": self._format_w3cdtf(value('dcterms:modified')),
+            "title": value('dc:title'),
+            "subject": value('dc:subject'),
+            "keywords": value('cp:keywords')
+        }
+
+    def _format_w3cdtf(self, text: str) -> str:
+        """将W3CDTF时间格式化为与python-docx相同的字符串形式"""
+        if not text:
+            return ""
+        try:
+            return str(datetime.fromisoformat(text.replace('Z', '+00:00')))
+        except ValueError:
+            return text
+
+    def _extract_metadata(self, doc) -> Dict:
         """
         提取Word文档元数据
-        
+
         Args:
             doc: Document实例
-            
+
         Returns:
             Dict: 包含元数据的字典
         """
@@ -61,7 +380,7 @@ class DocExtractor(BaseExtractor):
             "paragraph_count": len(doc.paragraphs),
             "section_count": len(doc.sections)
         }
-        
+
         # 尝试从文档属性中获取更多信息
         core_properties = doc.core_properties
         if core_properties:
@@ -73,27 +392,27 @@ class DocExtractor(BaseExtractor):
                 "subject": core_properties.subject or "",
                 "keywords": core_properties.keywords or ""
             })
-        
+
         return metadata
-    
-    def _extract_content(self, doc: Document) -> List[Dict]:
+
+    def _extract_content(self, doc) -> List[Dict]:
         """
         提取Word文档内容
-        
+
         Args:
             doc: Document实例
-            
+
         Returns:
             List[Dict]: 包含内容的列表
         """
         content = []
         current_section = None
-        
+
         for para in doc.paragraphs:
             text = para.text.strip()
             if not text:
                 continue
-                
+
             # 检查是否是标题
             if para.style.name.startswith('Heading'):
                 current_section = text
@@ -119,7 +438,7 @@ class DocExtractor(BaseExtractor):
                         "text": text,
                         "content_type": "paragraph"
                     })
-        
+
         # 处理表格
         for table in doc.tables:
             table_content = []
@@ -128,24 +447,24 @@ class DocExtractor(BaseExtractor):
                 for cell in row.cells:
                     row_content.append(cell.text.strip())
                 table_content.append(row_content)
-            
+
             if table_content:
                 content.append({
                     "section_title": current_section or "未命名章节",
                     "text": table_content,
                     "content_type": "table"
                 })
-        
+
         return content
-    
+
     def _extract_key_points(self, content: List[Dict]) -> List[str]:
         """
         从内容中提取关键点
-        
+
         Args:
             content: 内容列表
-            
+
         Returns:
             List[str]: 关键点列表
         """
-        return [] # 将关键点提取逻辑清空，由AI模块负责 
\ No newline at end of file
+        return [] # 将关键点提取逻辑清空，由AI模块负责
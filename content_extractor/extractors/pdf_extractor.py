@@ -1,18 +1,101 @@
 import os
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from PyPDF2 import PdfReader
+from ..budget import ContentBudget
 from ..exceptions import NoValidContentError
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, FileSource, source_name
+
+PageSpec = Union[str, Sequence[Union[int, Tuple[int, int]]]]
+ChapterSpec = Union[str, Sequence[Union[int, str]]]
+
+
+def _extract_pages(file_path: str, indices: List[int]) -> List[Tuple[int, str]]:
+    """
+    在子进程中提取指定页的文本
+
+    每个子进程独立打开PDF，避免在进程间传递PdfReader对象。
+
+    Args:
+        file_path: PDF文件路径
+        indices: 页索引列表（从0开始）
+
+    Returns:
+        List[Tuple[int, str]]: (页码, 文本) 列表，页码从1开始
+    """
+    reader = PdfReader(file_path)
+    return [(index + 1, reader.pages[index].extract_text()) for index in indices]
+
+
+def parse_page_ranges(spec: PageSpec, page_count: int) -> List[int]:
+    """
+    解析页码范围
+
+    支持字符串形式（如 "1-5,8,12-"）或由页码、(起始页, 结束页) 元组组成的列表，
+    页码从1开始且包含两端，超出文档范围的页码会被忽略。
+
+    Args:
+        spec: 页码范围
+        page_count: 文档总页数
+
+    Returns:
+        List[int]: 去重并排序后的页索引列表（从0开始）
+    """
+    if isinstance(spec, str):
+        parts = [part.strip() for part in spec.split(',') if part.strip()]
+    else:
+        parts = list(spec)
+
+    indices = set()
+    for part in parts:
+        if isinstance(part, str):
+            if '-' in part:
+                start_text, end_text = part.split('-', 1)
+                start = int(start_text) if start_text.strip() else 1
+                end = int(end_text) if end_text.strip() else page_count
+            else:
+                start = end = int(part)
+        elif isinstance(part, (tuple, list)):
+            start, end = part
+        else:
+            start = end = int(part)
+        indices.update(range(max(start, 1) - 1, min(end, page_count)))
+    return sorted(indices)
+
 
 class PDFExtractor(BaseExtractor):
     """PDF文件内容提取器"""
+
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_pages: int = 32):
+        """
+        Args:
+            max_workers: 并行提取使用的进程数，默认读取环境变量 PDF_EXTRACT_WORKERS，
+                未设置时使用CPU核数；设置为1时始终串行提取
+            parallel_min_pages: 启用并行提取的最小页数，页数较少时进程池开销大于收益
+        """
+        super().__init__()
+        if max_workers is None:
+            max_workers = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+        self.max_workers = max(1, max_workers)
+        self.parallel_min_pages = parallel_min_pages
     
-    def extract(self, file_path: str) -> Dict:
+    def extract(self,
+                file_path: FileSource,
+                budget: Optional[ContentBudget] = None,
+                pages: Optional[PageSpec] = None,
+                chapters: Optional[ChapterSpec] = None,
+                sample_pages: Optional[int] = None) -> Dict:
         """
         从PDF文件中提取内容
         
         Args:
-            file_path: PDF文件路径
+            file_path: PDF文件路径或二进制流，二进制流只能串行提取
+            budget: 提取预算，用尽后停止读取后续页面
+            pages: 页码范围，如 "1-5,8"
+            chapters: 按目录书签选择章节，可为章节序号（从1开始）或标题关键字，
+                字符串形式以逗号分隔
+            sample_pages: 在选中的页面中均匀抽样的页数
             
         Returns:
             Dict: 包含提取内容的字典
@@ -22,9 +105,17 @@ class PDFExtractor(BaseExtractor):
             
             # 提取元数据
             metadata = self._extract_metadata(reader)
+
+            # 确定需要提取的页面
+            page_indices = self._select_pages(reader, pages, chapters, sample_pages)
             
             # 提取内容
-            content = self._extract_content(reader)
+            path = file_path if isinstance(file_path, str) else None
+            content = self._extract_content(reader, path, page_indices, budget)
+
+            if page_indices is not None or budget is not None:
+                metadata["extracted_pages"] = len({item["page_number"] for item in content})
+                metadata["truncated"] = bool(budget and budget.truncated)
             
             if not content:
                 raise NoValidContentError("无法从PDF中提取有效内容")
@@ -34,7 +125,7 @@ class PDFExtractor(BaseExtractor):
             
             return {
                 "source_type": "file",
-                "title": metadata.get("title", os.path.basename(file_path)),
+                "title": metadata.get("title", source_name(file_path)),
                 "metadata": metadata,
                 "content": content,
                 "key_points": key_points,
@@ -69,29 +160,155 @@ class PDFExtractor(BaseExtractor):
         
         return metadata
     
-    def _extract_content(self, reader: PdfReader) -> List[Dict]:
+    def _select_pages(self,
+                      reader: PdfReader,
+                      pages: Optional[PageSpec],
+                      chapters: Optional[ChapterSpec],
+                      sample_pages: Optional[int]) -> Optional[List[int]]:
+        """
+        根据页码范围、章节和抽样参数确定需要提取的页面
+
+        Args:
+            reader: PdfReader实例
+            pages: 页码范围
+            chapters: 章节选择
+            sample_pages: 抽样页数
+
+        Returns:
+            Optional[List[int]]: 页索引列表（从0开始），None表示提取全部页面
+        """
+        page_count = len(reader.pages)
+        selected = None
+
+        if pages:
+            selected = parse_page_ranges(pages, page_count)
+        if chapters:
+            chapter_pages = self._resolve_chapters(reader, chapters)
+            selected = chapter_pages if selected is None else sorted(set(selected) & set(chapter_pages))
+        if sample_pages and sample_pages > 0:
+            candidates = selected if selected is not None else list(range(page_count))
+            if sample_pages < len(candidates):
+                step = len(candidates) / sample_pages
+                selected = [candidates[int(i * step)] for i in range(sample_pages)]
+            else:
+                selected = candidates
+
+        if selected is not None and not selected:
+            raise NoValidContentError("所选页码范围或章节中没有可提取的页面")
+        return selected
+
+    def _resolve_chapters(self, reader: PdfReader, chapters: ChapterSpec) -> List[int]:
+        """
+        根据目录书签将章节选择解析为页索引
+
+        只使用顶层书签作为章节，每章从其书签所在页开始，到下一章的起始页之前结束。
+
+        Args:
+            reader: PdfReader实例
+            chapters: 章节序号（从1开始）或标题关键字
+
+        Returns:
+            List[int]: 页索引列表（从0开始）
+        """
+        outline = [item for item in reader.outline if not isinstance(item, list)]
+        if not outline:
+            raise NoValidContentError("PDF不包含目录书签，无法按章节提取")
+
+        page_count = len(reader.pages)
+        starts = [(reader.get_destination_page_number(item), str(item.title)) for item in outline]
+        starts.sort(key=lambda entry: entry[0])
+        chapter_ranges = []
+        for position, (start, title) in enumerate(starts):
+            end = starts[position + 1][0] if position + 1 < len(starts) else page_count
+            chapter_ranges.append((title, start, max(end, start + 1)))
+
+        if isinstance(chapters, str):
+            chapters = [part.strip() for part in chapters.split(',') if part.strip()]
+
+        indices = set()
+        for chapter in chapters:
+            if isinstance(chapter, int) or str(chapter).isdigit():
+                number = int(chapter)
+                matched = [chapter_ranges[number - 1]] if 1 <= number <= len(chapter_ranges) else []
+            else:
+                keyword = str(chapter).lower()
+                matched = [entry for entry in chapter_ranges if keyword in entry[0].lower()]
+            for _, start, end in matched:
+                indices.update(range(start, min(end, page_count)))
+        return sorted(indices)
+
+    def _extract_content(self,
+                         reader: PdfReader,
+                         file_path: Optional[str] = None,
+                         page_indices: Optional[List[int]] = None,
+                         budget: Optional[ContentBudget] = None) -> List[Dict]:
         """
         提取PDF内容
         
         Args:
             reader: PdfReader实例
+            file_path: PDF文件路径，提供时大文件会按页分发到进程池并行提取
+            page_indices: 需要提取的页索引，None表示全部页面
+            budget: 提取预算，设置后逐页串行提取并在预算用尽时停止
             
         Returns:
             List[Dict]: 包含内容的列表
         """
+        if page_indices is None:
+            page_indices = list(range(len(reader.pages)))
+
+        pages = None
+        if (budget is None and file_path and self.max_workers > 1
+                and len(page_indices) >= self.parallel_min_pages):
+            try:
+                pages = self._extract_pages_parallel(file_path, page_indices)
+            except (BrokenProcessPool, OSError):
+                # 无法创建子进程时（如受限的运行环境）回退到串行提取
+                pages = None
+        if pages is None:
+            # 生成器按需提取，预算用尽后不会再解析后续页面
+            pages = ((index + 1, reader.pages[index].extract_text()) for index in page_indices)
+
         content = []
         
-        for page_num, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            if text.strip():
-                content.append({
-                    "section_title": f"第{page_num}页",
-                    "text": text,
-                    "content_type": "paragraph",
-                    "page_number": page_num
-                })
+        for page_num, text in pages:
+            if not text.strip():
+                continue
+            if budget is not None:
+                text = budget.consume(text)
+                if text is None:
+                    break
+            content.append({
+                "section_title": f"第{page_num}页",
+                "text": text,
+                "content_type": "paragraph",
+                "page_number": page_num
+            })
         
         return content
+
+    def _extract_pages_parallel(self, file_path: str, page_indices: List[int]) -> List[Tuple[int, str]]:
+        """
+        将页面分批分发到进程池并行提取，结果保持原始页序
+
+        Args:
+            file_path: PDF文件路径
+            page_indices: 需要提取的页索引
+
+        Returns:
+            List[Tuple[int, str]]: 按页码排序的 (页码, 文本) 列表
+        """
+        workers = min(self.max_workers, len(page_indices))
+        # 批次数多于进程数，以平衡各页提取耗时的差异
+        chunk_size = max(1, -(-len(page_indices) // (workers * 4)))
+        batches = [page_indices[start:start + chunk_size] for start in range(0, len(page_indices), chunk_size)]
+
+        pages = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_extract_pages, file_path, batch) for batch in batches]
+            for future in futures:
+                pages.extend(future.result())
+        return pages
     
     def _extract_key_points(self, content: List[Dict]) -> List[str]:
         """
@@ -103,4 +320,4 @@ class PDFExtractor(BaseExtractor):
         Returns:
             List[str]: 关键点列表
         """
-        return [] # 将关键点提取逻辑清空，由AI模块负责 
\ No newline at end of file
+        return [] # 将关键点提取逻辑清空，由AI模块负责
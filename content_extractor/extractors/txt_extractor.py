@@ -1,72 +1,290 @@
+import codecs
+import io
 import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..budget import ContentBudget
 from ..exceptions import NoValidContentError
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, FileSource, source_name
+
+# 标题模式：(正则, 层级)，按顺序匹配，取第一个命中的层级
+HEADING_PATTERNS = [
+    # 中文章节标题
+    (r'^第[一二三四五六七八九十百千万]+[章节篇]', 1),
+    (r'^第[一二三四五六七八九十百千万]+[章节篇]\s+[^\n]+', 1),
+    # 数字编号标题
+    (r'^\d+\.\s+[^\n]+', 2),
+    (r'^\d+\.\d+\.\s+[^\n]+', 3),
+    # 英文标题
+    (r'^[A-Z][a-z]+\s+[^\n]+', 2),
+    (r'^[A-Z][A-Z\s]+$', 1),  # 全大写标题
+    # 中文编号标题
+    (r'^[一二三四五六七八九十]+、\s*[^\n]+', 2),
+    # 特殊标题格式
+    (r'^【[^】]+】', 2),
+    (r'^\[[^\]]+\]', 2),
+    (r'^（[^）]+）', 2),
+    (r'^\([^)]+\)', 2),
+]
+
+# 列表模式：(正则, 列表类型)，按顺序匹配，取第一个命中的类型
+LIST_PATTERNS = [
+    # 数字编号列表
+    (r'^\d+[\.、]\s*[^\n]+', 'number'),
+    # 字母编号列表
+    (r'^[a-z][\.、]\s*[^\n]+', 'alpha'),
+    (r'^[A-Z][\.、]\s*[^\n]+', 'alpha_upper'),
+    # 中文编号列表
+    (r'^[一二三四五六七八九十]+[\.、]\s*[^\n]+', 'chinese'),
+    # 项目符号列表
+    (r'^[•\-\*]\s*[^\n]+', 'bullet'),
+    # 其他列表标记
+    (r'^[○●◆◇■□]\s*[^\n]+', 'symbol'),
+]
+
+
+# 编码探测读取的样本大小
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# 流式读取的缓冲区大小
+READ_BUFFER_SIZE = 1024 * 1024
+
+# 带BOM的编码，UTF-32的BOM以UTF-16的BOM开头，需先判断
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# 无BOM、也不是以ASCII为主的UTF-16（例如中文），解码后常见字符（CJK统一汉字、
+# 中文标点、全角字符和ASCII）所占比例不低于此值时才认为是UTF-16
+_UTF16_TEXT_RATIO = 0.7
+_UTF16_COMMON_CHARS = re.compile(r'[\t\n\r\x20-\x7e\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]')
+
+
+def _guess_utf16(sample: bytes) -> Optional[str]:
+    """按解码后常见字符的比例判断无BOM的UTF-16字节序，都不像时返回None"""
+    if len(sample) < 4 or len(sample) % 2:
+        return None
+    best, best_ratio = None, _UTF16_TEXT_RATIO
+    for encoding in ('utf-16-le', 'utf-16-be'):
+        try:
+            text = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        if not text:
+            continue
+        ratio = len(_UTF16_COMMON_CHARS.findall(text)) / len(text)
+        if ratio >= best_ratio:
+            best, best_ratio = encoding, ratio
+    return best
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    根据文件开头的字节样本探测编码
+
+    依次检查BOM、以ASCII为主的无BOM UTF-16（按奇偶位置的零字节比例判断）、UTF-8、
+    其他无BOM的UTF-16（如中文，按解码后常见字符的比例判断），最后尝试GB18030（兼容GBK和GB2312）。样本末尾可能截断多字节字符，
+    因此使用增量解码器且不要求样本完整结束。
+
+    Args:
+        sample: 文件开头的字节样本
+
+    Returns:
+        str: 编码名称
+
+    Raises:
+        UnicodeDecodeError: 无法识别编码
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    if len(sample) >= 4:
+        even_zeros = sample[0::2].count(0)
+        odd_zeros = sample[1::2].count(0)
+        half = len(sample) // 2
+        if odd_zeros > half * 0.3 and even_zeros < half * 0.05:
+            return 'utf-16-le'
+        if even_zeros > half * 0.3 and odd_zeros < half * 0.05:
+            return 'utf-16-be'
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    utf16 = _guess_utf16(sample)
+    if utf16:
+        return utf16
+
+    codecs.getincrementaldecoder('gb18030')().decode(sample, final=False)
+    return 'gb18030'
+
+
+class TextStats:
+    """流式读取过程中累计的文本统计信息"""
+
+    def __init__(self):
+        self.first_line = None
+        self.newline_count = 0
+        self.non_empty_lines = 0
+        self.word_count = 0
+
+    def add_line(self, line: str) -> None:
+        """
+        累计一行的统计信息
+
+        Args:
+            line: 行文本（行尾保留换行符）
+        """
+        if self.first_line is None:
+            self.first_line = line.rstrip('\n')
+        if line.endswith('\n'):
+            self.newline_count += 1
+        if line.strip():
+            self.non_empty_lines += 1
+            self.word_count += len(line.split())
+
+    @property
+    def total_lines(self) -> int:
+        """总行数，与按换行符分割的结果一致"""
+        return self.newline_count + 1
+
+
+class LineClassifier:
+    """
+    预编译的文本行分类器
+
+    将全部标题模式和列表模式各合并为一个带命名分组的正则，
+    一次匹配即可得到标题层级或列表类型，分组顺序与模式列表一致，
+    因此与逐个模式依次匹配的结果相同。
+    """
+
+    # 标题不以这些标点结尾
+    _HEADING_END_PUNCTUATION = frozenset('。，！？')
+
+    def __init__(self, heading_patterns=HEADING_PATTERNS, list_patterns=LIST_PATTERNS):
+        self._heading_levels = {}
+        heading_groups = []
+        for index, (pattern, level) in enumerate(heading_patterns):
+            name = f"h{index}"
+            self._heading_levels[name] = level
+            heading_groups.append(f"(?P<{name}>{pattern[1:]})")
+        self._heading_re = re.compile('^(?:' + '|'.join(heading_groups) + ')')
+
+        self._list_types = {}
+        list_groups = []
+        for index, (pattern, list_type) in enumerate(list_patterns):
+            name = f"l{index}"
+            self._list_types[name] = list_type
+            list_groups.append(f"(?P<{name}>{pattern[1:]})")
+        self._list_re = re.compile('^(?:' + '|'.join(list_groups) + ')')
+
+        # 列表标记：可选的编号加可选的项目符号
+        self._marker_re = re.compile(r'^(?:[\d一二三四五六七八九十]+[\.、])?(?:[•\-\*○●◆◇■□]\s*)?')
+
+    def classify(self, text: str) -> Tuple[str, Optional[int], Optional[str], str]:
+        """
+        对段落或行进行一次性分类
+
+        Args:
+            text: 去除首尾空白后的文本
+
+        Returns:
+            Tuple[str, Optional[int], Optional[str], str]: (类型, 标题层级, 列表类型, 正文)，
+            类型为 'heading'、'list' 或 'paragraph'，列表项的正文已去除编号和项目符号
+        """
+        match = self._list_re.match(text)
+        if match:
+            return 'list', None, self._list_types[match.lastgroup], self.strip_marker(text)
+
+        # 标题通常较短，且不以标点符号结尾
+        if len(text) <= 100 and text[-1] not in self._HEADING_END_PUNCTUATION:
+            match = self._heading_re.match(text)
+            if match:
+                return 'heading', self._heading_levels[match.lastgroup], None, text
+
+        return 'paragraph', None, None, text
+
+    def strip_marker(self, text: str) -> str:
+        """
+        移除列表项开头的编号和项目符号
+
+        Args:
+            text: 列表项文本
+
+        Returns:
+            str: 去除标记后的文本
+        """
+        return text[self._marker_re.match(text).end():].strip()
+
+
+class _NonClosingReader(io.RawIOBase):
+    """包装调用方传入的二进制流，关闭文本包装层时不关闭原始流"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
 
 class TXTExtractor(BaseExtractor):
     """文本文件内容提取器"""
-    
-    def __init__(self):
-        super().__init__()
-        # 定义标题模式
-        self.heading_patterns = [
-            # 中文章节标题
-            (r'^第[一二三四五六七八九十百千万]+[章节篇]', 1),
-            (r'^第[一二三四五六七八九十百千万]+[章节篇]\s+[^\n]+', 1),
-            # 数字编号标题
-            (r'^\d+\.\s+[^\n]+', 2),
-            (r'^\d+\.\d+\.\s+[^\n]+', 3),
-            # 英文标题
-            (r'^[A-Z][a-z]+\s+[^\n]+', 2),
-            (r'^[A-Z][A-Z\s]+$', 1),  # 全大写标题
-            # 中文编号标题
-            (r'^[一二三四五六七八九十]+、\s*[^\n]+', 2),
-            # 特殊标题格式
-            (r'^【[^】]+】', 2),
-            (r'^\[[^\]]+\]', 2),
-            (r'^（[^）]+）', 2),
-            (r'^\([^)]+\)', 2),
-        ]
-        
-        # 定义列表模式
-        self.list_patterns = [
-            # 数字编号列表
-            (r'^\d+[\.、]\s*[^\n]+', 'number'),
-            # 字母编号列表
-            (r'^[a-z][\.、]\s*[^\n]+', 'alpha'),
-            (r'^[A-Z][\.、]\s*[^\n]+', 'alpha_upper'),
-            # 中文编号列表
-            (r'^[一二三四五六七八九十]+[\.、]\s*[^\n]+', 'chinese'),
-            # 项目符号列表
-            (r'^[•\-\*]\s*[^\n]+', 'bullet'),
-            # 其他列表标记
-            (r'^[○●◆◇■□]\s*[^\n]+', 'symbol'),
-        ]
-
-    def extract(self, file_path: str) -> Dict:
+
+    # 2: 元数据增加 encoding，统计信息改为流式累计，识别无BOM的中文UTF-16
+    version = "2"
+
+    classifier = LineClassifier()
+
+    def extract(self, file_path: FileSource, budget: Optional[ContentBudget] = None) -> Dict:
         """
         从文本文件中提取内容
+
+        文件按缓冲块流式读取，统计信息与段落划分在同一遍扫描中完成，
+        设置预算时读满即停止，不会读取文件剩余部分。
         
         Args:
-            file_path: 文本文件路径
+            file_path: 文本文件路径或二进制流
+            budget: 提取预算，用尽后不再返回后续内容
             
         Returns:
             Dict: 包含提取内容的字典
         """
         try:
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            encoding = self.detect_file_encoding(file_path)
+            stats = TextStats()
+            structured_content = []
+
+            items = self.iter_content(file_path, encoding=encoding, stats=stats)
+            try:
+                for item in items:
+                    if budget is not None:
+                        item = budget.fit(item)
+                        if item is None:
+                            break
+                    structured_content.append(item)
+            finally:
+                items.close()
             
-            if not content.strip():
+            if stats.non_empty_lines == 0:
                 raise NoValidContentError("文件内容为空")
             
             # 提取元数据
-            metadata = self._extract_metadata(file_path, content)
-            
-            # 提取内容
-            structured_content = self._extract_content(content)
+            metadata = self._extract_metadata(file_path, stats)
+            metadata["encoding"] = encoding
+            if budget is not None:
+                metadata["truncated"] = budget.truncated
             
             if not structured_content:
                 raise NoValidContentError("无法从文本文件中提取有效内容")
@@ -76,7 +294,7 @@ class TXTExtractor(BaseExtractor):
             
             return {
                 "source_type": "file",
-                "title": metadata.get("title", os.path.basename(file_path)),
+                "title": metadata.get("title", source_name(file_path)),
                 "metadata": metadata,
                 "content": structured_content,
                 "key_points": key_points,
@@ -84,42 +302,88 @@ class TXTExtractor(BaseExtractor):
             }
             
         except UnicodeDecodeError:
-            raise NoValidContentError("文件编码不是UTF-8，请确保文件使用UTF-8编码")
+            raise NoValidContentError("无法识别文件编码，请使用UTF-8、UTF-16或GBK/GB18030编码")
         except Exception as e:
             raise NoValidContentError(f"文本文件处理失败: {str(e)}")
+
+    def detect_file_encoding(self, file_path: FileSource) -> str:
+        """
+        读取文件开头的样本探测文件编码
+
+        Args:
+            file_path: 文件路径或二进制流
+
+        Returns:
+            str: 编码名称
+        """
+        if not isinstance(file_path, str):
+            file_path.seek(0)
+            return detect_encoding(file_path.read(ENCODING_SAMPLE_SIZE))
+        with open(file_path, 'rb') as f:
+            return detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+
+    def iter_content(self,
+                     file_path: FileSource,
+                     encoding: Optional[str] = None,
+                     stats: Optional['TextStats'] = None) -> Iterator[Dict]:
+        """
+        流式提取文本文件内容，逐个产出结构化内容项
+
+        Args:
+            file_path: 文件路径或二进制流
+            encoding: 文件编码，None时自动探测
+            stats: 统计信息对象，读取过程中同步累计行数和词数
+
+        Yields:
+            Dict: 结构化内容项
+        """
+        encoding = encoding or self.detect_file_encoding(file_path)
+        if isinstance(file_path, str):
+            with open(file_path, 'r', encoding=encoding, buffering=READ_BUFFER_SIZE) as f:
+                yield from self._structure_paragraphs(self._iter_paragraphs(f, stats))
+            return
+
+        file_path.seek(0)
+        text = io.TextIOWrapper(io.BufferedReader(_NonClosingReader(file_path), READ_BUFFER_SIZE), encoding=encoding)
+        try:
+            yield from self._structure_paragraphs(self._iter_paragraphs(text, stats))
+        finally:
+            text.close()
     
-    def _extract_metadata(self, file_path: str, content: str) -> Dict:
+    def _extract_metadata(self, file_path: FileSource, stats: 'TextStats') -> Dict:
         """
         提取文本文件元数据
         
         Args:
-            file_path: 文件路径
-            content: 文件内容
+            file_path: 文件路径或二进制流
+            stats: 读取过程中累计的统计信息
             
         Returns:
             Dict: 包含元数据的字典
         """
-        # 获取文件基本信息
-        file_stats = os.stat(file_path)
+        # 获取文件基本信息，内存中的二进制流没有文件时间
+        if isinstance(file_path, str):
+            file_stats = os.stat(file_path)
+            file_size = file_stats.st_size
+            created_time, modified_time = str(file_stats.st_ctime), str(file_stats.st_mtime)
+        else:
+            file_size = file_path.seek(0, io.SEEK_END)
+            created_time = modified_time = ""
         
         # 尝试从内容中提取标题
-        title = os.path.basename(file_path)
-        first_line = content.split('\n')[0].strip()
+        title = source_name(file_path)
+        first_line = stats.first_line.strip()
         if len(first_line) <= 100:  # 假设标题不会太长
             title = first_line
         
-        # 计算基本统计信息
-        lines = content.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
-        
         return {
             "title": title,
-            "file_size": file_stats.st_size,
-            "created_time": str(file_stats.st_ctime),
-            "modified_time": str(file_stats.st_mtime),
-            "total_lines": len(lines),
-            "non_empty_lines": len(non_empty_lines),
-            "word_count": len(content.split())
+            "file_size": file_size,
+            "created_time": created_time,
+            "modified_time": modified_time,
+            "total_lines": stats.total_lines,
+            "non_empty_lines": stats.non_empty_lines,
+            "word_count": stats.word_count
         }
     
     def _extract_content(self, content: str) -> List[Dict]:
@@ -132,108 +396,74 @@ class TXTExtractor(BaseExtractor):
         Returns:
             List[Dict]: 包含内容的列表
         """
-        structured_content = []
+        return list(self._structure_paragraphs(self._iter_paragraphs(io.StringIO(content))))
+
+    def _iter_paragraphs(self, lines: Iterable[str], stats: Optional['TextStats'] = None) -> Iterator[str]:
+        """
+        按空行划分段落，同时累计统计信息
+
+        Args:
+            lines: 逐行读取的文本（行尾保留换行符）
+            stats: 统计信息对象
+
+        Yields:
+            str: 去除首尾空白后的段落
+        """
+        buffer = []
+        for line in lines:
+            if stats is not None:
+                stats.add_line(line)
+            text = line[:-1] if line.endswith('\n') else line
+            if text:
+                buffer.append(text)
+            elif buffer:
+                para = '\n'.join(buffer).strip()
+                buffer = []
+                if para:
+                    yield para
+        if buffer:
+            para = '\n'.join(buffer).strip()
+            if para:
+                yield para
+
+    def _structure_paragraphs(self, paragraphs: Iterable[str]) -> Iterator[Dict]:
+        """
+        将段落分类为标题、列表或普通段落
+
+        Args:
+            paragraphs: 段落序列
+
+        Yields:
+            Dict: 结构化内容项
+        """
         current_section = "未命名章节"
-        current_list = None
-        
-        # 分割成段落
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
         
         for para in paragraphs:
-            # 检查是否是标题
-            if self._is_heading(para):
+            kind, level, _, _ = self.classifier.classify(para)
+            if kind == 'heading':
                 current_section = para
-                structured_content.append({
+                yield {
                     "section_title": para,
                     "text": "",
                     "content_type": "heading",
-                    "level": self._get_heading_level(para)
-                })
-                current_list = None
-            else:
-                # 检查是否是列表项
-                if self._is_list_item(para):
-                    items = self._extract_list_items(para)
-                    if items:
-                        structured_content.append({
-                            "section_title": current_section,
-                            "text": items,
-                            "content_type": "list",
-                            "list_type": items[0]['type']
-                        })
-                else:
-                    # 普通段落
-                    structured_content.append({
+                    "level": level
+                }
+            elif kind == 'list':
+                items = self._extract_list_items(para)
+                if items:
+                    yield {
                         "section_title": current_section,
-                        "text": para,
-                        "content_type": "paragraph"
-                    })
-        
-        return structured_content
-    
-    def _is_heading(self, text: str) -> bool:
-        """
-        判断文本是否是标题
-        
-        Args:
-            text: 要检查的文本
-            
-        Returns:
-            bool: 是否是标题
-        """
-        # 标题通常较短，且不以标点符号结尾
-        if len(text) > 100 or text[-1] in '。，！？':
-            return False
-            
-        # 检查是否是列表项（避免将列表项误识别为标题）
-        if self._is_list_item(text):
-            return False
-            
-        # 检查标题模式
-        return any(re.match(pattern, text) for pattern, _ in self.heading_patterns)
-    
-    def _get_heading_level(self, text: str) -> int:
-        """
-        获取标题的层级
-        
-        Args:
-            text: 标题文本
-            
-        Returns:
-            int: 标题层级（1-3）
-        """
-        for pattern, level in self.heading_patterns:
-            if re.match(pattern, text):
-                return level
-        return 1
-    
-    def _is_list_item(self, text: str) -> bool:
-        """
-        判断文本是否是列表项
-        
-        Args:
-            text: 要检查的文本
-            
-        Returns:
-            bool: 是否是列表项
-        """
-        # 检查列表模式
-        return any(re.match(pattern, text) for pattern, _ in self.list_patterns)
-    
-    def _get_list_type(self, text: str) -> str:
-        """
-        获取列表类型
-        
-        Args:
-            text: 列表项文本
-            
-        Returns:
-            str: 列表类型
-        """
-        for pattern, list_type in self.list_patterns:
-            if re.match(pattern, text):
-                return list_type
-        return 'unknown'
+                        "text": items,
+                        "content_type": "list",
+                        "list_type": items[0]['type']
+                    }
+            else:
+                # 普通段落
+                yield {
+                    "section_title": current_section,
+                    "text": para,
+                    "content_type": "paragraph"
+                }
     
     def _extract_list_items(self, text: str) -> List[Dict]:
         """
@@ -245,25 +475,17 @@ class TXTExtractor(BaseExtractor):
         Returns:
             List[Dict]: 列表项列表，包含类型信息
         """
-        # 分割成行
-        lines = text.split('\n')
         items = []
-        current_type = None
         
-        for line in lines:
+        for line in text.split('\n'):
             line = line.strip()
             if not line:
                 continue
                 
-            # 获取列表类型
-            list_type = self._get_list_type(line)
-            if list_type != 'unknown':
-                current_type = list_type
-                # 移除列表标记
-                item = re.sub(r'^[\d一二三四五六七八九十]+[\.、]', '', line)
-                item = re.sub(r'^[•\-\*○●◆◇■□]\s*', '', item)
+            kind, _, list_type, item = self.classifier.classify(line)
+            if kind == 'list':
                 items.append({
-                    'text': item.strip(),
+                    'text': item,
                     'type': list_type
                 })
         
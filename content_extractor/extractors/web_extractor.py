@@ -1,16 +1,39 @@
+import hashlib
 import re
 import requests
-from typing import Dict, List, Optional
+import lxml.html
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Mapping, Optional
 from readability import Document
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from ..budget import ContentBudget
+from ..cache import DiskCache
 from ..exceptions import NoValidContentError, AccessDeniedError
 from .base_extractor import BaseExtractor
 
+_HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_MAIN_CLASS_PATTERN = re.compile(r'content|main|article', re.I)
+# 与readability一致：统一按UTF-8解析，避免带编码声明的字符串被lxml拒绝
+_UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
 class WebExtractor(BaseExtractor):
     """网页内容提取器"""
+
+    # 2: 内容按文档顺序输出，解析改用lxml
+    version = "2"
     
-    def __init__(self):
+    def __init__(self,
+                 pool_maxsize: int = 10,
+                 http_cache_dir: Optional[str] = None,
+                 http_cache_max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            pool_maxsize: 每个主机保持的最大连接数
+            http_cache_dir: HTTP缓存目录，设置后根据 ETag / Last-Modified 发送条件请求，
+                服务器返回304时直接复用上次的提取结果
+            http_cache_max_bytes: HTTP缓存目录的最大总字节数
+        """
         super().__init__()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -21,13 +44,22 @@ class WebExtractor(BaseExtractor):
             'Upgrade-Insecure-Requests': '1'
         }
         self.timeout = 30  # 增加超时时间
+
+        # 所有请求共用一个会话，复用keep-alive连接和TLS会话
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.http_cache = DiskCache(http_cache_dir, http_cache_max_bytes) if http_cache_dir else None
         
-    def extract(self, url: str) -> Dict:
+    def extract(self, url: str, budget: Optional[ContentBudget] = None) -> Dict:
         """
         从URL提取网页内容
         
         Args:
             url: 网页URL
+            budget: 提取预算，用尽后不再返回后续内容
             
         Returns:
             Dict: 包含提取内容的字典
@@ -40,45 +72,23 @@ class WebExtractor(BaseExtractor):
             # 验证URL格式
             if not self._is_valid_url(url):
                 raise NoValidContentError("无效的URL格式")
+
+            cache_key = self._cache_key(url)
+            cached = self._get_cached(cache_key)
             
             # 获取网页内容
-            response = self._fetch_url(url)
+            response = self._fetch_url(url, cached)
             if not response:
                 raise NoValidContentError("无法获取网页内容")
-            
-            # 使用readability提取主要内容
-            doc = Document(response.text)
-            title = doc.title()
-            content = doc.summary()
-            
-            # 使用BeautifulSoup解析内容
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # 提取元数据
-            metadata = self._extract_metadata(soup, response)
-            
-            # 提取结构化内容
-            structured_content = self._extract_content(soup)
-            
-            # 如果没有提取到内容，尝试直接从原始HTML提取
-            if not structured_content:
-                structured_content = self._extract_from_raw_html(response.text)
-            
-            # 提取关键点
-            key_points = self._extract_key_points(structured_content)
-            
-            # 检查内容是否为空
-            if not structured_content:
-                raise NoValidContentError("无法提取有效内容")
-            
-            return {
-                "source_type": "web",
-                "title": title,
-                "metadata": metadata,
-                "content": structured_content,
-                "key_points": key_points,
-                "cautions": "网页内容可能包含广告或其他无关内容"
-            }
+
+            if response.status_code == 304 and cached:
+                # 内容未变化，复用上次的提取结果
+                result = cached["result"]
+            else:
+                result = self._build_result(response)
+                self._store_cached(cache_key, response.headers, result)
+
+            return self.apply_budget(result, budget)
             
         except requests.exceptions.RequestException as e:
             if "403" in str(e):
@@ -86,6 +96,137 @@ class WebExtractor(BaseExtractor):
             raise NoValidContentError(f"获取网页内容失败: {str(e)}")
         except Exception as e:
             raise NoValidContentError(f"提取内容失败: {str(e)}")
+
+    def _build_result(self, response: requests.Response) -> Dict:
+        """
+        解析网页响应并构建提取结果
+
+        Args:
+            response: 响应对象
+
+        Returns:
+            Dict: 包含提取内容的字典
+        """
+        return self.parse_document(response.text, response.url, response.headers, response.encoding)
+
+    def parse_document(self,
+                       html: str,
+                       url: str,
+                       headers: Optional[Mapping[str, str]] = None,
+                       encoding: Optional[str] = None) -> Dict:
+        """
+        解析已获取的网页HTML并构建提取结果，不发起网络请求，可供其他HTTP客户端复用
+
+        Args:
+            html: 网页HTML文本
+            url: 网页最终URL
+            headers: 响应头
+            encoding: 响应文本编码
+
+        Returns:
+            Dict: 包含提取内容的字典
+
+        Raises:
+            NoValidContentError: 无法提取有效内容
+        """
+        # 原始HTML只解析一次，直接交给readability；readability会修改这棵树
+        # （删除隐藏元素、改写节点），少数需要兜底提取的页面再重新解析一次
+        root = self._parse_html(html)
+
+        # 使用readability提取主要内容
+        doc = Document(root)
+        title = doc.title()
+        summary = lxml.html.document_fromstring(doc.summary())
+        
+        # 提取元数据
+        metadata = self._extract_metadata(summary, url, headers or {}, encoding)
+        
+        # 提取结构化内容
+        structured_content = self._extract_content(summary)
+        
+        # 如果没有提取到内容，尝试直接从原始HTML提取
+        if not structured_content:
+            structured_content = self._extract_from_raw_html(self._parse_html(html))
+        
+        # 提取关键点
+        key_points = self._extract_key_points(structured_content)
+        
+        # 检查内容是否为空
+        if not structured_content:
+            raise NoValidContentError("无法提取有效内容")
+        
+        return {
+            "source_type": "web",
+            "title": title,
+            "metadata": metadata,
+            "content": structured_content,
+            "key_points": key_points,
+            "cautions": "网页内容可能包含广告或其他无关内容"
+        }
+
+    def apply_budget(self, result: Dict, budget: Optional[ContentBudget]) -> Dict:
+        """
+        按预算裁剪提取结果
+
+        Args:
+            result: 提取结果
+            budget: 提取预算，None表示不裁剪
+
+        Returns:
+            Dict: 裁剪后的提取结果
+
+        Raises:
+            NoValidContentError: 裁剪后没有剩余内容
+        """
+        if budget is not None:
+            result["content"] = budget.trim(result["content"])
+            result["metadata"]["truncated"] = budget.truncated
+            if not result["content"]:
+                raise NoValidContentError("无法提取有效内容")
+        return result
+
+    def _cache_key(self, url: str) -> str:
+        """URL对应的HTTP缓存键"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _get_cached(self, cache_key: str) -> Optional[Dict]:
+        """
+        读取URL对应的HTTP缓存条目，提取器版本不一致的条目视为无效
+
+        Args:
+            cache_key: 缓存键
+
+        Returns:
+            Optional[Dict]: 包含验证器和提取结果的缓存条目
+        """
+        if self.http_cache is None:
+            return None
+        cached = self.http_cache.get(cache_key)
+        if not cached or cached.get("version") != self.version:
+            return None
+        return cached
+
+    def _store_cached(self, cache_key: str, headers: Mapping[str, str], result: Dict) -> None:
+        """
+        保存验证器和提取结果，服务器未提供 ETag 和 Last-Modified 时不缓存
+
+        Args:
+            cache_key: 缓存键
+            headers: 响应头
+            result: 提取结果
+        """
+        if self.http_cache is None:
+            return
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+        if not etag and not last_modified:
+            return
+        self.http_cache.set(cache_key, {
+            "version": self.version,
+            "etag": etag,
+            "last_modified": last_modified,
+            "result": result
+        })
     
     def _is_valid_url(self, url: str) -> bool:
         """
@@ -103,167 +244,152 @@ class WebExtractor(BaseExtractor):
         except:
             return False
     
-    def _fetch_url(self, url: str) -> Optional[requests.Response]:
+    def conditional_headers(self, cached: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        构建请求头，存在HTTP缓存条目时附带条件请求头
+
+        Args:
+            cached: HTTP缓存条目
+
+        Returns:
+            Dict[str, str]: 请求头
+        """
+        headers = dict(self.headers)
+        if cached:
+            if cached.get("etag"):
+                headers['If-None-Match'] = cached["etag"]
+            if cached.get("last_modified"):
+                headers['If-Modified-Since'] = cached["last_modified"]
+        return headers
+
+    def _fetch_url(self, url: str, cached: Optional[Dict] = None) -> Optional[requests.Response]:
         """
         获取网页内容
         
         Args:
             url: 网页URL
+            cached: HTTP缓存条目，提供时附带条件请求头
             
         Returns:
-            Optional[requests.Response]: 响应对象
+            Optional[requests.Response]: 响应对象，内容未变化时状态码为304
         """
-        session = requests.Session()
-        response = session.get(url, headers=self.headers, timeout=self.timeout)
+        response = self.session.get(url, headers=self.conditional_headers(cached), timeout=self.timeout)
         response.raise_for_status()
         return response
     
-    def _extract_metadata(self, soup: BeautifulSoup, response: requests.Response) -> Dict:
+    def _parse_html(self, html: str) -> lxml.html.HtmlElement:
+        """
+        使用lxml解析HTML文本
+
+        Args:
+            html: HTML内容
+
+        Returns:
+            lxml.html.HtmlElement: 文档根节点
+        """
+        return lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=_UTF8_PARSER)
+
+    def _extract_metadata(self,
+                          root: lxml.html.HtmlElement,
+                          url: str,
+                          headers: Mapping[str, str],
+                          encoding: Optional[str]) -> Dict:
         """
         提取网页元数据
         
         Args:
-            soup: BeautifulSoup对象
-            response: 响应对象
+            root: 文档根节点
+            url: 网页最终URL
+            headers: 响应头
+            encoding: 响应文本编码
             
         Returns:
             Dict: 元数据字典
         """
         metadata = {
-            "url": response.url,
-            "domain": urlparse(response.url).netloc,
-            "content_type": response.headers.get('content-type', ''),
-            "last_modified": response.headers.get('last-modified', ''),
-            "encoding": response.encoding
+            "url": url,
+            "domain": urlparse(url).netloc,
+            "content_type": headers.get('content-type', ''),
+            "last_modified": headers.get('last-modified', ''),
+            "encoding": encoding
         }
         
         # 提取meta标签信息
-        meta_tags = soup.find_all('meta')
-        for tag in meta_tags:
+        for tag in root.iter('meta'):
             if tag.get('name') and tag.get('content'):
-                metadata[tag['name']] = tag['content']
+                metadata[tag.get('name')] = tag.get('content')
             elif tag.get('property') and tag.get('content'):
-                metadata[tag['property']] = tag['content']
+                metadata[tag.get('property')] = tag.get('content')
         
         # 提取文章信息
-        article = soup.find('article')
-        if article:
+        article = next(root.iter('article'), None)
+        if article is not None:
             metadata['has_article'] = True
-            metadata['article_class'] = article.get('class', [])
+            metadata['article_class'] = article.get('class', '').split()
         
         return metadata
     
-    def _extract_content(self, soup: BeautifulSoup) -> List[Dict]:
+    @staticmethod
+    def _element_text(element: lxml.html.HtmlElement) -> str:
         """
-        提取结构化内容
-        
+        获取元素内全部文本，每段文本去除首尾空白后直接拼接
+
         Args:
-            soup: BeautifulSoup对象
-            
+            element: lxml元素
+
         Returns:
-            List[Dict]: 结构化内容列表
+            str: 元素文本
         """
-        structured_content = []
-        current_section = "正文"
-        
-        # 处理标题
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            level = int(heading.name[1])
-            text = heading.get_text(strip=True)
-            if text:
-                structured_content.append({
-                    "section_title": text,
-                    "text": "",
-                    "content_type": "heading",
-                    "level": level
-                })
-                current_section = text
-        
-        # 处理段落
-        for p in soup.find_all('p'):
-            text = p.get_text(strip=True)
-            if text and len(text) > 10:  # 过滤短文本
-                structured_content.append({
-                    "section_title": current_section,
-                    "text": text,
-                    "content_type": "paragraph"
-                })
-        
-        # 处理列表
-        for ul in soup.find_all(['ul', 'ol']):
-            items = []
-            for li in ul.find_all('li'):
-                text = li.get_text(strip=True)
-                if text:
-                    items.append({
-                        "text": text,
-                        "type": "bullet" if ul.name == 'ul' else "number"
-                    })
-            
-            if items:
-                structured_content.append({
-                    "section_title": current_section,
-                    "text": items,
-                    "content_type": "list",
-                    "list_type": "bullet" if ul.name == 'ul' else "number"
-                })
-        
-        return structured_content
-    
-    def _extract_from_raw_html(self, html: str) -> List[Dict]:
+        return ''.join(text.strip() for text in element.itertext())
+
+    def _extract_content(self, root: lxml.html.HtmlElement) -> List[Dict]:
         """
-        从原始HTML提取内容
+        按文档顺序单次遍历提取结构化内容
         
         Args:
-            html: HTML内容
+            root: 文档或内容区域的根节点
             
         Returns:
             List[Dict]: 结构化内容列表
         """
-        soup = BeautifulSoup(html, 'html.parser')
         structured_content = []
         current_section = "正文"
         
-        # 移除脚本和样式
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # 查找主要内容区域
-        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main|article', re.I))
-        
-        if main_content:
-            # 处理标题
-            for heading in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                level = int(heading.name[1])
-                text = heading.get_text(strip=True)
+        for element in root.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                # 跳过注释和处理指令
+                continue
+
+            if tag in _HEADING_TAGS:
+                text = self._element_text(element)
                 if text:
                     structured_content.append({
                         "section_title": text,
                         "text": "",
                         "content_type": "heading",
-                        "level": level
+                        "level": _HEADING_TAGS[tag]
                     })
                     current_section = text
-            
-            # 处理段落
-            for p in main_content.find_all('p'):
-                text = p.get_text(strip=True)
-                if text and len(text) > 10:
+
+            elif tag == 'p':
+                text = self._element_text(element)
+                if text and len(text) > 10:  # 过滤短文本
                     structured_content.append({
                         "section_title": current_section,
                         "text": text,
                         "content_type": "paragraph"
                     })
-            
-            # 处理列表
-            for ul in main_content.find_all(['ul', 'ol']):
+
+            elif tag in ('ul', 'ol'):
+                list_type = "bullet" if tag == 'ul' else "number"
                 items = []
-                for li in ul.find_all('li'):
-                    text = li.get_text(strip=True)
+                for li in element.iter('li'):
+                    text = self._element_text(li)
                     if text:
                         items.append({
                             "text": text,
-                            "type": "bullet" if ul.name == 'ul' else "number"
+                            "type": list_type
                         })
                 
                 if items:
@@ -271,11 +397,39 @@ class WebExtractor(BaseExtractor):
                         "section_title": current_section,
                         "text": items,
                         "content_type": "list",
-                        "list_type": "bullet" if ul.name == 'ul' else "number"
+                        "list_type": list_type
                     })
         
         return structured_content
     
+    def _extract_from_raw_html(self, root: lxml.html.HtmlElement) -> List[Dict]:
+        """
+        从原始HTML提取内容
+        
+        Args:
+            root: 原始HTML的文档根节点
+            
+        Returns:
+            List[Dict]: 结构化内容列表
+        """
+        # 移除脚本和样式
+        for element in list(root.iter('script', 'style')):
+            element.drop_tree()
+        
+        # 查找主要内容区域
+        main_content = next(root.iter('main'), None)
+        if main_content is None:
+            main_content = next(root.iter('article'), None)
+        if main_content is None:
+            main_content = next(
+                (div for div in root.iter('div') if _MAIN_CLASS_PATTERN.search(div.get('class', ''))),
+                None
+            )
+        
+        if main_content is None:
+            return []
+        return self._extract_content(main_content)
+    
     def _extract_key_points(self, content: List[Dict]) -> List[str]:
         """
         提取关键点
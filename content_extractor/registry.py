@@ -0,0 +1,96 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+# 提取器目标可以是 "模块路径:类名" 字符串，也可以是类或工厂函数
+ExtractorTarget = Union[str, Callable[..., Any]]
+
+# 内置提取器，按需导入对应模块，避免启动时加载PyPDF2、lxml等依赖
+DEFAULT_EXTRACTORS = {
+    '.pdf': 'content_extractor.extractors.pdf_extractor:PDFExtractor',
+    '.docx': 'content_extractor.extractors.doc_extractor:DocExtractor',
+    '.doc': 'content_extractor.extractors.doc_extractor:DocExtractor',
+    '.txt': 'content_extractor.extractors.txt_extractor:TXTExtractor',
+}
+WEB_EXTRACTOR = 'content_extractor.extractors.web_extractor:WebExtractor'
+
+
+def load_target(target: ExtractorTarget) -> Callable[..., Any]:
+    """
+    解析提取器目标
+
+    Args:
+        target: "模块路径:类名" 字符串，或可直接调用的类/工厂函数
+
+    Returns:
+        Callable: 提取器类或工厂函数
+    """
+    if not isinstance(target, str):
+        return target
+    module_name, _, attr = target.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class ExtractorRegistry:
+    """
+    按扩展名注册的提取器表
+
+    注册时只记录目标和构造参数，首次取用时才导入模块并创建实例，
+    之后同一扩展名复用该实例。支持像字典一样读取、判断和替换。
+    """
+
+    def __init__(self, targets: Optional[Dict[str, ExtractorTarget]] = None):
+        """
+        Args:
+            targets: 扩展名到提取器目标的映射，默认使用内置提取器
+        """
+        self._targets = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+        for ext, target in (DEFAULT_EXTRACTORS if targets is None else targets).items():
+            self.register(ext, target)
+
+    def register(self, ext: str, target: ExtractorTarget, **kwargs) -> None:
+        """
+        注册或替换提取器
+
+        Args:
+            ext: 文件扩展名，如 '.pdf'
+            target: "模块路径:类名" 字符串，或类/工厂函数
+            **kwargs: 创建实例时传入的参数
+        """
+        ext = ext.lower()
+        with self._lock:
+            self._targets[ext] = (target, kwargs)
+            self._instances.pop(ext, None)
+
+    def __getitem__(self, ext: str) -> Any:
+        ext = ext.lower()
+        instance = self._instances.get(ext)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if ext not in self._instances:
+                target, kwargs = self._targets[ext]
+                self._instances[ext] = load_target(target)(**kwargs)
+            return self._instances[ext]
+
+    def __setitem__(self, ext: str, instance: Any) -> None:
+        """直接指定某个扩展名使用的提取器实例"""
+        ext = ext.lower()
+        with self._lock:
+            self._targets[ext] = (lambda: instance, {})
+            self._instances[ext] = instance
+
+    def __contains__(self, ext: str) -> bool:
+        return ext.lower() in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._targets))
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def loaded(self) -> Dict[str, Any]:
+        """已经创建的提取器实例"""
+        return dict(self._instances)
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+# 上传内容不超过该大小时只保存在内存中
+DEFAULT_MAX_MEMORY = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def safe_filename(filename: Optional[str], default: str = "upload") -> str:
+    """
+    取上传文件名的最后一段，去掉客户端传来的目录部分，保留中文等非ASCII字符
+
+    Args:
+        filename: 客户端提供的文件名
+        default: 文件名为空时使用的名称
+
+    Returns:
+        str: 可安全用作本地文件名的名称
+    """
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if name in ("", ".", ".."):
+        return default
+    return name
+
+
+class NamedBytesIO(io.BytesIO):
+    """带文件名的内存字节流，提取器可据此得到文件标题"""
+
+    def __init__(self, data: bytes = b"", name: str = ""):
+        super().__init__(data)
+        self.name = name
+
+
+class UploadSpool:
+    """
+    上传文件的暂存区
+
+    写入时同步计算SHA-256摘要；内容较小时保存在内存中，超过上限后转存到
+    独立临时目录中的同名文件，不同请求上传同名文件也不会互相覆盖。
+    关闭时删除临时文件。
+    """
+
+    def __init__(self, filename: str, max_memory: int = DEFAULT_MAX_MEMORY, temp_dir: Optional[str] = None):
+        """
+        Args:
+            filename: 上传文件名，用于判断格式和作为默认标题
+            max_memory: 内存中保存的最大字节数
+            temp_dir: 转存临时文件的父目录，默认使用系统临时目录
+        """
+        self.filename = safe_filename(filename)
+        self.max_memory = max_memory
+        self.temp_dir = temp_dir
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = NamedBytesIO(name=self.filename)
+        self._file = None
+        self._dir = None
+        self.path = None
+
+    @classmethod
+    def from_fileobj(cls, fileobj: BinaryIO, filename: str, **kwargs) -> 'UploadSpool':
+        """
+        从文件对象分块读取全部内容
+
+        Args:
+            fileobj: 二进制文件对象
+            filename: 上传文件名
+            **kwargs: 传给构造函数的其他参数
+
+        Returns:
+            UploadSpool: 已写入完成的暂存区
+        """
+        spool = cls(filename, **kwargs)
+        try:
+            for chunk in iter(lambda: fileobj.read(UPLOAD_CHUNK_SIZE), b''):
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        return spool
+
+    def write(self, chunk: bytes) -> None:
+        """写入一块上传内容"""
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.max_memory:
+            self._rollover()
+        (self._file or self._buffer).write(chunk)
+
+    def _rollover(self) -> None:
+        """将内存中的内容转存到唯一的临时目录"""
+        self._dir = tempfile.mkdtemp(prefix="upload-", dir=self.temp_dir)
+        self.path = os.path.join(self._dir, self.filename)
+        self._file = open(self.path, 'wb')
+        self._file.write(self._buffer.getvalue())
+        self._buffer = None
+
+    @property
+    def digest(self) -> str:
+        """已写入内容的SHA-256十六进制摘要"""
+        return self._sha256.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return self._file is None
+
+    @property
+    def source(self) -> Union[str, BinaryIO]:
+        """
+        供提取器读取的来源：内存中的内容返回字节流，已转存的内容返回临时文件路径
+        """
+        if self._file is not None:
+            self._file.flush()
+            return self.path
+        self._buffer.seek(0)
+        return self._buffer
+
+    def close(self) -> None:
+        """释放内存并删除临时文件"""
+        if self._file is not None:
+            self._file.close()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+        self._buffer = None
+        self._file = None
+        self._dir = None
+
+    def __enter__(self) -> 'UploadSpool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
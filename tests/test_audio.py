@@ -0,0 +1,272 @@
+import unittest
+import asyncio
+import io
+import random
+import wave
+import threading
+import time
+from unittest import mock
+from webapp import audio
+from webapp.audio import (PCM_SAMPLE_RATE, assemble_pcm, audio_options, build_segments, encode_audio,
+                          render_audio, synthesize, synthesize_async)
+
+def _segments(count):
+    return [dict(text=f"第{i}段", voice_id="A" if i % 2 else "B", speed=1.0, volume=1, pitch=0,
+                 emotion="neutral", language="zh") for i in range(count)]
+
+class _FlakyTTS:
+    """按随机延迟返回结果的TTS客户端，指定的段首次请求失败"""
+
+    def __init__(self, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _enter(self, text):
+        with self.lock:
+            self.calls[text] = self.calls.get(text, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = text in self.fail_once and self.calls[text] == 1
+        return fail
+
+    def _exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def synthesize_text_sync(self, text, voice_id, **kwargs):
+        fail = self._enter(text)
+        try:
+            time.sleep(random.uniform(0.005, 0.03))
+            if fail:
+                raise Exception("503")
+            return f"{voice_id}:{text}".encode("utf-8")
+        finally:
+            self._exit()
+
+    async def synthesize_text_async(self, text, voice_id, **kwargs):
+        fail = self._enter(text)
+        try:
+            await asyncio.sleep(random.uniform(0.005, 0.03))
+            if fail:
+                raise Exception("503")
+            return f"{voice_id}:{text}".encode("utf-8")
+        finally:
+            self._exit()
+
+class TestConcurrentSynthesis(unittest.TestCase):
+    """测试并发、保序的音频段合成"""
+
+    def setUp(self):
+        patcher = mock.patch.object(audio, "TTS_RETRY_DELAY", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _expected(self, segments):
+        return [f"{s['voice_id']}:{s['text']}".encode("utf-8") for s in segments]
+
+    def test_sync_order_limit_and_retry(self):
+        """测试同步合成不超过并发上限、按脚本顺序返回，失败段单独重试"""
+        segments = _segments(30)
+        tts = _FlakyTTS(fail_once={"第3段", "第17段"})
+        progress = []
+        pieces = synthesize(tts, segments, progress=lambda done, total: progress.append((done, total)),
+                            concurrency=4, retries=1)
+        self.assertEqual(pieces, self._expected(segments))
+        self.assertEqual(tts.max_in_flight, 4)
+        self.assertEqual(tts.calls["第3段"], 2)
+        self.assertEqual(tts.calls["第4段"], 1)
+        self.assertEqual(progress[-1], (30, 30))
+
+    def test_async_order_limit_and_retry(self):
+        """测试异步合成不超过并发上限、按脚本顺序返回，失败段单独重试"""
+        segments = _segments(30)
+        tts = _FlakyTTS(fail_once={"第0段", "第29段"})
+        pieces = asyncio.run(synthesize_async(tts, segments, concurrency=5, retries=1))
+        self.assertEqual(pieces, self._expected(segments))
+        self.assertLessEqual(tts.max_in_flight, 5)
+        self.assertGreater(tts.max_in_flight, 1)
+        self.assertEqual(tts.calls["第29段"], 2)
+
+    def test_exhausted_retries_fail_with_segment_index(self):
+        """测试重试次数用尽后报告失败的段"""
+        tts = _FlakyTTS(fail_once={"第2段"})
+        with self.assertRaises(Exception) as ctx:
+            synthesize(tts, _segments(5), concurrency=2, retries=0)
+        self.assertIn("第3段（共5段）", str(ctx.exception))
+
+    def test_double_mode_segments_keep_script_order(self):
+        """测试双人脚本按顺序生成音频段，每段使用对应角色的音色"""
+        options = audio_options({"mode": "double", "roleAName": "甲", "roleBName": "乙",
+                                 "roleAVoice": "voice-a", "roleBVoice": "voice-b", "speedB": "1.2"})
+        script = '[{"role": "甲", "text": "你好"}, {"role": "乙", "text": "你好呀"}, {"role": "甲", "text": "开始吧"}]'
+        segments = build_segments(script, options)
+        self.assertEqual([(s["voice_id"], s["text"]) for s in segments],
+                         [("voice-a", "你好。"), ("voice-b", "你好呀。"), ("voice-a", "开始吧。")])
+        self.assertEqual(segments[1]["speed"], 1.2)
+
+class TestPCMAssembly(unittest.TestCase):
+    """测试PCM拼接和一次性编码"""
+
+    def _wav(self, samples, rate=PCM_SAMPLE_RATE):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(samples.astype("<i2").tobytes())
+        return buffer.getvalue()
+
+    def test_pieces_concatenated_in_order(self):
+        """测试原始PCM段和WAV段分别按顺序拼接为连续采样"""
+        import numpy as np
+        first = np.arange(0, 100, dtype=np.int16)
+        second = np.arange(100, 250, dtype=np.int16)
+        expected = np.arange(0, 250, dtype=np.int16)
+        np.testing.assert_array_equal(assemble_pcm([first.tobytes(), b"", second.tobytes()], "pcm"), expected)
+        np.testing.assert_array_equal(assemble_pcm([self._wav(first), self._wav(second)], "wav"), expected)
+
+    def test_pcm_never_sniffed_as_mp3(self):
+        """测试看起来像MP3帧头的原始PCM不会被当作MP3解码"""
+        import numpy as np
+        samples = np.array([-20, 5, 7], dtype=np.int16)
+        self.assertEqual(samples.tobytes()[:2], b"\xec\xff")
+        np.testing.assert_array_equal(assemble_pcm([b"\xff\xe0" + samples.tobytes()], "pcm")[1:], samples)
+
+    def test_wav_resampled_to_pipeline_rate(self):
+        """测试采样率不同的WAV段重采样后再拼接"""
+        import numpy as np
+        samples = assemble_pcm([self._wav(np.zeros(16000, dtype=np.int16), rate=16000)], "wav")
+        self.assertEqual(len(samples), PCM_SAMPLE_RATE)
+
+    def test_encode_once_to_wav(self):
+        """测试整期音频编码为WAV后时长和采样不变"""
+        import numpy as np
+        tone = (np.sin(np.arange(PCM_SAMPLE_RATE * 3) / 10) * 8000).astype(np.int16)
+        pieces = [tone[:PCM_SAMPLE_RATE].tobytes(), tone[PCM_SAMPLE_RATE:].tobytes()]
+        data, duration = render_audio(pieces, "wav", input_format="pcm")
+        self.assertEqual(duration, 3.0)
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            self.assertEqual(wav.getframerate(), PCM_SAMPLE_RATE)
+            np.testing.assert_array_equal(np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2"), tone)
+        self.assertEqual(encode_audio(tone, "pcm"), tone.tobytes())
+
+class _GatedTTS:
+    """最后一段要等到第一段被取走后才返回，记录已开始合成的段"""
+
+    def __init__(self, last=-1, samples_per_segment=400):
+        self.started = []
+        self.first_consumed = None
+        self.last = last
+        self.samples = samples_per_segment
+
+    async def synthesize_text_async(self, text, voice_id, **kwargs):
+        import numpy as np
+        index = int(text.rstrip("。"))
+        self.started.append(index)
+        if index == self.last:
+            await self.first_consumed.wait()
+        return np.full(self.samples, index, dtype="<i2").tobytes()
+
+class TestStreamingSynthesis(unittest.TestCase):
+    """测试边合成边输出的流式音频"""
+
+    def _segments(self, count):
+        return [dict(text=str(i), voice_id="A", speed=1.0, volume=1, pitch=0, emotion="neutral", language="zh")
+                for i in range(count)]
+
+    def test_first_piece_before_episode_finishes(self):
+        """测试第一段合成后立即产出，只提前合成窗口内的段"""
+        tts = _GatedTTS(last=11)
+
+        async def run():
+            tts.first_consumed = asyncio.Event()
+            pieces = []
+            async for piece in audio.synthesize_stream(tts, self._segments(12), concurrency=2, window=4):
+                if not pieces:
+                    self.assertLessEqual(max(tts.started), 3)
+                    tts.first_consumed.set()
+                pieces.append(piece)
+            return pieces
+
+        pieces = asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual([piece[:2] for piece in pieces], [i.to_bytes(2, "little") for i in range(12)])
+
+    def test_streaming_tts_chunks_forwarded(self):
+        """测试TTS流式返回时，第一段的音频块在该段合成结束前就送去编码，奇数长度的块不会错位"""
+        import numpy as np
+        samples = np.arange(-300, 300, dtype="<i2")
+        data = samples.tobytes()
+
+        class _StreamingTTS:
+            streaming = True
+
+            def __init__(self):
+                self.first_forwarded = asyncio.Event()
+
+            async def iter_synthesize_text_async(self, text, voice_id, **kwargs):
+                half = len(data) // 2
+                if text == "0":
+                    yield data[:101]
+                    await self.first_forwarded.wait()
+                    yield data[101:half]
+                else:
+                    yield data[half:half + 7]
+                    yield data[half + 7:]
+
+        async def run():
+            tts = _StreamingTTS()
+            encoder = audio.StreamEncoder("wav")
+            output = []
+            async for chunk in audio.stream_audio(tts, self._segments(2), encoder, input_format="pcm"):
+                output.append(chunk)
+                tts.first_forwarded.set()
+            return output
+
+        output = asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual(len(output[0]), 44 + 100)
+        self.assertEqual(b"".join(output)[44:], data)
+
+    def test_wav_stream_encoder(self):
+        """测试WAV流式编码先输出长度未知的文件头，随后按顺序输出采样"""
+        import numpy as np
+        encoder = audio.StreamEncoder("wav")
+        first = encoder.feed(np.arange(10, dtype=np.int16))
+        second = encoder.feed(np.arange(10, 20, dtype=np.int16))
+        self.assertEqual(first[:4], b"RIFF")
+        self.assertEqual(first[-20:] + second, np.arange(20, dtype="<i2").tobytes())
+        self.assertEqual(encoder.close(), b"")
+        with wave.open(io.BytesIO(first + second), "rb") as wav:
+            self.assertEqual(wav.getframerate(), PCM_SAMPLE_RATE)
+            self.assertEqual(np.frombuffer(wav.readframes(20), dtype="<i2").tolist(), list(range(20)))
+        with self.assertRaises(ValueError):
+            audio.StreamEncoder("ogg")
+
+    def test_streaming_endpoint(self):
+        """测试 /api/generate_audio 的流式模式按顺序返回整期音频"""
+        import tempfile
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from webapp import api
+        from webapp.segment_store import SegmentStore
+
+        tts = _GatedTTS(samples_per_segment=100)
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch.object(api, "get_tts_client", return_value=tts), \
+                mock.patch.object(api, "get_segment_store", return_value=SegmentStore(temp_dir)):
+            app = FastAPI()
+            app.include_router(api.router)
+            script = "[" + ", ".join(f'{{"role": "{"甲乙"[i % 2]}", "text": "{i}"}}' for i in range(5)) + "]"
+            form = {"text": script, "mode": "double", "roleAName": "甲", "roleBName": "乙", "roleAVoice": "A",
+                    "roleBVoice": "B", "stream": "true", "format": "wav"}
+            with TestClient(app) as client:
+                with client.stream("POST", "/api/generate_audio", data=form) as response:
+                    self.assertEqual(response.headers["content-type"], "audio/wav")
+                    body = b"".join(response.iter_bytes())
+        self.assertEqual(body[:4], b"RIFF")
+        self.assertEqual(body[44:], b"".join(bytes([i, 0]) * 100 for i in range(5)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from content_extractor import ContentExtractor
+from content_extractor.batch import BatchURLExtractor
+
+class _ArticleHandler(BaseHTTPRequestHandler):
+    """返回测试文章页面，并记录同时处理中的请求数"""
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            if self.path == "/slow":
+                time.sleep(1.5)
+            else:
+                time.sleep(0.05)
+            if self.path == "/missing":
+                self.send_error(404)
+                return
+            if self.path == "/forbidden":
+                self.send_error(403)
+                return
+            body = (f"<html><head><title>文章{self.path}</title></head><body><article>"
+                    f"<h1>标题{self.path}</h1><p>这是一段足够长的测试段落内容，路径为{self.path}。</p>"
+                    "</article></body></html>").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBatchURLExtractor(unittest.TestCase):
+    """测试异步批量网页提取"""
+
+    def setUp(self):
+        _ArticleHandler.active = 0
+        _ArticleHandler.max_active = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ArticleHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _collect(self, results):
+        async def run():
+            return [item async for item in results]
+        return asyncio.run(run())
+
+    def test_batch_results_and_errors(self):
+        """测试批量提取返回每个URL的结果，失败的URL不影响其他URL"""
+        urls = [f"{self.base_url}/a{index}" for index in range(6)]
+        urls += [f"{self.base_url}/missing", f"{self.base_url}/forbidden", "invalid-url"]
+        batch = BatchURLExtractor(max_concurrency=4, per_host_limit=3, per_host_delay=0)
+        results = self._collect(batch.extract_many(urls))
+
+        self.assertEqual(sorted(item["index"] for item in results), list(range(len(urls))))
+        by_index = {item["index"]: item for item in results}
+        for index in range(6):
+            self.assertTrue(by_index[index]["success"])
+            self.assertEqual(by_index[index]["content"]["title"], f"文章/a{index}")
+        self.assertEqual(by_index[6]["error_type"], "NoValidContentError")
+        self.assertEqual(by_index[7]["error_type"], "AccessDeniedError")
+        self.assertFalse(by_index[8]["success"])
+        self.assertLessEqual(_ArticleHandler.max_active, 3)
+
+    def test_per_host_delay_and_timeout(self):
+        """测试同一主机的请求间隔和单个URL超时"""
+        batch = BatchURLExtractor(per_host_limit=1, per_host_delay=0.2, timeout=0.5)
+        start = time.perf_counter()
+        results = self._collect(batch.extract_many([f"{self.base_url}/a", f"{self.base_url}/b", f"{self.base_url}/slow"]))
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertEqual(_ArticleHandler.max_active, 1)
+        slow = next(item for item in results if item["index"] == 2)
+        self.assertFalse(slow["success"])
+        self.assertIn("超时", slow["error"])
+
+    def test_process_urls_with_budget(self):
+        """测试ContentExtractor批量接口按预算裁剪每个网页"""
+        extractor = ContentExtractor()
+        results = self._collect(extractor.process_urls([f"{self.base_url}/a"], max_chars=5, per_host_delay=0))
+        self.assertTrue(results[0]["success"])
+        self.assertTrue(results[0]["content"]["metadata"]["truncated"])
+
+if __name__ == '__main__':
+    unittest.main()
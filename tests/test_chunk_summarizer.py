@@ -0,0 +1,94 @@
+import unittest
+import threading
+import time
+from unittest import mock
+from ai_parser.chunk_summarizer import ChunkSummarizer
+from ai_parser.podcast_generator import PodcastGenerator
+from content_extractor.budget import estimate_tokens
+
+def _book(chapters=12, paragraphs=10):
+    items = []
+    for i in range(chapters):
+        title = f"第{i}章"
+        items.append({"section_title": title, "text": title, "content_type": "heading"})
+        for j in range(paragraphs):
+            items.append({"section_title": title, "text": f"第{i}章第{j}段。" + "这是一段篇幅较长的正文内容。" * 20,
+                          "content_type": "paragraph"})
+    return {"title": "一本书", "metadata": {}, "content": items, "key_points": [], "cautions": ""}
+
+class TestChunkSummarizer(unittest.TestCase):
+    """测试长文档分块摘要"""
+
+    def test_split_respects_chunk_size_and_order(self):
+        """测试分块不超过大小上限，且按原文顺序覆盖所有章节"""
+        summarizer = ChunkSummarizer(lambda *args: "", chunk_tokens=1500)
+        chunks = summarizer.split(_book())
+        self.assertGreater(len(chunks), 1)
+        for _, text in chunks:
+            self.assertLessEqual(estimate_tokens(text), 1500)
+        titles = [title for chunk_titles, _ in chunks for title in chunk_titles]
+        self.assertEqual(sorted(set(titles), key=titles.index), [f"第{i}章" for i in range(12)])
+        self.assertIn("第0章第0段", chunks[0][1])
+        self.assertIn("第11章第9段", chunks[-1][1])
+
+    def test_oversized_block_split_without_losing_text(self):
+        """测试单个内容块超出分块大小时按句子拆到多个分块，不丢失任何文字"""
+        sentences = [f"这是第{i}句话，用来组成一个没有空行的超长段落。" for i in range(200)]
+        paragraph = "".join(sentences) + "Final words. " + "x" * 6000
+        content = {"content": [{"section_title": "正文", "text": paragraph, "content_type": "paragraph"}]}
+        summarizer = ChunkSummarizer(lambda *args: "", chunk_tokens=1000)
+        chunks = summarizer.split(content)
+
+        self.assertGreater(len(chunks), 5)
+        for titles, text in chunks:
+            self.assertEqual(titles, ["正文"])
+            self.assertLessEqual(estimate_tokens(text), 1000)
+        body = "".join(text.replace("### 正文\n", "") for _, text in chunks)
+        self.assertEqual(body.replace(" ", ""), paragraph.replace(" ", ""))
+        # 句子没有被切开
+        self.assertTrue(all(text.endswith("。") for _, text in chunks[:-3]))
+
+    def test_summaries_run_concurrently_with_bounded_workers(self):
+        """测试分块摘要并发执行且不超过线程上限，结果保持原文顺序"""
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def call_llm(system_prompt, text, max_tokens):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.05)
+            with lock:
+                running["now"] -= 1
+            return text.splitlines()[1][:7]
+
+        summarizer = ChunkSummarizer(call_llm, chunk_tokens=1500, max_workers=3)
+        items = summarizer.summarize(_book())
+        self.assertEqual(running["max"], 3)
+        self.assertEqual(items[0]["text"], "第0章第0段。")
+        self.assertTrue(items[0]["section_title"].startswith("第0章"))
+
+class TestLongDocumentGeneration(unittest.TestCase):
+    """测试长文档模式的脚本生成"""
+
+    def test_rerun_only_repeats_final_pass(self):
+        """测试更换播客模式重新生成时复用分块摘要，只重复最后一次调用"""
+        generator = PodcastGenerator()
+        generator.chunk_summarizer.chunk_tokens = 1500
+        content = _book()
+        with mock.patch.object(generator, "_call_ark_api", return_value="摘要") as call:
+            generator.generate_podcast_script(content, podcast_mode="single", long_document=True)
+            first_calls = call.call_count
+            generator.generate_podcast_script(content, podcast_mode="double", roleA_name="甲", long_document=True)
+        self.assertGreater(first_calls, 2)
+        self.assertEqual(call.call_count, first_calls + 1)
+
+    def test_long_document_detected_automatically(self):
+        """测试按原文篇幅自动判断是否使用长文档模式"""
+        generator = PodcastGenerator()
+        generator.long_document_threshold = 1000
+        self.assertTrue(generator.is_long_document(_book()))
+        self.assertFalse(generator.is_long_document(_book(chapters=1, paragraphs=1)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import os
+import time
+from unittest import mock
+import httpx
+from fastapi import FastAPI
+from webapp import api
+from webapp.concurrency import run_in_pool
+
+DELAY = 0.3
+
+class _SlowExtractor:
+    """每次提取都阻塞一段时间的提取器"""
+
+    def process_upload(self, spool, **options):
+        time.sleep(DELAY)
+        return {"title": spool.filename, "content": []}
+
+class _SlowGenerator:
+    """每次生成都阻塞一段时间的脚本生成器"""
+
+    def generate_podcast_script(self, content, return_info=False, **options):
+        time.sleep(DELAY)
+        return "[]", {"cached": False, "long_document": False}
+
+class TestConcurrentRequests(unittest.TestCase):
+    """测试阻塞操作不会卡住事件循环"""
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(api.router)
+        self.app = app
+        self.patchers = [
+            mock.patch.object(api, "get_extractor", return_value=_SlowExtractor()),
+            mock.patch.object(api, "get_podcast_generator", return_value=_SlowGenerator()),
+            mock.patch.object(api, "get_extraction_cache", return_value=mock.Mock(stats=mock.Mock(return_value={}))),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    async def _run_concurrently(self):
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def upload(index):
+                return await client.post("/api/extract_file", files={"file": (f"{index}.txt", b"text", "text/plain")})
+
+            async def generate():
+                return await client.post("/api/generate_podcast_script", json={"content": {"content": [{}]}})
+
+            async def cache_stats():
+                start = time.perf_counter()
+                response = await client.get("/api/cache_stats")
+                return response, time.perf_counter() - start
+
+            start = time.perf_counter()
+            slow = [asyncio.create_task(upload(i)) for i in range(3)] + [asyncio.create_task(generate()) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            stats_response, stats_latency = await cache_stats()
+            responses = await asyncio.gather(*slow)
+            return responses, time.perf_counter() - start, stats_response, stats_latency
+
+    def test_blocking_work_runs_in_parallel(self):
+        """测试并发的提取和脚本生成请求并行执行，期间其他请求仍能及时响应"""
+        responses, elapsed, stats_response, stats_latency = asyncio.run(self._run_concurrently())
+        for response in responses:
+            self.assertEqual(response.status_code, 200, response.text)
+        # 串行执行需要 6 * DELAY
+        self.assertLess(elapsed, 3 * DELAY)
+        self.assertEqual(stats_response.status_code, 200)
+        self.assertLess(stats_latency, DELAY)
+
+    def test_run_in_pool_returns_result(self):
+        """测试线程池执行结果和异常都能传回调用方"""
+        async def run():
+            value = await run_in_pool('extract', lambda a, b=0: a + b, 1, b=2)
+            with self.assertRaises(ZeroDivisionError):
+                await run_in_pool('extract', lambda: 1 / 0)
+            return value
+        self.assertEqual(asyncio.run(run()), 3)
+
+class TestAsyncTTS(unittest.TestCase):
+    """测试TTS异步客户端"""
+
+    def test_segments_synthesized_without_blocking(self):
+        """测试音频段异步合成并按原文顺序返回音频"""
+        from webapp.audio import synthesize_async
+        from webapp.minimax_tts import MiniMaxTTS
+
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            text = httpx.Response(200, content=request.content).json()["text"]
+            return httpx.Response(200, json={"data": {"audio": text.encode("utf-8").hex()}})
+
+        async def run():
+            with mock.patch.dict(os.environ, {"MINIMAX_API_KEY": "k", "MINIMAX_GROUP_ID": "g"}):
+                tts = MiniMaxTTS()
+            tts._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            tts._async_loop = asyncio.get_running_loop()
+            try:
+                segments = [dict(text=text, voice_id="voice", speed=1.0, volume=1, pitch=0, emotion="neutral", language="zh")
+                            for text in ("一二", "三四", "五")]
+                return await synthesize_async(tts, segments)
+            finally:
+                await tts.aclose()
+
+        self.assertEqual(asyncio.run(run()), ["一二".encode(), "三四".encode(), "五".encode()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -81,6 +81,39 @@ class TestDocExtractor(unittest.TestCase):
 
         os.remove(temp_non_doc_path)
 
+    def test_stream_engine_matches_python_docx(self):
+        """测试流式解析引擎与python-docx引擎结果一致"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在，请放置一个有效的test.docx文件。")
+
+        streamed = DocExtractor(engine='stream').extract(self.test_file_path)
+        loaded = DocExtractor(engine='python-docx').extract(self.test_file_path)
+        self.assertEqual(streamed, loaded)
+
+    def test_stream_engine_keeps_document_order(self):
+        """测试流式解析按文档顺序输出表格，并正确处理合并单元格"""
+        from docx import Document
+        temp_doc_path = "tests/data/temp_ordered.docx"
+        doc = Document()
+        doc.add_heading("第一章", 1)
+        table = doc.add_table(rows=2, cols=3)
+        for i, row in enumerate(table.rows):
+            for j, cell in enumerate(row.cells):
+                cell.text = f"{i}-{j}"
+        table.cell(0, 0).merge(table.cell(0, 1))
+        doc.add_heading("第二章", 2)
+        doc.add_paragraph("第二章的内容")
+        doc.save(temp_doc_path)
+
+        try:
+            content = DocExtractor().extract(temp_doc_path)["content"]
+            self.assertEqual([item["content_type"] for item in content], ["heading", "table", "heading", "paragraph"])
+            self.assertEqual(content[1]["section_title"], "第一章")
+            self.assertEqual(content[1]["text"][0], ["0-0\n0-1", "0-0\n0-1", "0-2"])
+            self.assertEqual(content[2]["level"], 2)
+        finally:
+            os.remove(temp_doc_path)
+
 
 class TestContentExtractorDocIntegration(unittest.TestCase):
     def setUp(self):
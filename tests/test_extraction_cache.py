@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+from content_extractor import ContentExtractor, ExtractionCache
+from content_extractor.cache import DiskCache
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.test_file_path = "tests/data/test.pdf"
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_repeat_extraction_hits_cache(self):
+        """测试相同文件重复提取时命中缓存且不再调用提取器"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在")
+
+        cache = ExtractionCache(cache_dir=self.cache_dir)
+        extractor = ContentExtractor(cache=cache)
+        first = extractor.process_file(self.test_file_path)
+
+        with mock.patch.object(extractor.extractors['.pdf'], 'extract') as extract:
+            second = extractor.process_file(self.test_file_path)
+            extract.assert_not_called()
+
+        self.assertEqual(first, second)
+        stats = cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["memory_hits"], 1)
+
+    def test_disk_tier_survives_new_instance(self):
+        """测试磁盘层在新的缓存实例中仍可命中"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在")
+
+        ContentExtractor(cache=ExtractionCache(cache_dir=self.cache_dir)).process_file(self.test_file_path)
+
+        cache = ExtractionCache(cache_dir=self.cache_dir)
+        ContentExtractor(cache=cache).process_file(self.test_file_path)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_options_are_part_of_key(self):
+        """测试不同提取参数使用不同的缓存条目"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在")
+
+        cache = ExtractionCache()
+        extractor = ContentExtractor(cache=cache)
+        full = extractor.process_file(self.test_file_path)
+        partial = extractor.process_file(self.test_file_path, pages="1")
+        self.assertNotEqual(len(full["content"]), len(partial["content"]))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_same_content_under_different_names(self):
+        """测试相同内容的文件以不同文件名提取时，标题和文件信息按当前文件计算"""
+        text = "很长的第一行" * 30 + "\n\n第二段内容。\n"
+        paths = []
+        for index, name in enumerate(("first.txt", "second.txt")):
+            path = os.path.join(self.cache_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.utime(path, (1000000 * (index + 1),) * 2)
+            paths.append(path)
+
+        cache = ExtractionCache()
+        extractor = ContentExtractor(cache=cache)
+        first = extractor.process_file(paths[0])
+        second = extractor.process_file(paths[1])
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+        self.assertEqual((first["title"], second["title"]), ("first.txt", "second.txt"))
+        self.assertEqual(second["metadata"]["title"], "second.txt")
+        self.assertEqual(second["metadata"]["modified_time"], str(os.stat(paths[1]).st_mtime))
+        self.assertEqual(second["metadata"]["file_size"], first["metadata"]["file_size"])
+        self.assertEqual(second["content"], first["content"])
+        self.assertEqual(extractor.process_file(paths[0]), first)
+
+    def test_extractor_options_are_part_of_key(self):
+        """测试提取器构造参数（如Word解析引擎）不同时使用不同的缓存条目"""
+        from content_extractor.extractors.doc_extractor import DocExtractor
+        keys = {ExtractionCache.make_key("digest", DocExtractor(engine=engine)) for engine in ("stream", "python-docx")}
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(ExtractionCache.make_key("digest", DocExtractor()),
+                         ExtractionCache.make_key("digest", DocExtractor(engine="stream")))
+
+    def test_disk_eviction_by_size(self):
+        """测试磁盘层超过大小上限时淘汰最久未使用的条目"""
+        disk = DiskCache(self.cache_dir, max_bytes=4096)
+        for index in range(20):
+            disk.set(f"{index:064x}", {"text": "x" * 500})
+        self.assertLessEqual(disk.total_bytes, 4096)
+        self.assertIsNone(disk.get(f"{0:064x}"))
+        self.assertIsNotNone(disk.get(f"{19:064x}"))
+
+if __name__ == '__main__':
+    unittest.main()
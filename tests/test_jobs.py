@@ -0,0 +1,173 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from webapp.jobs import JobQueue, JobStore, default_handlers
+
+def _wait_for(store, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"任务未在{timeout}秒内结束: {store.get(job_id)}")
+
+class TestJobStore(unittest.TestCase):
+    """测试SQLite任务存储"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_jobs_survive_restart(self):
+        """测试任务在重新打开数据库后仍然存在，中断的任务重新排队"""
+        store = JobStore(self.db_path)
+        first = store.create("audio", {"text": "你好"}, text_preview="你好", voice_id="male-qn-qingse")
+        second = store.create("script", {"content": {}})
+        claimed = store.claim_next()
+        self.assertEqual(claimed["id"], first["id"])
+        self.assertEqual(claimed["status"], "processing")
+        store.update_progress(first["id"], 3, 10)
+        store.close()
+
+        store = JobStore(self.db_path)
+        self.assertEqual(store.get(first["id"])["progress"], 30.0)
+        self.assertEqual(store.requeue_interrupted(), 1)
+        self.assertEqual([job["id"] for job in store.list()], [second["id"], first["id"]])
+        self.assertEqual(store.get(first["id"])["status"], "queued")
+        self.assertEqual(store.get(first["id"])["voice_id"], "male-qn-qingse")
+        store.close()
+
+    def test_claim_is_exclusive(self):
+        """测试多个线程同时领取时每个任务只被领取一次"""
+        store = JobStore(self.db_path)
+        for index in range(20):
+            store.create("script", {"index": index})
+        claimed, lock = [], threading.Lock()
+
+        def worker():
+            while True:
+                job = store.claim_next()
+                if job is None:
+                    return
+                with lock:
+                    claimed.append(job["id"])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(len(set(claimed)), 20)
+        store.close()
+
+class TestJobQueue(unittest.TestCase):
+    """测试后台任务队列"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.temp_dir.name, "jobs.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_workers_report_progress_and_results(self):
+        """测试工作线程执行任务、记录进度和结果，异常时标记失败"""
+        def handler(context):
+            for done in range(1, 5):
+                context.progress(done, 4)
+            if context.params.get("fail"):
+                raise ValueError("合成失败")
+            return {"result": {"value": context.params["value"]}}
+
+        queue = JobQueue(self.store, {"demo": handler}, workers=2, poll_interval=0.05).start()
+        try:
+            ok = queue.submit("demo", {"value": 1})
+            bad = queue.submit("demo", {"fail": True})
+            ok = _wait_for(self.store, ok["id"])
+            bad = _wait_for(self.store, bad["id"])
+        finally:
+            queue.stop()
+        self.assertEqual(ok["status"], "completed")
+        self.assertEqual(ok["result"], {"value": 1})
+        self.assertEqual((ok["done"], ok["total"], ok["progress"]), (4, 4, 100))
+        self.assertEqual(bad["status"], "failed")
+        self.assertEqual(bad["error"], "合成失败")
+
+    def test_audio_job_writes_result_file(self):
+        """测试音频任务按段汇报进度并保存结果文件，同一说话人的台词合并为一段"""
+        tts = mock.Mock()
+        tts.synthesize_text_sync.side_effect = lambda text, voice_id, **kwargs: text.encode("utf-8")
+        with mock.patch("webapp.services.get_tts_client", return_value=tts):
+            handlers = default_handlers(self.temp_dir.name)
+        queue = JobQueue(self.store, handlers, workers=1, poll_interval=0.05).start()
+        script = '[{"role": "主播", "text": "大家好"}, {"role": "主播", "text": "今天聊聊播客"}]'
+        try:
+            with mock.patch("webapp.audio.render_audio", side_effect=lambda pieces: (b"".join(pieces), 1.5)):
+                job = queue.submit("audio", {"text": script, "options": {
+                    "mode": "single", "voice": "male-qn-qingse", "speed": 1.0, "volume": 1.0,
+                    "pitch": 0.0, "emotion": "neutral", "language": "zh"}})
+                job = _wait_for(self.store, job["id"])
+        finally:
+            queue.stop()
+        self.assertEqual(job["status"], "completed", job["error"])
+        self.assertEqual((job["done"], job["total"]), (1, 1))
+        self.assertEqual(job["duration"], 1.5)
+        with open(job["result_path"], "rb") as f:
+            self.assertEqual(f.read().decode("utf-8"), "大家好。今天聊聊播客。")
+
+class TestJobEndpoints(unittest.TestCase):
+    """测试任务接口"""
+
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from webapp import api
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.temp_dir.name, "jobs.sqlite3"))
+        generator = mock.Mock()
+        generator.generate_podcast_script.return_value = ("```json\n[]\n```", {"cached": False, "long_document": False})
+        with mock.patch("webapp.services.get_podcast_generator", return_value=generator):
+            handlers = default_handlers(self.temp_dir.name)
+        self.queue = JobQueue(self.store, handlers, workers=1, poll_interval=0.05).start()
+        self.patchers = [mock.patch.object(api, "get_job_store", return_value=self.store),
+                         mock.patch.object(api, "get_job_queue", return_value=self.queue)]
+        for patcher in self.patchers:
+            patcher.start()
+        app = FastAPI()
+        app.include_router(api.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.queue.stop()
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_script_job_listed_with_result(self):
+        """测试提交脚本任务后在任务列表中显示，完成后可获取结果"""
+        response = self.client.post("/api/jobs/script", json={"content": {"title": "人工智能", "content": [{}]}})
+        job_id = response.json()["job_id"]
+        _wait_for(self.store, job_id)
+
+        tasks = self.client.get("/api/task_list").json()["tasks"]
+        self.assertEqual([task["id"] for task in tasks], [job_id])
+        self.assertEqual(tasks[0]["status"], "completed")
+        self.assertEqual(tasks[0]["text_preview"], "人工智能")
+        self.assertIsInstance(tasks[0]["created_at"], float)
+
+        result = self.client.get(f"/api/jobs/{job_id}/result").json()["result"]
+        self.assertEqual(result["podcast_script"], "[]")
+        self.assertEqual(self.client.get("/api/jobs/missing").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
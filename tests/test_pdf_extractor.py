@@ -1,6 +1,8 @@
 import unittest
 import os
-from content_extractor.extractors.pdf_extractor import PDFExtractor
+from PyPDF2 import PdfReader, PdfWriter
+from content_extractor.extractors.pdf_extractor import PDFExtractor, parse_page_ranges
+from content_extractor.budget import ContentBudget
 from content_extractor.exceptions import NoValidContentError, FileNotFoundError, UnsupportedFormatError
 from content_extractor import ContentExtractor # 引入ContentExtractor用于集成测试
 
@@ -54,6 +56,73 @@ class TestPDFExtractor(unittest.TestCase):
         except Exception as e:
             self.fail(f"处理有效PDF文件时发生意外错误: {e}")
 
+    def test_parallel_extract_matches_serial(self):
+        """测试并行提取与串行提取结果一致且保持页序"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在，请放置一个有效的test.pdf文件。")
+
+        serial = PDFExtractor(max_workers=1).extract(self.test_file_path)
+        parallel = PDFExtractor(max_workers=2, parallel_min_pages=1).extract(self.test_file_path)
+
+        self.assertEqual(serial["content"], parallel["content"])
+        page_numbers = [item["page_number"] for item in parallel["content"]]
+        self.assertEqual(page_numbers, sorted(page_numbers))
+
+    def test_parse_page_ranges(self):
+        """测试页码范围解析"""
+        self.assertEqual(parse_page_ranges("1-3,5", 10), [0, 1, 2, 4])
+        self.assertEqual(parse_page_ranges("9-", 10), [8, 9])
+        self.assertEqual(parse_page_ranges([2, (4, 5)], 10), [1, 3, 4])
+        self.assertEqual(parse_page_ranges("8-20", 9), [7, 8])
+
+    def test_extract_page_range_and_sample(self):
+        """测试按页码范围和抽样提取"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在，请放置一个有效的test.pdf文件。")
+
+        result = self.pdf_extractor.extract(self.test_file_path, pages="2-3")
+        self.assertEqual({item["page_number"] for item in result["content"]}, {2, 3})
+
+        result = self.pdf_extractor.extract(self.test_file_path, sample_pages=3)
+        self.assertLessEqual(len(result["content"]), 3)
+
+    def test_extract_with_budget(self):
+        """测试预算用尽后停止提取"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在，请放置一个有效的test.pdf文件。")
+
+        budget = ContentBudget(max_chars=200)
+        result = self.pdf_extractor.extract(self.test_file_path, budget=budget)
+        total = sum(len(item["text"]) for item in result["content"])
+        self.assertLessEqual(total, 200)
+        self.assertTrue(result["metadata"]["truncated"])
+
+    def test_extract_chapters_from_outline(self):
+        """测试按目录书签选择章节"""
+        if not os.path.exists(self.test_file_path):
+            self.skipTest(f"跳过测试：{self.test_file_path} 文件不存在，请放置一个有效的test.pdf文件。")
+
+        outlined_path = "tests/data/temp_outlined.pdf"
+        writer = PdfWriter()
+        for page in PdfReader(self.test_file_path).pages:
+            writer.add_page(page)
+        writer.add_outline_item("Introduction", 0)
+        writer.add_outline_item("Methods", 3)
+        writer.add_outline_item("Results", 6)
+        with open(outlined_path, "wb") as f:
+            writer.write(f)
+
+        try:
+            result = self.pdf_extractor.extract(outlined_path, chapters="methods")
+            pages = {item["page_number"] for item in result["content"]}
+            self.assertTrue(pages)
+            self.assertTrue(pages <= {4, 5, 6})
+
+            result = self.pdf_extractor.extract(outlined_path, chapters=[1])
+            self.assertTrue({item["page_number"] for item in result["content"]} <= {1, 2, 3})
+        finally:
+            os.remove(outlined_path)
+
     def test_extract_non_existent_file(self):
         """测试PDFExtractor处理不存在的文件"""
         with self.assertRaises(NoValidContentError):
@@ -94,6 +163,15 @@ class TestContentExtractorIntegration(unittest.TestCase):
         self.assertEqual(result["source_type"], "file")
         self.assertGreater(len(result["content"]), 0)
 
+    def test_process_file_with_token_budget(self):
+        """测试ContentExtractor按token预算提取PDF"""
+        if not os.path.exists(self.test_pdf_file_path):
+            self.skipTest(f"跳过测试：{self.test_pdf_file_path} 文件不存在，请放置一个有效的test.pdf文件。")
+
+        full = self.extractor.process_file(self.test_pdf_file_path)
+        limited = self.extractor.process_file(self.test_pdf_file_path, max_tokens=100)
+        self.assertLess(len(limited["content"]), len(full["content"]))
+
     def test_process_non_existent_file(self):
         """测试ContentExtractor处理不存在文件"""
         with self.assertRaises(FileNotFoundError):
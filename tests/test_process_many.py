@@ -0,0 +1,64 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from content_extractor import ContentExtractor, ExtractionCache
+from tests.test_batch_extractor import _ArticleHandler
+
+class TestProcessMany(unittest.TestCase):
+    """测试ContentExtractor批量提取接口"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.txt_paths = []
+        for index in range(3):
+            path = os.path.join(self.temp_dir, f"doc{index}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"第{index}号文档\n\n这是第{index}号测试文档的正文内容，用于批量提取测试。\n")
+            self.txt_paths.append(path)
+        self.unsupported_path = os.path.join(self.temp_dir, "bad.xyz")
+        with open(self.unsupported_path, "w") as f:
+            f.write("This is a test.")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ArticleHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/article"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_mixed_sources_in_submission_order(self):
+        """测试文件与URL混合输入时按提交顺序返回，失败项互不影响"""
+        sources = [self.txt_paths[0], self.url, os.path.join(self.temp_dir, "missing.txt"),
+                   self.txt_paths[1], self.unsupported_path, self.txt_paths[2]]
+        if os.path.exists("tests/data/test.pdf"):
+            sources.append("tests/data/test.pdf")
+
+        results = list(ContentExtractor().process_many(sources, max_workers=2))
+
+        self.assertEqual([item["index"] for item in results], list(range(len(sources))))
+        self.assertEqual([item["source"] for item in results], sources)
+        self.assertEqual(results[1]["content"]["source_type"], "web")
+        self.assertEqual(results[2]["error_type"], "FileNotFoundError")
+        self.assertEqual(results[4]["error_type"], "UnsupportedFormatError")
+        for index in (0, 3, 5):
+            self.assertTrue(results[index]["success"])
+            self.assertEqual(results[index]["content"], ContentExtractor().process_file(sources[index]))
+
+    def test_completion_order_and_cache(self):
+        """测试按完成顺序返回全部结果，并在主进程写入缓存"""
+        cache = ExtractionCache()
+        extractor = ContentExtractor(cache=cache)
+        results = list(extractor.process_many(self.txt_paths, ordered=False, max_workers=2))
+        self.assertEqual(sorted(item["index"] for item in results), [0, 1, 2])
+        self.assertEqual(cache.stats()["stores"], 3)
+
+        list(extractor.process_many(self.txt_paths, max_workers=2))
+        self.assertEqual(cache.stats()["memory_hits"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+from ai_parser.prompt_packer import PromptPacker
+from ai_parser.podcast_generator import PodcastGenerator
+from content_extractor.budget import estimate_tokens
+
+def _long_document(chapters=40, paragraphs=20):
+    items = []
+    for i in range(chapters):
+        title = f"第{i}章"
+        items.append({"section_title": title, "text": title, "content_type": "heading"})
+        for _ in range(paragraphs):
+            items.append({"section_title": title, "text": "这是一段篇幅较长的正文内容。" * 30,
+                          "content_type": "paragraph"})
+    return {"title": "长文档", "metadata": {"author": "张三", "url": "http://example.com", "viewport": "width=device-width"},
+            "content": items, "key_points": ["要点一"], "cautions": ""}
+
+class TestPromptPacker(unittest.TestCase):
+    """测试提示词素材打包"""
+
+    def test_budget_respected_and_sections_balanced(self):
+        """测试长文档打包后不超过预算，且每个章节都有节选"""
+        packer = PromptPacker()
+        content = _long_document()
+        for script_length in ("short", "medium", "long"):
+            packed = packer.pack(content, "zh", script_length)
+            self.assertLessEqual(estimate_tokens(packed), packer.budget_for(script_length))
+            for i in range(40):
+                self.assertIn(f"### 第{i}章", packed)
+
+    def test_short_document_kept_whole(self):
+        """测试预算内的文档完整保留，不加节选说明"""
+        content = {"title": "短文", "metadata": {}, "content": [
+            {"section_title": "引言", "text": "人工智能正在改变医疗行业。", "content_type": "paragraph"}]}
+        packed = PromptPacker().pack(content, "zh", "short")
+        self.assertIn("人工智能正在改变医疗行业。", packed)
+        self.assertNotIn("节选", packed)
+
+    def test_metadata_allowlist(self):
+        """测试只保留对脚本创作有帮助的元数据"""
+        packed = PromptPacker().pack(_long_document(chapters=1, paragraphs=1), "en", "short")
+        self.assertIn("- Author: 张三", packed)
+        self.assertNotIn("example.com", packed)
+        self.assertNotIn("viewport", packed.lower())
+
+    def test_compact_list_and_table(self):
+        """测试列表和表格以紧凑文本呈现"""
+        content = {"title": "t", "metadata": {}, "content": [
+            {"section_title": "步骤", "content_type": "list", "list_type": "number",
+             "text": [{"text": "准备"}, {"text": "执行"}]},
+            {"section_title": "步骤", "content_type": "table",
+             "text": [["项目", "项目", "说明"], ["A", "", "甲"]]}]}
+        packed = PromptPacker().pack(content, "zh", "short")
+        self.assertIn("1. 准备\n2. 执行", packed)
+        self.assertIn("项目 | 说明\nA | 甲", packed)
+        self.assertEqual(packed.count("### 步骤"), 1)
+
+    def test_generator_formats_content_once(self):
+        """测试生成脚本时素材只打包一次"""
+        generator = PodcastGenerator()
+        content = _long_document(chapters=2, paragraphs=1)
+        with mock.patch.object(generator.prompt_packer, "pack", wraps=generator.prompt_packer.pack) as pack, \
+                mock.patch.object(generator, "_call_ark_api", return_value="[]") as call:
+            generator.generate_podcast_script(content, language="zh", script_length="long")
+        pack.assert_called_once_with(content, "zh", "long")
+        self.assertIn("第1章", call.call_args[0][1])
+
+if __name__ == '__main__':
+    unittest.main()
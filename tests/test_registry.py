@@ -0,0 +1,52 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+from content_extractor import ContentExtractor, ExtractorRegistry
+from content_extractor.extractors.base_extractor import BaseExtractor
+
+class _MarkdownExtractor(BaseExtractor):
+    """测试用的Markdown提取器"""
+
+    def extract(self, file_path, budget=None):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return {"source_type": "file", "title": "md", "metadata": {},
+                "content": [{"section_title": "正文", "text": text, "content_type": "paragraph"}],
+                "key_points": [], "cautions": ""}
+
+class TestExtractorRegistry(unittest.TestCase):
+    """测试按需加载的提取器注册表"""
+
+    def test_import_does_not_load_backends(self):
+        """测试导入并创建ContentExtractor时不加载各提取器的依赖"""
+        code = ("import sys; from content_extractor import ContentExtractor; ContentExtractor(); "
+                "print(','.join(m for m in ('PyPDF2', 'docx', 'lxml.html', 'readability', 'httpx') if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(output.returncode, 0, output.stderr)
+        self.assertEqual(output.stdout.strip(), "")
+
+    def test_instances_are_created_once(self):
+        """测试同一扩展名只创建一次提取器实例"""
+        registry = ExtractorRegistry()
+        self.assertIn('.PDF', registry)
+        self.assertEqual(registry.loaded(), {})
+        self.assertIs(registry['.txt'], registry['.txt'])
+        self.assertEqual(list(registry.loaded()), ['.txt'])
+
+    def test_register_plugin_extractor(self):
+        """测试注册自定义格式的提取器"""
+        registry = ExtractorRegistry()
+        registry.register('.md', 'tests.test_registry:_MarkdownExtractor')
+        with tempfile.NamedTemporaryFile('w', suffix='.md', delete=False, encoding='utf-8') as f:
+            f.write("# 标题")
+        try:
+            result = ContentExtractor(extractors=registry).process_file(f.name)
+            self.assertEqual(result["content"][0]["text"], "# 标题")
+        finally:
+            os.remove(f.name)
+
+if __name__ == '__main__':
+    unittest.main()
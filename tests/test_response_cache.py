@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+import time
+from unittest import mock
+from ai_parser.podcast_generator import PodcastGenerator
+from ai_parser.response_cache import LLMResponseCache, normalize_prompt
+
+CONTENT = {"title": "人工智能", "metadata": {}, "content": [
+    {"section_title": "引言", "text": "人工智能正在深刻改变医疗行业。", "content_type": "paragraph"}]}
+
+class TestLLMResponseCache(unittest.TestCase):
+    """测试LLM响应缓存"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.generator = PodcastGenerator()
+        self.generator.response_cache = LLMResponseCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_identical_request_hits_cache(self):
+        """测试相同内容和设置重复生成时只调用一次API"""
+        with mock.patch.object(self.generator, "_call_ark_api", return_value="脚本") as call:
+            first = self.generator.generate_podcast_script(CONTENT, return_info=True)
+            second = self.generator.generate_podcast_script(CONTENT, return_info=True)
+        self.assertEqual(call.call_count, 1)
+        self.assertEqual(first, ("脚本", {"cached": False, "long_document": False}))
+        self.assertEqual(second, ("脚本", {"cached": True, "long_document": False}))
+
+    def test_settings_and_bypass(self):
+        """测试设置不同时不命中缓存，use_cache=False 时强制重新生成"""
+        with mock.patch.object(self.generator, "_call_ark_api", return_value="脚本") as call:
+            self.generator.generate_podcast_script(CONTENT)
+            self.generator.generate_podcast_script(CONTENT, podcast_mode="double")
+            self.generator.generate_podcast_script(CONTENT, use_cache=False)
+        self.assertEqual(call.call_count, 3)
+
+    def test_key_ignores_whitespace_only_differences(self):
+        """测试只有排版差异的提示词得到相同的缓存键"""
+        self.assertEqual(normalize_prompt("a  \r\nb\n\n\n\nc\n"), "a\nb\n\nc")
+        params = {"temperature": 0.7, "max_tokens": 2000}
+        self.assertEqual(LLMResponseCache.make_key("m", "系统 \n", "用户", params),
+                         LLMResponseCache.make_key("m", "系统", "用户\r\n", params))
+        self.assertNotEqual(LLMResponseCache.make_key("m", "系统", "用户", params),
+                            LLMResponseCache.make_key("m", "系统", "用户", dict(params, temperature=0.2)))
+
+    def test_entries_expire(self):
+        """测试条目超过有效期后失效"""
+        cache = LLMResponseCache(self.temp_dir.name, ttl=0.05)
+        cache.set("k" * 64, "脚本")
+        self.assertEqual(cache.get("k" * 64), "脚本")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k" * 64))
+
+    def test_disabled_without_cache_dir(self):
+        """测试未设置缓存目录时不启用缓存"""
+        with mock.patch.dict("os.environ", {"LLM_CACHE_DIR": ""}):
+            self.assertIsNone(LLMResponseCache.from_env())
+
+    def test_api_marks_cached_response(self):
+        """测试接口返回结果标记是否来自缓存"""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from webapp import api
+        app = FastAPI()
+        app.include_router(api.router)
+        client = TestClient(app)
+        with mock.patch.object(api, "get_podcast_generator", return_value=self.generator), \
+                mock.patch.object(self.generator, "_call_ark_api", return_value="```json\n[]\n```"):
+            first = client.post("/api/generate_podcast_script", json={"content": CONTENT}).json()
+            second = client.post("/api/generate_podcast_script", json={"content": CONTENT}).json()
+            bypass = client.post("/api/generate_podcast_script", json={"content": CONTENT, "use_cache": False}).json()
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertFalse(bypass["cached"])
+        self.assertEqual(second["podcast_script"], "[]")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import json
+import tempfile
+from unittest import mock
+from ai_parser.podcast_generator import PodcastGenerator
+from ai_parser.response_cache import LLMResponseCache
+
+CONTENT = {"title": "人工智能", "metadata": {}, "content": [
+    {"section_title": "引言", "text": "人工智能正在深刻改变医疗行业。", "content_type": "paragraph"}]}
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+class TestScriptStreaming(unittest.TestCase):
+    """测试流式生成播客脚本"""
+
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from webapp import api
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.generator = PodcastGenerator()
+        self.generator.response_cache = LLMResponseCache(self.temp_dir.name)
+        app = FastAPI()
+        app.include_router(api.router)
+        self.client = TestClient(app)
+        self.patcher = mock.patch.object(api, "get_podcast_generator", return_value=self.generator)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _post(self, **payload):
+        response = self.client.post("/api/generate_podcast_script_stream", json=dict(payload, content=CONTENT))
+        self.assertEqual(response.headers["content-type"].split(";")[0], "text/event-stream")
+        return _parse_sse(response.text)
+
+    def test_deltas_then_cleaned_script(self):
+        """测试逐段推送生成内容，结束时推送去除代码块标记的完整脚本，并写入缓存"""
+        chunks = ["```json\n[", '{"role": "主播", ', '"text": "大家好"}', "]\n```"]
+        with mock.patch.object(self.generator, "_stream_ark_api", return_value=iter(chunks)) as stream:
+            events = self._post()
+            cached_events = self._post()
+        self.assertEqual(stream.call_count, 1)
+        self.assertEqual([data["text"] for name, data in events if name == "delta"], chunks)
+        name, done = events[-1]
+        self.assertEqual(name, "done")
+        self.assertEqual(json.loads(done["podcast_script"]), [{"role": "主播", "text": "大家好"}])
+        self.assertFalse(done["cached"])
+        self.assertTrue(cached_events[-1][1]["cached"])
+        self.assertEqual(cached_events[-1][1]["podcast_script"], done["podcast_script"])
+
+    def test_error_event(self):
+        """测试生成失败时推送 error 事件"""
+        def failing(*args):
+            yield "部分"
+            raise Exception("生成播客脚本失败: timeout")
+
+        with mock.patch.object(self.generator, "_stream_ark_api", side_effect=failing):
+            events = self._post(use_cache=False)
+        self.assertEqual(events[0], ("delta", {"text": "部分"}))
+        self.assertEqual(events[-1][0], "error")
+        self.assertIn("timeout", events[-1][1]["error"])
+
+    def test_client_disconnect_closes_generator_after_pending_read(self):
+        """测试客户端在生成中途断开时，等线程池中正在进行的读取结束后再关闭生成器"""
+        import asyncio
+        import threading
+        from webapp import api
+        entered, release, closed = threading.Event(), threading.Event(), threading.Event()
+        errors = []
+
+        def stream(*args, **kwargs):
+            try:
+                yield {"type": "delta", "text": "第一段"}
+                entered.set()
+                release.wait(5)
+                yield {"type": "delta", "text": "第二段"}
+            finally:
+                closed.set()
+
+        async def run():
+            response = await api.generate_podcast_script_stream({"content": CONTENT})
+            body = response.body_iterator
+            await body.__anext__()
+            pending = asyncio.ensure_future(body.__anext__())
+            await asyncio.to_thread(entered.wait, 5)
+            # 模拟客户端断开：取消正在等待下一段的任务
+            pending.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+            self.assertFalse(closed.is_set())
+            release.set()
+
+        loop = asyncio.new_event_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        try:
+            with mock.patch.object(self.generator, "stream_podcast_script", side_effect=stream):
+                loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertTrue(closed.wait(5))
+        self.assertEqual(errors, [])
+
+    def test_empty_content_rejected(self):
+        """测试内容为空时返回400"""
+        response = self.client.post("/api/generate_podcast_script_stream", json={"content": None})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import mock
+from webapp import audio
+from webapp.audio import audio_options, build_segments, synthesize, synthesize_async
+from webapp.segment_store import SegmentStore, segment_key
+
+def _segments(texts, **overrides):
+    return [dict(dict(voice_id="male-qn-qingse", speed=1.0, volume=1, pitch=0, emotion="neutral",
+                      language="zh", text=text), **overrides) for text in texts]
+
+class _CountingTTS:
+    """记录每段文本的请求次数，指定的文本始终失败"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def synthesize_text_sync(self, text, voice_id, **kwargs):
+        with self.lock:
+            self.calls.append(text)
+        if text in self.fail:
+            raise Exception("503")
+        return f"{voice_id}:{text}".encode("utf-8")
+
+    async def synthesize_text_async(self, text, voice_id, **kwargs):
+        return self.synthesize_text_sync(text, voice_id, **kwargs)
+
+class TestSegmentStore(unittest.TestCase):
+    """测试逐句音频缓存和渲染清单"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = SegmentStore(self.temp_dir.name)
+        patcher = mock.patch.object(audio, "TTS_RETRY_DELAY", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_covers_voice_settings(self):
+        """测试文本或任一语音参数变化时缓存键不同"""
+        base = _segments(["你好"])[0]
+        keys = {segment_key(base, "pcm"), segment_key(base, "mp3")}
+        for field, value in (("text", "您好"), ("voice_id", "female-shaonv"), ("speed", 1.2), ("volume", 2),
+                             ("pitch", 1), ("emotion", "happy"), ("language", "en")):
+            keys.add(segment_key(dict(base, **{field: value}), "pcm"))
+        self.assertEqual(len(keys), 9)
+        self.assertEqual(segment_key(dict(base), "pcm"), segment_key(base, "pcm"))
+
+    def test_rerender_synthesizes_only_changed_lines(self):
+        """测试修改一句台词后重新渲染只合成这一句，清单记录复用情况"""
+        texts = [f"第{i}句" for i in range(6)]
+        tts = _CountingTTS()
+        first = synthesize(tts, _segments(texts), store=self.store, episode_id="ep1", concurrency=3)
+        self.assertEqual(sorted(tts.calls), sorted(texts))
+
+        texts[2] = "第2句（已修改）"
+        tts.calls.clear()
+        progress = []
+        second = synthesize(tts, _segments(texts), progress=lambda done, total: progress.append((done, total)),
+                            store=self.store, episode_id="ep1")
+        self.assertEqual(tts.calls, ["第2句（已修改）"])
+        self.assertEqual(second[:2] + second[3:], first[:2] + first[3:])
+        self.assertEqual(second[2], "male-qn-qingse:第2句（已修改）".encode("utf-8"))
+        self.assertEqual(progress, [(5, 6), (6, 6)])
+
+        manifest = self.store.load_manifest("ep1")
+        self.assertEqual((manifest["revision"], manifest["reused"], manifest["synthesized"]), (2, 5, 1))
+        self.assertEqual([item["reused"] for item in manifest["segments"]], [True, True, False, True, True, True])
+
+    def test_editing_one_line_of_long_script_resynthesizes_only_its_segment(self):
+        """测试多行单人脚本修改一行后，只重新合成这一行所在的段，清单按行记录复用情况"""
+        options = audio_options({"voice": "male-qn-qingse"})
+        lines = [f"这是第{i}句台词，内容大约有四十个字符长，用来模拟一份很长的单人播客脚本。" for i in range(200)]
+        tts = _CountingTTS()
+        synthesize(tts, build_segments("\n".join(lines), options), store=self.store, episode_id="ep3")
+        total = len(tts.calls)
+
+        lines[4] += "这里新加了一句话。又加了一句话。"
+        tts.calls.clear()
+        segments = build_segments("\n".join(lines), options)
+        synthesize(tts, segments, store=self.store, episode_id="ep3")
+        self.assertEqual(len(tts.calls), 1)
+        self.assertIn(lines[4], tts.calls[0])
+
+        manifest = self.store.load_manifest("ep3")
+        self.assertEqual((manifest["reused"], manifest["synthesized"]), (total - 1, 1))
+        self.assertEqual(len(manifest["lines"]), 200)
+        synthesized = [line["index"] for line in manifest["lines"] if not line["reused"]]
+        self.assertIn(4, synthesized)
+        self.assertEqual(manifest["lines_synthesized"], len(synthesized))
+        self.assertLessEqual(len(synthesized), len(segments[0]["lines"]))
+        line = manifest["lines"][4]
+        self.assertEqual(line["key"], segment_key(dict(segments[line["segments"][0]], text=lines[4]), audio.TTS_AUDIO_FORMAT))
+
+    def test_interrupted_render_resumes(self):
+        """测试渲染中途失败后，再次渲染只合成失败和未完成的段"""
+        texts = [f"第{i}句" for i in range(8)]
+        tts = _CountingTTS(fail={"第5句"})
+        with self.assertRaises(Exception):
+            synthesize(tts, _segments(texts), store=self.store, episode_id="ep2", concurrency=1, retries=0)
+        self.assertIsNone(self.store.load_manifest("ep2"))
+        finished = set(tts.calls) - {"第5句"}
+        self.assertTrue(finished)
+
+        tts = _CountingTTS()
+        pieces = asyncio.run(synthesize_async(tts, _segments(texts), store=self.store, episode_id="ep2"))
+        self.assertEqual(sorted(tts.calls), sorted(set(texts) - finished))
+        self.assertEqual(pieces, [f"male-qn-qingse:{text}".encode("utf-8") for text in texts])
+        self.assertEqual(self.store.load_manifest("ep2")["synthesized"], len(texts) - len(finished))
+
+    def test_eviction_and_episode_id_validation(self):
+        """测试超过容量时淘汰最久未使用的段，节目ID不能包含路径"""
+        store = SegmentStore(os.path.join(self.temp_dir.name, "small"), max_bytes=1000)
+        for index in range(5):
+            store.set(f"{index:02d}" + "0" * 62, b"x" * 300)
+        self.assertLessEqual(store.total_bytes, 900)
+        self.assertIsNotNone(store.get("04" + "0" * 62))
+        with self.assertRaises(ValueError):
+            store.save_manifest("../evil", [], [], [])
+
+if __name__ == '__main__':
+    unittest.main()
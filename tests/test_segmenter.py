@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+from webapp import segmenter
+from webapp.audio import audio_options, build_segments
+from webapp.segment_store import segment_key
+from webapp.segmenter import pack_lines, pack_text, segment_limit, split_sentences
+
+class TestSegmenter(unittest.TestCase):
+    """测试按句子边界合并TTS文本段"""
+
+    def test_split_sentences_keeps_punctuation(self):
+        """测试按句末标点和换行拆分，小数和引号不会被拆开"""
+        self.assertEqual(split_sentences("今天天气很好。你说呢？“当然！”\n圆周率约为3.14"),
+                         ["今天天气很好。", "你说呢？", "“当然！”", "圆周率约为3.14"])
+        self.assertEqual(split_sentences("It costs 3.5 dollars. Really? Yes!"),
+                         ["It costs 3.5 dollars.", "Really?", "Yes!"])
+
+    def test_consecutive_lines_packed_to_limit(self):
+        """测试连续台词合并为不超过上限的段，只在句子边界断开"""
+        lines = [f"这是第{i}句台词" for i in range(150)]
+        chunks = pack_text(lines, "zh", max_length=200)
+        self.assertLessEqual(len(chunks), 10)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertTrue(all(chunk.endswith("。") for chunk in chunks))
+        self.assertEqual("".join(chunks), "".join(f"{line}。" for line in lines))
+
+    def test_long_sentence_breaks_at_clauses_then_words(self):
+        """测试超长句先在逗号处断开，英文再按单词断开，不会切断单词"""
+        sentence = "，".join(["一二三四五六七八九"] * 10) + "。"
+        chunks = pack_text([sentence], "zh", max_length=30)
+        self.assertTrue(all(len(chunk) <= 30 and chunk[-1] in "，。" for chunk in chunks))
+        self.assertEqual("".join(chunks), sentence)
+
+        words = " ".join(f"word{i}" for i in range(40)) + "."
+        chunks = pack_text([words], "en", max_length=50)
+        self.assertTrue(all(len(chunk) <= 50 for chunk in chunks))
+        self.assertEqual(" ".join(chunks), words)
+
+    def test_language_limits(self):
+        """测试各语言的上限不超过MiniMax的单次请求上限，未知语言按中文处理"""
+        self.assertLess(segment_limit("zh"), segment_limit("en"))
+        self.assertEqual(segment_limit("ja"), segment_limit("zh"))
+        with mock.patch.dict(segmenter.SEGMENT_MAX_CHARS, {"en": 20000}):
+            self.assertEqual(segment_limit("en"), segmenter.MINIMAX_TEXT_LIMIT - 1)
+
+    def test_build_segments_groups_by_speaker(self):
+        """测试双人脚本只合并同一说话人的连续台词，单人纯文本合并为一段"""
+        options = audio_options({"mode": "double", "roleAName": "甲", "roleBName": "乙",
+                                 "roleAVoice": "voice-a", "roleBVoice": "voice-b"})
+        script = ('[{"role": "甲", "text": "大家好"}, {"role": "甲", "text": "欢迎收听。"}, '
+                  '{"role": "乙", "text": "你好"}, {"role": "甲", "text": "开始吧"}]')
+        self.assertEqual([(s["voice_id"], s["text"]) for s in build_segments(script, options)],
+                         [("voice-a", "大家好。欢迎收听。"), ("voice-b", "你好。"), ("voice-a", "开始吧。")])
+
+        options = audio_options({"voice": "voice-a", "language": "en"})
+        segments = build_segments("Hello there.\nThis is a podcast! Enjoy", options)
+        self.assertEqual([s["text"] for s in segments], ["Hello there. This is a podcast! Enjoy."])
+
+    def test_pack_lines_keeps_window_boundaries(self):
+        """测试只在行窗口内合并，窗口过长时在窗口内继续拆分"""
+        packed = pack_lines([f"第{i}句" for i in range(10)], "zh", max_lines=4)
+        self.assertEqual([windows for _, windows in packed], [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(packed[0][0], "第0句。第1句。第2句。第3句。")
+        packed = pack_lines(["一二三四五。六七八九十。"] * 2, "zh", max_lines=2, max_length=12)
+        self.assertEqual([windows for _, windows in packed], [[0, 1], [0, 1]])
+
+    def test_editing_one_line_changes_only_its_segment(self):
+        """测试修改一行台词（即使加长很多）只改变这一行所在的段，其他段的缓存键不变"""
+        options = audio_options({"voice": "voice-a"})
+        lines = [f"这是第{i}句台词，内容大约有四十个字符长，用来模拟一份很长的单人播客脚本。" for i in range(200)]
+        before = build_segments("\n".join(lines), options)
+        lines[4] += "这里新加了一句话。又加了一句话。"
+        after = build_segments("\n".join(lines), options)
+
+        self.assertEqual(len(before), len(after))
+        changed = [index for index, (old, new) in enumerate(zip(before, after))
+                   if segment_key(old, "pcm") != segment_key(new, "pcm")]
+        self.assertEqual(len(changed), 1)
+        self.assertIn(4, [line["index"] for line in after[changed[0]]["lines"]])
+
+if __name__ == '__main__':
+    unittest.main()
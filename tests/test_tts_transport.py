@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import json
+from unittest import mock
+import httpx
+from webapp.tts_transport import RateLimiter, TokenBucket, TTSTransport
+
+def _response(status, body, headers=None):
+    response = mock.Mock(status_code=status, headers=headers or {})
+    response.json.return_value = body
+    return response
+
+class TestRateLimiter(unittest.TestCase):
+    """测试令牌桶限流"""
+
+    def test_bucket_allows_burst_then_queues(self):
+        """测试突发量内不等待，之后按补充速率排队"""
+        with mock.patch("webapp.tts_transport.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=10, capacity=2)
+            waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.2)
+
+    def test_character_quota_and_wait_metrics(self):
+        """测试每分钟字符数配额和等待时间统计"""
+        with mock.patch("webapp.tts_transport.time.monotonic", return_value=100.0):
+            limiter = RateLimiter(chars_per_minute=600)
+            self.assertEqual(limiter.reserve(600), 0.0)
+            self.assertAlmostEqual(limiter.reserve(60), 6.0)
+        stats = limiter.stats()
+        self.assertEqual((stats["acquired"], stats["waited"]), (2, 1))
+        self.assertAlmostEqual(stats["max_wait_seconds"], 6.0)
+        self.assertAlmostEqual(stats["avg_wait_seconds"], 3.0)
+
+    def test_unlimited_by_default(self):
+        """测试未配置配额时不等待"""
+        limiter = RateLimiter()
+        self.assertEqual([limiter.reserve(5000) for _ in range(3)], [0.0, 0.0, 0.0])
+        import os
+        env = {name: value for name, value in os.environ.items()
+               if name not in ("MINIMAX_RPM", "MINIMAX_CHARS_PER_MINUTE", "MINIMAX_BURST")}
+        with mock.patch.dict(os.environ, env, clear=True):
+            transport = TTSTransport.from_env()
+        self.addCleanup(transport.close)
+        self.assertEqual([transport.limiter.reserve(5000) for _ in range(10)], [0.0] * 10)
+
+class TestTTSTransport(unittest.TestCase):
+    """测试TTS请求的重试"""
+
+    def setUp(self):
+        self.transport = TTSTransport(max_retries=3, backoff_base=0)
+        self.addCleanup(self.transport.close)
+
+    def test_retries_rate_limits_and_server_errors(self):
+        """测试429、5xx和MiniMax限流错误码会重试，成功后返回结果"""
+        ok = {"data": {"audio": "00"}, "base_resp": {"status_code": 0}}
+        responses = [_response(429, {}), _response(503, {}), _response(200, {"base_resp": {"status_code": 1002}}),
+                     _response(200, ok)]
+        with mock.patch.object(self.transport.session, "post", side_effect=responses) as post:
+            self.assertEqual(self.transport.post("https://tts", {}, {"text": "你好"}, chars=2), ok)
+        self.assertEqual(post.call_count, 4)
+        stats = self.transport.stats()
+        self.assertEqual((stats["requests"], stats["retries"], stats["failures"]), (4, 3, 0))
+
+    def test_gives_up_after_max_retries(self):
+        """测试重试次数用尽后报错，不可重试的响应直接返回"""
+        with mock.patch.object(self.transport.session, "post", return_value=_response(502, {})) as post:
+            with self.assertRaises(Exception):
+                self.transport.post("https://tts", {}, {})
+        self.assertEqual(post.call_count, 4)
+        bad_request = {"base_resp": {"status_code": 2013, "status_msg": "invalid params"}}
+        with mock.patch.object(self.transport.session, "post", return_value=_response(400, bad_request)) as post:
+            self.assertEqual(self.transport.post("https://tts", {}, {}), bad_request)
+        self.assertEqual(post.call_count, 1)
+
+    def test_backoff_is_jittered_and_honours_retry_after(self):
+        """测试退避时间在指数上限内随机，服务端要求的等待时间优先"""
+        transport = TTSTransport(backoff_base=1, backoff_max=5)
+        delays = [transport.backoff(3) for _ in range(50)]
+        self.assertTrue(all(0 <= delay <= 5 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertGreaterEqual(transport.backoff(0, retry_after=7), 7)
+
+    def test_async_requests_retry(self):
+        """测试异步请求同样重试"""
+        statuses = iter([503, 200])
+
+        def handler(request):
+            status = next(statuses)
+            return httpx.Response(status, json={"data": {"audio": "00"}} if status == 200 else {})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await self.transport.post_async(client, "https://tts", {}, {"text": "你好"}, chars=2)
+
+        self.assertEqual(asyncio.run(run()), {"data": {"audio": "00"}})
+        self.assertEqual(self.transport.stats()["retries"], 1)
+
+class TestStreamingSynthesis(unittest.TestCase):
+    """测试MiniMax流式合成"""
+
+    def setUp(self):
+        import os
+        from webapp.minimax_tts import MiniMaxTTS
+        with mock.patch.dict(os.environ, {"MINIMAX_API_KEY": "k", "MINIMAX_GROUP_ID": "g", "MINIMAX_STREAM": "1"}):
+            self.tts = MiniMaxTTS(TTSTransport(backoff_base=0))
+        self.addCleanup(self.tts.transport.close)
+        events = [{"data": {"audio": "0102", "status": 1}}, {"data": {"audio": "030405", "status": 1}},
+                  {"data": {"audio": "0102030405", "status": 2}, "base_resp": {"status_code": 0}}]
+        self.body = "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode("utf-8")
+
+    def test_async_chunks_decoded_without_aggregate(self):
+        """测试异步流式合成逐块解码音频，跳过结束时的整段汇总"""
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(json.loads(request.content))
+            return httpx.Response(200, content=self.body, headers={"content-type": "text/event-stream"})
+
+        async def run():
+            self.tts._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            self.tts._async_loop = asyncio.get_running_loop()
+            try:
+                chunks = [chunk async for chunk in self.tts.iter_synthesize_text_async("你好", "voice", format="pcm")]
+                return chunks, await self.tts.synthesize_text_async("你好", "voice", format="pcm")
+            finally:
+                await self.tts.aclose()
+
+        chunks, audio = asyncio.run(run())
+        self.assertEqual(chunks, [b"\x01\x02", b"\x03\x04\x05"])
+        self.assertEqual(audio, b"\x01\x02\x03\x04\x05")
+        self.assertTrue(requests_seen[0]["stream"])
+        self.assertEqual(requests_seen[0]["stream_options"], {"exclude_aggregated_audio": True})
+
+    def test_sync_stream_retries_before_first_chunk(self):
+        """测试同步流式合成在收到响应前失败时重试，接口错误码直接报错"""
+        ok = mock.MagicMock(status_code=200, headers={"content-type": "text/event-stream"})
+        ok.iter_lines.return_value = self.body.split(b"\n")
+        with mock.patch.object(self.tts.transport.session, "post", side_effect=[_response(503, {}), ok]) as post:
+            self.assertEqual(self.tts.synthesize_text_sync("你好", "voice"), b"\x01\x02\x03\x04\x05")
+        self.assertEqual(post.call_count, 2)
+        self.assertTrue(post.call_args.kwargs["stream"])
+        with self.assertRaises(Exception):
+            self.tts._parse_stream_line('data: {"base_resp": {"status_code": 2013, "status_msg": "invalid"}}')
+
+    def test_stream_http_and_json_errors_raise(self):
+        """测试流式请求返回4xx或普通JSON错误时报错，而不是返回空音频"""
+        unauthorized = _response(401, {})
+        unauthorized.text = '{"error": "invalid api key"}'
+        error = {"base_resp": {"status_code": 1004, "status_msg": "authentication failed"}}
+        json_error = _response(200, error, {"content-type": "application/json"})
+        for response in (unauthorized, json_error):
+            with mock.patch.object(self.tts.transport.session, "post", return_value=response) as post:
+                with self.assertRaises(Exception):
+                    self.tts.synthesize_text_sync("你好", "voice")
+            self.assertEqual(post.call_count, 1)
+
+    def test_stream_rate_limit_event_retried(self):
+        """测试流式响应的第一条事件是限流错误码时重试"""
+        limited = httpx.Response(200, content=b'data: {"base_resp": {"status_code": 1002, "status_msg": "rate limit"}}\n\n',
+                                 headers={"content-type": "text/event-stream"})
+        responses = iter([limited, httpx.Response(200, content=self.body, headers={"content-type": "text/event-stream"})])
+
+        async def run():
+            self.tts._async_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+            self.tts._async_loop = asyncio.get_running_loop()
+            try:
+                return await self.tts.synthesize_text_async("你好", "voice", format="pcm")
+            finally:
+                await self.tts.aclose()
+
+        self.assertEqual(asyncio.run(run()), b"\x01\x02\x03\x04\x05")
+        self.assertEqual(self.tts.transport.stats()["retries"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 import os
-from content_extractor.extractors.txt_extractor import TXTExtractor
+from content_extractor.extractors.txt_extractor import TXTExtractor, LineClassifier
 from content_extractor.exceptions import NoValidContentError, FileNotFoundError, UnsupportedFormatError
 from content_extractor import ContentExtractor
 
@@ -95,6 +95,15 @@ class TestTXTExtractor(unittest.TestCase):
         except Exception as e:
             self.fail(f"处理有效文本文件时发生意外错误: {e}")
 
+    def test_line_classifier(self):
+        """测试预编译分类器一次返回标题层级、列表类型和正文"""
+        classifier = LineClassifier()
+        self.assertEqual(classifier.classify("第二章 主要内容"), ('heading', 1, None, "第二章 主要内容"))
+        self.assertEqual(classifier.classify("一、背景介绍"), ('list', None, 'chinese', "背景介绍"))
+        self.assertEqual(classifier.classify("Chapter One"), ('heading', 2, None, "Chapter One"))
+        self.assertEqual(classifier.classify("• 项目一"), ('list', None, 'bullet', "项目一"))
+        self.assertEqual(classifier.classify("这是一个普通段落。"), ('paragraph', None, None, "这是一个普通段落。"))
+
     def test_extract_empty_file(self):
         """测试空文件处理"""
         empty_file_path = "tests/data/empty.txt"
@@ -111,16 +120,68 @@ class TestTXTExtractor(unittest.TestCase):
         with self.assertRaises(NoValidContentError):
             self.txt_extractor.extract(self.non_existent_file_path)
 
-    def test_extract_non_utf8_file(self):
-        """测试非UTF-8编码文件处理"""
-        non_utf8_file_path = "tests/data/non_utf8.txt"
-        with open(non_utf8_file_path, "w", encoding="gbk") as f:
-            f.write("这是一个GBK编码的文件")
-        
-        with self.assertRaises(NoValidContentError):
-            self.txt_extractor.extract(non_utf8_file_path)
+    def test_extract_gbk_file(self):
+        """测试GBK编码文件自动识别"""
+        gbk_file_path = "tests/data/gbk.txt"
+        with open(gbk_file_path, "w", encoding="gbk") as f:
+            f.write("这是一个GBK编码的文件\n\n第二段内容。")
         
-        os.remove(non_utf8_file_path)
+        try:
+            result = self.txt_extractor.extract(gbk_file_path)
+            self.assertEqual(result["metadata"]["encoding"], "gb18030")
+            self.assertEqual(result["content"][0]["text"], "这是一个GBK编码的文件")
+            self.assertEqual(len(result["content"]), 2)
+        finally:
+            os.remove(gbk_file_path)
+
+    def test_extract_utf16_file(self):
+        """测试UTF-16编码文件（带BOM和不带BOM）自动识别"""
+        utf16_file_path = "tests/data/utf16.txt"
+        for encoding in ("utf-16", "utf-16-le"):
+            with open(utf16_file_path, "w", encoding=encoding) as f:
+                f.write("Chapter One\n\n这是第一段内容。")
+            try:
+                result = self.txt_extractor.extract(utf16_file_path)
+                self.assertEqual(result["content"][0]["content_type"], "heading")
+                self.assertEqual(result["content"][1]["text"], "这是第一段内容。")
+            finally:
+                os.remove(utf16_file_path)
+
+    def test_detect_bomless_chinese_utf16(self):
+        """测试无BOM的中文UTF-16（两种字节序）能被识别，GBK和UTF-8中文不会被误判"""
+        from content_extractor.extractors.txt_extractor import detect_encoding
+        text = "第一章 播客的由来\n\n这是一段中文内容，用来测试没有字节顺序标记的UTF-16文件。"
+        self.assertEqual(detect_encoding(text.encode("utf-16-le")), "utf-16-le")
+        self.assertEqual(detect_encoding(text.encode("utf-16-be")), "utf-16-be")
+        self.assertEqual(detect_encoding(text.encode("gbk")), "gb18030")
+        self.assertEqual(detect_encoding(text.encode("utf-8")), "utf-8")
+
+        utf16_file_path = "tests/data/utf16_zh.txt"
+        for encoding in ("utf-16-le", "utf-16-be"):
+            with open(utf16_file_path, "w", encoding=encoding) as f:
+                f.write(text)
+            try:
+                result = self.txt_extractor.extract(utf16_file_path)
+                self.assertEqual(result["metadata"]["encoding"], encoding)
+                self.assertEqual(result["content"][-1]["text"], text.split("\n")[-1])
+            finally:
+                os.remove(utf16_file_path)
+
+    def test_iter_content_streams_items(self):
+        """测试流式提取逐个产出内容并累计统计信息"""
+        from content_extractor.extractors.txt_extractor import TextStats
+        stats = TextStats()
+        items = list(self.txt_extractor.iter_content(self.test_file_path, stats=stats))
+        self.assertEqual(items, self.txt_extractor.extract(self.test_file_path)["content"])
+        self.assertEqual(stats.total_lines, 15)
+        self.assertGreater(stats.word_count, 0)
+
+    def test_extract_with_budget_stops_early(self):
+        """测试设置预算后只返回预算内的内容"""
+        from content_extractor.budget import ContentBudget
+        result = self.txt_extractor.extract(self.test_file_path, budget=ContentBudget(max_chars=20))
+        self.assertTrue(result["metadata"]["truncated"])
+        self.assertLess(len(result["content"]), len(self.txt_extractor.extract(self.test_file_path)["content"]))
 
 
 class TestContentExtractorTXTIntegration(unittest.TestCase):
@@ -0,0 +1,108 @@
+import unittest
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from content_extractor import ContentExtractor, ExtractionCache
+from content_extractor.upload import UploadSpool, NamedBytesIO, safe_filename
+
+class TestUploadSpool(unittest.TestCase):
+    """测试上传暂存区"""
+
+    def test_small_upload_stays_in_memory(self):
+        """测试小文件只保存在内存中，摘要在写入时计算"""
+        data = "第一章\n\n这是一段用于测试上传暂存区的正文内容。\n".encode("utf-8")
+        with UploadSpool.from_fileobj(io.BytesIO(data), "notes.txt") as spool:
+            self.assertTrue(spool.in_memory)
+            self.assertIsNone(spool.path)
+            self.assertEqual(spool.digest, hashlib.sha256(data).hexdigest())
+            self.assertEqual(spool.source.read(), data)
+
+    def test_large_uploads_spool_to_unique_paths(self):
+        """测试超过上限的同名上传转存到不同的临时文件，关闭后删除"""
+        first = UploadSpool.from_fileobj(io.BytesIO(b"a" * 100), "report.pdf", max_memory=10)
+        second = UploadSpool.from_fileobj(io.BytesIO(b"b" * 100), "report.pdf", max_memory=10)
+        try:
+            self.assertNotEqual(first.path, second.path)
+            self.assertEqual(os.path.basename(first.path), "report.pdf")
+            with open(first.source, "rb") as f:
+                self.assertEqual(f.read(), b"a" * 100)
+        finally:
+            first.close()
+            second.close()
+        self.assertFalse(os.path.exists(first.path))
+
+    def test_safe_filename(self):
+        """测试去掉客户端文件名中的目录部分"""
+        self.assertEqual(safe_filename("../../etc/报告.pdf"), "报告.pdf")
+        self.assertEqual(safe_filename("C:\\Users\\a\\b.docx"), "b.docx")
+        self.assertEqual(safe_filename(""), "upload")
+
+
+class TestProcessStream(unittest.TestCase):
+    """测试从二进制流提取内容"""
+
+    def setUp(self):
+        self.extractor = ContentExtractor()
+
+    def _assert_same_as_file(self, path):
+        if not os.path.exists(path):
+            self.skipTest(f"跳过测试：{path} 文件不存在")
+        from_file = self.extractor.process_file(path)
+        with open(path, "rb") as f:
+            stream = NamedBytesIO(f.read(), name=os.path.basename(path))
+        from_stream = self.extractor.process_stream(stream, path)
+        for key in ("file_size", "created_time", "modified_time"):
+            from_file["metadata"].pop(key, None)
+            from_stream["metadata"].pop(key, None)
+        self.assertEqual(from_file, from_stream)
+
+    def test_pdf_stream(self):
+        """测试PDF二进制流与文件路径提取结果一致"""
+        self._assert_same_as_file("tests/data/test.pdf")
+
+    def test_docx_stream(self):
+        """测试Word二进制流与文件路径提取结果一致"""
+        self._assert_same_as_file("tests/data/test.docx")
+
+    def test_txt_stream(self):
+        """测试文本二进制流与文件路径提取结果一致"""
+        self._assert_same_as_file("tests/data/sample.txt")
+
+    def test_upload_shares_cache_with_file(self):
+        """测试上传内容与磁盘上相同内容的文件命中同一缓存条目"""
+        path = "tests/data/sample.txt"
+        cache = ExtractionCache()
+        extractor = ContentExtractor(cache=cache)
+        extractor.process_file(path)
+        with open(path, "rb") as f, UploadSpool.from_fileobj(f, "renamed.txt") as spool:
+            extractor.process_upload(spool)
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+
+
+class TestExtractFileEndpoint(unittest.TestCase):
+    """测试上传接口"""
+
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from webapp import api
+        app = FastAPI()
+        app.include_router(api.router)
+        self.client = TestClient(app)
+
+    def test_concurrent_uploads_with_same_name(self):
+        """测试同名文件并发上传时互不覆盖"""
+        def upload(index):
+            text = f"第{index}号报告\n\n这是第{index}号报告的正文内容，用于测试并发上传。\n"
+            response = self.client.post("/api/extract_file",
+                                        files={"file": ("report.txt", text.encode("utf-8"), "text/plain")})
+            return index, response.json()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for index, body in executor.map(upload, range(8)):
+                self.assertTrue(body["success"], body)
+                self.assertEqual(body["content"]["title"], f"第{index}号报告")
+
+if __name__ == '__main__':
+    unittest.main()
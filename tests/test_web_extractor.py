@@ -1,5 +1,11 @@
 import unittest
 import os
+import shutil
+import tempfile
+import threading
+import lxml.html
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 from content_extractor.extractors.web_extractor import WebExtractor
 from content_extractor.exceptions import NoValidContentError, AccessDeniedError
 
@@ -53,6 +59,115 @@ class TestWebExtractor(unittest.TestCase):
         with self.assertRaises(AccessDeniedError):
             self.extractor.extract("https://example.com/403")
 
+    def test_extract_content_in_document_order(self):
+        """测试单次遍历按文档顺序输出标题、段落和列表"""
+        root = lxml.html.document_fromstring(
+            "<html><body><h1>第一章</h1><p>第一章的段落内容足够长。<!-- 注释 --><b>加粗</b></p>"
+            "<ul><li>甲</li><li> 乙 </li></ul><h2>第二章</h2><p>太短</p>"
+            "<ol><li>丙</li></ol><p>第二章的段落内容足够长。</p></body></html>"
+        )
+        content = self.extractor._extract_content(root)
+
+        self.assertEqual([item["content_type"] for item in content],
+                         ["heading", "paragraph", "list", "heading", "list", "paragraph"])
+        self.assertEqual(content[1], {"section_title": "第一章", "text": "第一章的段落内容足够长。加粗",
+                                      "content_type": "paragraph"})
+        self.assertEqual(content[2]["text"], [{"text": "甲", "type": "bullet"}, {"text": "乙", "type": "bullet"}])
+        self.assertEqual(content[4]["list_type"], "number")
+        self.assertEqual(content[5]["section_title"], "第二章")
+
+    def test_extract_from_raw_html_skips_scripts(self):
+        """测试兜底提取定位主要内容区域并忽略脚本"""
+        root = lxml.html.document_fromstring(
+            "<html><body><div class='sidebar'><p>侧边栏的内容不应该被提取。</p></div>"
+            "<div class='Main-Content'><h2>标题</h2><script>var x = 1;</script>"
+            "<p>正文段落<script>ignored()</script>内容足够长度了。</p></div></body></html>"
+        )
+        content = self.extractor._extract_from_raw_html(root)
+        self.assertEqual([item["text"] for item in content], ["", "正文段落内容足够长度了。"])
+
+    def test_raw_html_fallback_sees_unmodified_tree(self):
+        """测试兜底提取使用未被readability修改的原始HTML树，正常路径只解析一次"""
+        html = ("<html><body><div class='main'><p>正文段落内容足够长度了。</p>"
+                "<p style='display:none'>隐藏段落的内容也足够长了。</p></div></body></html>")
+        original = lxml.html.tostring(self.extractor._parse_html(html))
+        seen = []
+
+        def fallback(root):
+            seen.append(lxml.html.tostring(root))
+            return [{"section_title": "", "text": "兜底内容", "content_type": "paragraph"}]
+
+        with mock.patch.object(self.extractor, "_extract_content", return_value=[]), \
+                mock.patch.object(self.extractor, "_extract_from_raw_html", side_effect=fallback):
+            self.extractor.parse_document(html, "https://example.com")
+        self.assertEqual(seen, [original])
+
+        with mock.patch.object(self.extractor, "_parse_html", wraps=self.extractor._parse_html) as parse, \
+                mock.patch.object(self.extractor, "_extract_content", return_value=[{"text": "正文"}]):
+            self.extractor.parse_document(html, "https://example.com")
+        self.assertEqual(parse.call_count, 1)
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    """返回带ETag的固定页面，命中 If-None-Match 时返回304"""
+
+    body = ("<html><head><title>测试页面</title></head><body><article>"
+            "<h1>测试标题</h1><p>这是一段足够长的测试段落内容，用于验证网页提取。</p>"
+            "</article></body></html>").encode("utf-8")
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWebExtractorHTTPCache(unittest.TestCase):
+    """测试连接池和条件请求缓存"""
+
+    def setUp(self):
+        _ETagHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/article"
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_unchanged_page_revalidates_with_304(self):
+        """测试未变化的网页通过304复用上次的提取结果"""
+        extractor = WebExtractor(http_cache_dir=self.cache_dir)
+        first = extractor.extract(self.url)
+
+        with mock.patch.object(extractor, "_build_result") as build_result:
+            second = extractor.extract(self.url)
+            build_result.assert_not_called()
+
+        self.assertEqual(first, second)
+        self.assertEqual(_ETagHandler.requests_seen, [None, '"v1"'])
+
+    def test_session_is_shared(self):
+        """测试多次请求复用同一个会话"""
+        extractor = WebExtractor()
+        extractor.extract(self.url)
+        session = extractor.session
+        extractor.extract(self.url)
+        self.assertIs(extractor.session, session)
+
+
 class TestContentExtractorWebIntegration(unittest.TestCase):
     """测试网页提取器与内容提取器的集成"""
     
@@ -1,35 +1,45 @@
 from fastapi import APIRouter, UploadFile, File, Form, Request, Body
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import os
 import json
-import requests
-from werkzeug.utils import secure_filename
-import shutil
-from content_extractor.extractor import ContentExtractor
-from ai_parser.podcast_generator import PodcastGenerator
 from typing import Union
 import traceback
-from webapp.minimax_tts import get_tts_client
-import re
-from pydub import AudioSegment
 import io
+import threading
+from webapp.services import (
+    get_batch_extractor,
+    get_extraction_cache,
+    get_extractor,
+    get_job_data_dir,
+    get_job_queue,
+    get_job_store,
+    get_podcast_generator,
+    get_segment_store,
+    get_tts_client
+)
+from webapp.audio import (STREAM_MEDIA_TYPES, StreamEncoder, audio_options, build_segments, render_audio,
+                          stream_audio, synthesize_async)
+from webapp.concurrency import get_pool, run_in_pool
+from webapp.segment_store import is_valid_episode_id
+from webapp.utils import save_job_upload, spool_upload, sse_event, strip_code_fences
 
 router = APIRouter()
 
-# 获取当前文件所在目录的绝对路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# 配置上传目录
-UPLOAD_FOLDER = os.path.join(current_dir, 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-extractor = ContentExtractor()
-generator = PodcastGenerator()
+# 提取器、缓存和脚本生成器由 webapp.services 统一管理，首次使用时创建
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '200'))
 
 @router.post('/api/extract_file')
-async def extract_file(file: Union[UploadFile, object] = File(...)):
+async def extract_file(
+    file: Union[UploadFile, object] = File(...),
+    pages: str = Form(None),
+    chapters: str = Form(None),
+    sample_pages: int = Form(None),
+    max_chars: int = Form(None),
+    max_tokens: int = Form(None)
+):
     """
     兼容 FastAPI 和 Starlette 的 UploadFile 类型
+    可选参数 pages / chapters / sample_pages 仅对PDF生效，max_chars / max_tokens 限制提取量
     """
     try:
         # 兼容 starlette.datastructures.UploadFile
@@ -37,42 +47,94 @@ async def extract_file(file: Union[UploadFile, object] = File(...)):
         fileobj = getattr(file, 'file', None)
         if not filename or not fileobj:
             return JSONResponse(status_code=400, content={"error": "无效的文件对象"})
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        with open(filepath, 'wb') as buffer:
-            shutil.copyfileobj(fileobj, buffer)
-        # 使用ContentExtractor提取内容
-        result = extractor.process_file(filepath)
-        os.remove(filepath)
+        # 小文件只在内存中处理，大文件转存到独立临时目录，读取时同步计算摘要用于缓存
+        # 提取在独立的线程池中执行，不阻塞事件循环
+        with await spool_upload(file) as spool:
+            result = await run_in_pool(
+                'extract',
+                get_extractor().process_upload,
+                spool,
+                pages=pages,
+                chapters=chapters,
+                sample_pages=sample_pages,
+                max_chars=max_chars,
+                max_tokens=max_tokens
+            )
         return {"success": True, "content": result}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post('/api/extract_url')
-async def extract_url(url: str = Form(...)):
+async def extract_url(url: str = Form(...), max_chars: int = Form(None), max_tokens: int = Form(None)):
     try:
-        result = extractor.process_url(url)
+        result = await run_in_pool('extract', get_extractor().process_url, url, max_chars=max_chars, max_tokens=max_tokens)
         return {"success": True, "content": result}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@router.post('/api/extract_urls')
+async def extract_urls(payload: dict = Body(...)):
+    """
+    批量提取多个网页，以NDJSON流的形式按完成顺序逐行返回每个URL的结果
+    请求体: {"urls": [...], "max_chars": 可选, "max_tokens": 可选}
+    """
+    urls = payload.get('urls')
+    if not isinstance(urls, list) or not urls:
+        return JSONResponse(status_code=400, content={"error": "未提供URL列表"})
+    if len(urls) > BATCH_MAX_URLS:
+        return JSONResponse(status_code=400, content={"error": f"单次最多提取{BATCH_MAX_URLS}个URL"})
+    max_chars = payload.get('max_chars')
+    max_tokens = payload.get('max_tokens')
+
+    async def stream_results():
+        async for item in get_batch_extractor().extract_many(
+            [str(url) for url in urls],
+            max_chars=int(max_chars) if max_chars else None,
+            max_tokens=int(max_tokens) if max_tokens else None
+        ):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_results(), media_type='application/x-ndjson')
+
 @router.post('/api/extract')
 async def extract(request: Request):
     form = await request.form()
+    max_chars = int(form['max_chars']) if form.get('max_chars') else None
+    max_tokens = int(form['max_tokens']) if form.get('max_tokens') else None
     if 'file' in form:
         file = form['file']
         # 直接传递 file
-        return await extract_file(file)
+        return await extract_file(
+            file,
+            pages=form.get('pages'),
+            chapters=form.get('chapters'),
+            sample_pages=int(form['sample_pages']) if form.get('sample_pages') else None,
+            max_chars=max_chars,
+            max_tokens=max_tokens
+        )
     elif 'url' in form:
         url = form['url']
-        return await extract_url(url)
+        return await extract_url(url, max_chars=max_chars, max_tokens=max_tokens)
     else:
         return JSONResponse(status_code=400, content={"error": "未提供文件或URL"})
 
+@router.get('/api/cache_stats')
+async def get_cache_stats():
+    return {"success": True, "extraction": get_extraction_cache().stats()}
+
+@router.get('/api/tts_stats')
+async def get_tts_stats():
+    """TTS请求计数、重试次数和限流等待时间"""
+    try:
+        return {"success": True, "transport": get_tts_client().transport.stats()}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
 @router.get('/api/available_voices')
 async def get_available_voices():
     try:
         tts = get_tts_client()
-        voices_raw = tts.get_available_voices()  # 原始格式: [{"voice_id":..., "voice_name":...}, ...]
+        voices_raw = await tts.get_available_voices_async()  # 原始格式: [{"voice_id":..., "voice_name":...}, ...]
         
         # 将后端格式转换为前端需要的格式
         voices_formatted = [
@@ -106,147 +168,255 @@ async def generate_audio(
     volume: float = Form(1.0),
     pitch: float = Form(1.0),
     emotion: str = Form('neutral'),
-    language: str = Form('zh')
+    language: str = Form('zh'),
+    episode_id: str = Form(None),
+    stream: bool = Form(False),
+    format: str = Form('mp3')
 ):
     """
     支持双人模式结构化脚本顺序合成和拼接音频。
     前端 text 字段可为结构化 JSON（推荐），也可为纯文本。
+    TTS请求使用异步HTTP客户端，音频解码和编码在 audio 线程池中执行。
+    长脚本建议使用 /api/jobs/audio 提交后台任务，避免长时间占用连接。
+    已合成过的台词从逐句缓存中复用；传入 episode_id 时保存该节目的渲染清单，
+    复用和新合成的段数通过 X-Segments-Reused / X-Segments-Synthesized 响应头返回，
+    重新合成的台词行数通过 X-Lines-Synthesized 返回。
+    stream=true 时以分块传输边合成边返回 format（mp3 / wav）格式的音频，开头几句合成后即可开始播放；
+    响应开始后某段合成失败只能中断连接，客户端会收到不完整的音频。
     """
-    tts = get_tts_client()
-    combined_audio = AudioSegment.empty()
+    options = audio_options({
+        'mode': mode, 'roleAName': roleAName, 'roleBName': roleBName,
+        'roleAVoice': roleAVoice, 'roleBVoice': roleBVoice, 'voice': voice,
+        'speedA': speedA, 'volumeA': volumeA, 'pitchA': pitchA, 'emotionA': emotionA,
+        'speedB': speedB, 'volumeB': volumeB, 'pitchB': pitchB, 'emotionB': emotionB,
+        'speed': speed, 'volume': volume, 'pitch': pitch, 'emotion': emotion,
+        'language': language
+    })
 
     try:
-        if mode == 'double':
-            # 优先尝试解析结构化 JSON
-            try:
-                script_json = json.loads(text)
-                assert isinstance(script_json, list)
-            except Exception:
-                # 回退为按行分割的纯文本
-                lines = text.split('\n')
-                script_json = []
-                for line in lines:
-                    if roleAName and line.startswith(roleAName):
-                        script_json.append({'role': roleAName, 'text': line[len(roleAName):].strip()})
-                    elif roleBName and line.startswith(roleBName):
-                        script_json.append({'role': roleBName, 'text': line[len(roleBName):].strip()})
-            
-            for item in script_json:
-                role = item.get('role')
-                txt = item.get('text', '').strip()
-                if not txt:
-                    continue
-                
-                audio_piece = None
-                if role == roleAName:
-                    audio_piece = tts.synthesize_long_text(
-                        txt, roleAVoice,
-                        speed=speedA, volume=int(volumeA), pitch=int(pitchA), emotion=emotionA, language=language
-                    )
-                elif role == roleBName:
-                    audio_piece = tts.synthesize_long_text(
-                        txt, roleBVoice,
-                        speed=speedB, volume=int(volumeB), pitch=int(pitchB), emotion=emotionB, language=language
-                    )
-                
-                if audio_piece:
-                    segment = AudioSegment.from_file(io.BytesIO(audio_piece), format="mp3")
-                    combined_audio += segment
-
-        else:
-            # 单人模式，逐句合成后拼接，提升长文本稳定性
-            try:
-                # 尝试解析结构化 JSON
-                script_json = json.loads(text)
-                assert isinstance(script_json, list)
-                # 只合成每个对象的text字段内容，不朗读role、章节标题等
-                text_list = [item['text'].strip() for item in script_json if 'text' in item and item['text'].strip()]
-            except Exception:
-                # 纯文本，按句号/换行分割
-                text_list = [s.strip() for s in re.split(r'[。！？!?.\n]', text) if s.strip()]
-            
-            for seg in text_list:
-                audio_piece = tts.synthesize_long_text(
-                    seg, voice,
-                    speed=speed, volume=int(volume), pitch=int(pitch), emotion=emotion, language=language
-                )
-                if audio_piece:
-                    segment = AudioSegment.from_file(io.BytesIO(audio_piece), format="mp3")
-                    combined_audio += segment
-        
-        # 将拼接好的音频导出为二进制格式
-        buffer = io.BytesIO()
-        combined_audio.export(buffer, format="mp3")
-        buffer.seek(0)
-        
-        return StreamingResponse(buffer, media_type='audio/mpeg')
+        if episode_id and not is_valid_episode_id(episode_id):
+            return JSONResponse(status_code=400, content={"success": False, "message": "无效的节目ID"})
+        if format not in STREAM_MEDIA_TYPES:
+            return JSONResponse(status_code=400, content={"success": False, "message": f"不支持的音频格式: {format}"})
+        store = get_segment_store()
+        segments = build_segments(text, options)
+        if stream:
+            encoder = StreamEncoder(format)
+            return StreamingResponse(
+                stream_audio(get_tts_client(), segments, encoder, store=store, episode_id=episode_id),
+                media_type=encoder.media_type,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        pieces = await synthesize_async(get_tts_client(), segments, store=store, episode_id=episode_id)
+
+        # 拼接并导出为二进制格式
+        audio_bytes, _ = await run_in_pool('audio', render_audio, pieces, format)
+
+        headers = {}
+        manifest = await run_in_pool('audio', store.load_manifest, episode_id) if episode_id else None
+        if manifest:
+            headers = {"X-Segments-Reused": str(manifest['reused']),
+                       "X-Segments-Synthesized": str(manifest['synthesized']),
+                       "X-Lines-Synthesized": str(manifest.get('lines_synthesized', 0))}
+        return StreamingResponse(io.BytesIO(audio_bytes), media_type=STREAM_MEDIA_TYPES[format], headers=headers)
 
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
 
+def _task_summary(job: dict) -> dict:
+    """转换为任务列表中显示的字段"""
+    result = job.get('result') or {}
+    return {
+        "id": job['id'],
+        "kind": job['kind'],
+        "status": job['status'],
+        "progress": job['progress'],
+        "done": job['done'],
+        "total": job['total'],
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at'],
+        "text_preview": job.get('text_preview') or '',
+        "voice_id": job.get('voice_id') or '',
+        "duration": job.get('duration'),
+        "audio_url": result.get('audio_url') if job['status'] == 'completed' else None,
+        "episode_id": result.get('episode_id'),
+        "error": job.get('error'),
+    }
+
 @router.get('/api/task_list')
-async def get_task_list():
-    # 示例任务列表，可根据实际需求修改
-    tasks = [
-        {"id": 1, "name": "播客脚本生成", "status": "完成", "created_at": "2024-06-01 10:00:00"},
-        {"id": 2, "name": "音频合成", "status": "进行中", "created_at": "2024-06-01 10:05:00"}
-    ]
-    return {"success": True, "tasks": tasks}
+async def get_task_list(limit: int = 50, kind: str = None):
+    jobs = get_job_store().list(limit=limit, kind=kind)
+    return {"success": True, "tasks": [_task_summary(job) for job in jobs]}
+
+@router.post('/api/jobs/extract')
+async def submit_extract_job(request: Request):
+    """
+    提交提取任务，表单字段同 /api/extract（file 或 url，可选 max_chars / max_tokens）
+    上传文件保存到任务目录，任务结束后删除
+    """
+    form = await request.form()
+    params = {
+        "max_chars": int(form['max_chars']) if form.get('max_chars') else None,
+        "max_tokens": int(form['max_tokens']) if form.get('max_tokens') else None,
+    }
+    upload = form.get('file')
+    if upload is not None and getattr(upload, 'filename', None):
+        with await spool_upload(upload) as spool:
+            params["file_path"] = await run_in_pool('extract', save_job_upload, spool, get_job_data_dir())
+        preview = spool.filename
+    elif form.get('url'):
+        params["url"] = form['url']
+        preview = form['url']
+    else:
+        return JSONResponse(status_code=400, content={"error": "未提供文件或URL"})
+    job = get_job_queue().submit('extract', params, text_preview=preview)
+    return {"success": True, "job_id": job['id'], "task": _task_summary(job)}
+
+@router.post('/api/jobs/script')
+async def submit_script_job(payload: dict = Body(...)):
+    """提交脚本生成任务，请求体同 /api/generate_podcast_script"""
+    content = payload.get('content')
+    if not content:
+        return JSONResponse(status_code=400, content={"error": "内容为空，无法生成播客脚本"})
+    params = dict(_script_options(payload), content=content)
+    job = get_job_queue().submit('script', params, text_preview=content.get('title') or '')
+    return {"success": True, "job_id": job['id'], "task": _task_summary(job)}
+
+@router.post('/api/jobs/audio')
+async def submit_audio_job(request: Request):
+    """
+    提交音频合成任务，表单字段同 /api/generate_audio，进度为已合成段数 / 总段数
+    传入上次任务返回的 episode_id 时更新同一份渲染清单，未改动的台词直接复用
+    """
+    form = await request.form()
+    text = form.get('text')
+    if not text:
+        return JSONResponse(status_code=400, content={"error": "脚本为空，无法合成音频"})
+    episode_id = form.get('episode_id') or None
+    if episode_id and not is_valid_episode_id(episode_id):
+        return JSONResponse(status_code=400, content={"error": "无效的节目ID"})
+    options = audio_options(form)
+    voice_id = options['voice'] if options['mode'] != 'double' else options['roleAVoice']
+    preview = ' '.join(segment['text'] for segment in build_segments(text, options)[:3])
+    job = get_job_queue().submit('audio', {"text": text, "options": options, "episode_id": episode_id},
+                                 text_preview=preview, voice_id=voice_id or '')
+    return {"success": True, "job_id": job['id'], "episode_id": episode_id or job['id'], "task": _task_summary(job)}
+
+@router.get('/api/jobs/{job_id}')
+async def get_job(job_id: str):
+    job = get_job_store().get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在"})
+    summary = _task_summary(job)
+    if job['kind'] != 'audio' and job['status'] == 'completed':
+        summary["result"] = job['result']
+    return {"success": True, "task": summary}
+
+@router.get('/api/jobs/{job_id}/result')
+async def get_job_result(job_id: str):
+    """获取任务结果：音频任务返回MP3文件，其他任务返回JSON结果"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在"})
+    if job['status'] != 'completed':
+        return JSONResponse(status_code=409, content={"error": "任务尚未完成", "status": job['status']})
+    if job['result_path']:
+        if not os.path.exists(job['result_path']):
+            return JSONResponse(status_code=410, content={"error": "结果文件已被删除"})
+        return FileResponse(job['result_path'], media_type='audio/mpeg', filename=f"{job_id}.mp3")
+    return {"success": True, "result": job['result']}
+
+def _script_options(payload: dict) -> dict:
+    """从请求体中读取生成播客脚本的设置"""
+    return {
+        "podcast_title": payload.get('podcast_title'),
+        "podcast_host": payload.get('podcast_host'),
+        "next_episode_preview": payload.get('next_episode_preview'),
+        "podcast_mode": payload.get('podcast_mode', 'single'),
+        "script_length": payload.get('scriptLength', 'medium'),
+        "role1_name": payload.get('role1_name'),
+        "role1_style": payload.get('role1_style'),
+        "roleA_name": payload.get('roleA_name'),
+        "roleA_style": payload.get('roleA_style'),
+        "roleA_duty": payload.get('roleA_duty'),
+        "roleB_name": payload.get('roleB_name'),
+        "roleB_style": payload.get('roleB_style'),
+        "roleB_duty": payload.get('roleB_duty'),
+        "language": payload.get('language', 'zh'),
+        "long_document": payload.get('long_document'),
+        "use_cache": payload.get('use_cache', True) is not False,
+    }
 
 @router.post('/api/generate_podcast_script')
 async def generate_podcast_script(payload: dict = Body(...)):
     try:
         print(f"DEBUG: Received payload for script generation: {payload}")
         content = payload.get('content')
-        podcast_title = payload.get('podcast_title')
-        podcast_host = payload.get('podcast_host')
-        next_episode_preview = payload.get('next_episode_preview')
-        podcast_mode = payload.get('podcast_mode', 'single')
-        script_length = payload.get('scriptLength', 'medium')
-        role1_name = payload.get('role1_name')
-        role1_style = payload.get('role1_style')
-        roleA_name = payload.get('roleA_name')
-        roleA_style = payload.get('roleA_style')
-        roleB_name = payload.get('roleB_name')
-        roleB_style = payload.get('roleB_style')
-        roleA_duty = payload.get('roleA_duty')
-        roleB_duty = payload.get('roleB_duty')
-        language = payload.get('language', 'zh')
+        options = _script_options(payload)
 
         print("content:", content)
+        generator = get_podcast_generator()
         print("generator:", generator)
-        print("podcast_mode:", podcast_mode)
-        print("role1_name:", role1_name, "roleA_name:", roleA_name, "roleB_name:", roleB_name)
+        print("podcast_mode:", options['podcast_mode'])
+        print("role1_name:", options['role1_name'], "roleA_name:", options['roleA_name'], "roleB_name:", options['roleB_name'])
 
         if not content:
             return JSONResponse(status_code=400, content={"error": "内容为空，无法生成播客脚本"})
-        script = generator.generate_podcast_script(
-            content=content,
-            podcast_title=podcast_title,
-            podcast_host=podcast_host,
-            next_episode_preview=next_episode_preview,
-            podcast_mode=podcast_mode,
-            script_length=script_length,
-            role1_name=role1_name,
-            role1_style=role1_style,
-            roleA_name=roleA_name,
-            roleA_style=roleA_style,
-            roleA_duty=roleA_duty,
-            roleB_name=roleB_name,
-            roleB_style=roleB_style,
-            roleB_duty=roleB_duty,
-            language=language
-        )
+        script, info = await run_in_pool('llm', generator.generate_podcast_script, content=content, return_info=True, **options)
         # 去除所有 markdown 代码块
-        if isinstance(script, str):
-            script = re.sub(r"^```[a-zA-Z]*\s*", "", script.strip())
-            script = re.sub(r"```$", "", script.strip())
-            script = script.strip()
-        return {"success": True, "podcast_script": script}
+        script = strip_code_fences(script)
+        return {"success": True, "podcast_script": script, "cached": info["cached"]}
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@router.post('/api/generate_podcast_script_stream')
+async def generate_podcast_script_stream(payload: dict = Body(...)):
+    """
+    流式生成播客脚本（text/event-stream）
+    生成过程中逐段推送 delta 事件，结束时推送去除代码块标记后的完整脚本（done 事件），出错时推送 error 事件
+    """
+    content = payload.get('content')
+    if not content:
+        return JSONResponse(status_code=400, content={"error": "内容为空，无法生成播客脚本"})
+    options = _script_options(payload)
+    generator = get_podcast_generator()
+
+    async def stream_events():
+        # 每次取下一段都在 llm 线程池中执行，等待Ark返回时不阻塞事件循环
+        events = generator.stream_podcast_script(content, **options)
+        # 客户端断开时 next 可能仍在线程池中执行，关闭生成器前必须等它返回
+        lock = threading.Lock()
+
+        def next_event():
+            with lock:
+                return next(events, None)
+
+        def close_events():
+            with lock:
+                events.close()
+
+        try:
+            while True:
+                event = await run_in_pool('llm', next_event)
+                if event is None:
+                    break
+                if event["type"] == "delta":
+                    yield sse_event("delta", {"text": event["text"]})
+                else:
+                    yield sse_event("done", {"success": True,
+                                             "podcast_script": strip_code_fences(event["script"]),
+                                             "cached": event["cached"]})
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"success": False, "error": str(e)})
+        finally:
+            # 在 llm 线程池中关闭，不阻塞事件循环，也不会与仍在执行的 next 同时进入生成器
+            get_pool('llm').submit(close_events)
+
+    return StreamingResponse(stream_events(), media_type='text/event-stream',
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000) 
\ No newline at end of file
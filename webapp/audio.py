@@ -0,0 +1,676 @@
+"""
+播客音频渲染
+
+将前端提交的脚本解析为音频段，并发调用TTS后按脚本顺序拼接为一个MP3。
+同步接口 /api/generate_audio 和后台音频任务共用这里的解析和拼接逻辑。
+
+TTS默认返回原始PCM，各段在内存中用NumPy直接拼接，整期音频只在最后编码一次，
+避免逐段解码MP3和多次有损转码。
+
+传入 SegmentStore 时，已合成过的段直接从磁盘读取，只为改动过或缺失的段请求TTS，
+每段合成完成后立即保存，中断的渲染再次执行时从中断处继续。
+
+stream_audio 是流式版本：开头几段合成完成后即开始编码输出，后面的段边合成边发送，
+只预先合成有限的几段，长节目的内存占用不随时长增长。TTS客户端开启流式合成时，
+当前段的音频块一到达就送去编码，不必等整段合成结束。
+"""
+import asyncio
+import io
+import itertools
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from webapp.segmenter import pack_lines
+
+# TTS返回的原始PCM参数：单声道、16位有符号小端整数
+PCM_SAMPLE_RATE = 32000
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+# 向TTS请求的音频格式，pcm 可直接拼接；设为 mp3 时按旧方式逐段解码
+TTS_AUDIO_FORMAT = os.getenv('TTS_AUDIO_FORMAT', 'pcm')
+
+# 同时进行的TTS请求数，以及单段失败后的重试次数和首次重试前的等待时间（秒，之后逐次翻倍）。
+# 限流和网络错误已由传输层按 MINIMAX_MAX_RETRIES 重试，这里默认不再重试，
+# 否则每层的重试次数相乘，一段失败会发出 (1+TTS_MAX_RETRIES)×(1+MINIMAX_MAX_RETRIES) 次请求
+TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', '4'))
+TTS_MAX_RETRIES = int(os.getenv('TTS_MAX_RETRIES', '0'))
+TTS_RETRY_DELAY = float(os.getenv('TTS_RETRY_DELAY', '0.5'))
+
+# 流式输出时最多领先当前发送位置合成的段数，决定了内存中最多缓存多少段音频
+TTS_STREAM_WINDOW = int(os.getenv('TTS_STREAM_WINDOW', '8'))
+
+# 流式输出支持的格式及对应的 Content-Type
+STREAM_MEDIA_TYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'pcm': 'audio/L16'}
+
+# 音频合成参数及默认值，与 /api/generate_audio 的表单字段一致
+AUDIO_OPTION_DEFAULTS = {
+    'mode': 'single',
+    'roleAName': None, 'roleBName': None, 'roleAVoice': None, 'roleBVoice': None, 'voice': None,
+    'speedA': 1.0, 'volumeA': 1.0, 'pitchA': 1.0, 'emotionA': 'neutral',
+    'speedB': 1.0, 'volumeB': 1.0, 'pitchB': 1.0, 'emotionB': 'neutral',
+    'speed': 1.0, 'volume': 1.0, 'pitch': 1.0, 'emotion': 'neutral',
+    'language': 'zh',
+}
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def audio_options(form: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从表单中读取音频合成参数，缺失的字段使用默认值，数值字段转换为float
+
+    Args:
+        form: 表单字段
+
+    Returns:
+        Dict: 完整的音频合成参数
+    """
+    options = {}
+    for key, default in AUDIO_OPTION_DEFAULTS.items():
+        value = form.get(key)
+        if value in (None, ''):
+            value = default
+        elif isinstance(default, float):
+            value = float(value)
+        options[key] = value
+    return options
+
+
+def build_segments(text: str, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    将脚本解析为按顺序合成的音频段
+
+    双人模式按角色选择音色；text 可以是结构化JSON（推荐），也可以是纯文本。
+    同一说话人的连续台词在固定的行窗口内合并为尽量长的段，只在句子或分句边界断开，
+    见 segmenter.pack_lines。每段的 lines 记录它覆盖的台词（行号和文本），用于渲染清单。
+
+    Args:
+        text: 前端提交的脚本
+        options: audio_options 返回的合成参数
+
+    Returns:
+        List[Dict]: 每段的文本、音色和语音参数
+    """
+    language = options['language']
+    if options['mode'] == 'double':
+        role_a, role_b = options['roleAName'], options['roleBName']
+        # 优先尝试解析结构化 JSON
+        try:
+            script_json = json.loads(text)
+            assert isinstance(script_json, list)
+        except Exception:
+            # 回退为按行分割的纯文本
+            script_json = []
+            for line in text.split('\n'):
+                if role_a and line.startswith(role_a):
+                    script_json.append({'role': role_a, 'text': line[len(role_a):].strip()})
+                elif role_b and line.startswith(role_b):
+                    script_json.append({'role': role_b, 'text': line[len(role_b):].strip()})
+
+        lines = []
+        for item in script_json:
+            role = item.get('role')
+            txt = item.get('text', '').strip()
+            if not txt:
+                continue
+            if role == role_a:
+                lines.append((txt, 'A'))
+            elif role == role_b:
+                lines.append((txt, 'B'))
+        settings = {
+            suffix: {
+                'voice_id': options[f'role{suffix}Voice'],
+                'speed': options[f'speed{suffix}'],
+                'volume': int(options[f'volume{suffix}']),
+                'pitch': int(options[f'pitch{suffix}']),
+                'emotion': options[f'emotion{suffix}'],
+            }
+            for suffix in ('A', 'B')
+        }
+    else:
+        # 单人模式，所有台词合并分段后按顺序拼接
+        try:
+            # 尝试解析结构化 JSON
+            script_json = json.loads(text)
+            assert isinstance(script_json, list)
+            # 只合成每个对象的text字段内容，不朗读role、章节标题等
+            text_list = [item['text'].strip() for item in script_json if 'text' in item and item['text'].strip()]
+        except Exception:
+            # 纯文本，每个非空行作为一句台词，由 pack_lines 按句子分段
+            text_list = [line.strip() for line in text.splitlines() if line.strip()]
+        lines = [(txt, '') for txt in text_list]
+        settings = {'': {
+            'voice_id': options['voice'],
+            'speed': options['speed'],
+            'volume': int(options['volume']),
+            'pitch': int(options['pitch']),
+            'emotion': options['emotion'],
+        }}
+
+    segments = []
+    numbered = list(enumerate(lines))
+    for speaker, group in itertools.groupby(numbered, key=lambda item: item[1][1]):
+        group = [(index, txt) for index, (txt, _) in group]
+        for chunk, window in pack_lines([txt for _, txt in group], language):
+            covered = [{'index': group[i][0], 'text': group[i][1]} for i in window]
+            segments.append(dict(settings[speaker], text=chunk, language=language, lines=covered))
+    return segments
+
+
+def _synthesize_kwargs(segment: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = dict(speed=segment['speed'], volume=segment['volume'], pitch=segment['pitch'],
+                  emotion=segment['emotion'], language=segment['language'],
+                  format=segment.get('format') or TTS_AUDIO_FORMAT)
+    if segment.get('model'):
+        kwargs['model'] = segment['model']
+    return kwargs
+
+
+def _segment_error(index: int, total: int, error: Exception) -> Exception:
+    return Exception(f"第{index + 1}段（共{total}段）合成失败: {error}")
+
+
+def _load_cached(store, segments: List[Dict[str, Any]]) -> Tuple[List[str], List[Optional[bytes]]]:
+    """计算各段的缓存键并读取已缓存的音频，未使用缓存时键为空"""
+    if store is None:
+        return [], [None] * len(segments)
+    from webapp.segment_store import segment_key
+    keys = [segment_key(segment, TTS_AUDIO_FORMAT) for segment in segments]
+    return keys, store.get_many(keys)
+
+
+def _save_manifest(store, episode_id: Optional[str], segments: List[Dict[str, Any]], keys: List[str],
+                   reused: List[bool]) -> None:
+    if store is not None and episode_id:
+        manifest = store.save_manifest(episode_id, segments, keys, reused, TTS_AUDIO_FORMAT)
+        print(f"DEBUG: 节目 {episode_id} 共{len(keys)}段，复用{manifest['reused']}段，合成{manifest['synthesized']}段；"
+              f"共{len(manifest['lines'])}行，重新合成{manifest['lines_synthesized']}行")
+
+
+def synthesize(tts, segments: List[Dict[str, Any]], progress: Optional[ProgressCallback] = None,
+               concurrency: Optional[int] = None, retries: Optional[int] = None,
+               store=None, episode_id: Optional[str] = None) -> List[bytes]:
+    """
+    并发同步合成，适合在后台任务线程中调用
+
+    最多同时发出 concurrency 个请求，两个角色的音频段一起排队；单段失败时只重试该段，
+    重试次数用尽后才放弃整个音频。返回结果按脚本顺序排列，与完成顺序无关。
+
+    Args:
+        tts: MiniMaxTTS 客户端
+        segments: build_segments 返回的音频段
+        progress: 每完成一段后调用 progress(已完成段数, 总段数)，复用的段计入已完成
+        concurrency: 同时进行的请求数，默认 TTS_CONCURRENCY
+        retries: 单段失败后的重试次数，默认 TTS_MAX_RETRIES
+        store: SegmentStore，传入时复用已缓存的段并保存新合成的段
+        episode_id: 节目ID，与 store 一起传入时在全部完成后保存渲染清单
+
+    Returns:
+        List[bytes]: 按顺序排列的每段音频
+    """
+    concurrency = max(1, concurrency or TTS_CONCURRENCY)
+    retries = TTS_MAX_RETRIES if retries is None else retries
+    total = len(segments)
+    keys, pieces = _load_cached(store, segments)
+    reused = [piece is not None for piece in pieces]
+    missing = [index for index in range(total) if not reused[index]]
+    lock = threading.Lock()
+    completed = total - len(missing)
+    if completed and progress:
+        progress(completed, total)
+
+    def run(index: int) -> None:
+        nonlocal completed
+        segment = segments[index]
+        for attempt in range(retries + 1):
+            try:
+                pieces[index] = tts.synthesize_text_sync(segment['text'], segment['voice_id'],
+                                                         **_synthesize_kwargs(segment))
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise _segment_error(index, total, e)
+                print(f"WARNING: 第{index + 1}段合成失败，{TTS_RETRY_DELAY * 2 ** attempt:.1f}秒后重试: {e}")
+                time.sleep(TTS_RETRY_DELAY * 2 ** attempt)
+        if store is not None:
+            store.set(keys[index], pieces[index])
+        with lock:
+            completed += 1
+            if progress:
+                progress(completed, total)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(missing))) as executor:
+            futures = [executor.submit(run, index) for index in missing]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+    _save_manifest(store, episode_id, segments, keys, reused)
+    return pieces
+
+
+async def _synthesize_one_async(tts, segments: List[Dict[str, Any]], index: int, semaphore: asyncio.Semaphore,
+                                retries: int, store=None, key: Optional[str] = None) -> bytes:
+    """合成一段音频，失败时只重试这一段，完成后立即保存到缓存"""
+    segment = segments[index]
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                piece = await tts.synthesize_text_async(segment['text'], segment['voice_id'],
+                                                        **_synthesize_kwargs(segment))
+            break
+        except Exception as e:
+            if attempt == retries:
+                raise _segment_error(index, len(segments), e)
+            print(f"WARNING: 第{index + 1}段合成失败，{TTS_RETRY_DELAY * 2 ** attempt:.1f}秒后重试: {e}")
+            # 等待重试时释放并发名额，让其他段继续合成
+            await asyncio.sleep(TTS_RETRY_DELAY * 2 ** attempt)
+    if store is not None:
+        await asyncio.to_thread(store.set, key, piece)
+    return piece
+
+
+async def _stream_one_async(tts, segments: List[Dict[str, Any]], index: int, semaphore: asyncio.Semaphore,
+                            retries: int, chunks: asyncio.Queue, store=None, key: Optional[str] = None) -> None:
+    """
+    流式合成一段音频，每收到一块就放入 chunks，结束时放入None，失败时放入异常
+
+    还没有产出任何音频块时失败才重试，已经产出的块无法撤回。
+    """
+    segment = segments[index]
+    received: List[bytes] = []
+    try:
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    async for chunk in tts.iter_synthesize_text_async(segment['text'], segment['voice_id'],
+                                                                      **_synthesize_kwargs(segment)):
+                        if store is not None:
+                            received.append(chunk)
+                        await chunks.put(chunk)
+                break
+            except Exception as e:
+                if received or attempt == retries:
+                    raise _segment_error(index, len(segments), e)
+                print(f"WARNING: 第{index + 1}段合成失败，{TTS_RETRY_DELAY * 2 ** attempt:.1f}秒后重试: {e}")
+                await asyncio.sleep(TTS_RETRY_DELAY * 2 ** attempt)
+        if store is not None:
+            await asyncio.to_thread(store.set, key, b''.join(received))
+        await chunks.put(None)
+    except Exception as e:
+        await chunks.put(e)
+
+
+async def synthesize_async(tts, segments: List[Dict[str, Any]], progress: Optional[ProgressCallback] = None,
+                           concurrency: Optional[int] = None, retries: Optional[int] = None,
+                           store=None, episode_id: Optional[str] = None) -> List[bytes]:
+    """
+    并发异步合成，等待TTS接口时不阻塞事件循环，参数和行为同 synthesize
+    缓存读写是磁盘操作，在线程中执行
+    """
+    concurrency = max(1, concurrency or TTS_CONCURRENCY)
+    retries = TTS_MAX_RETRIES if retries is None else retries
+    total = len(segments)
+    keys, pieces = await asyncio.to_thread(_load_cached, store, segments)
+    reused = [piece is not None for piece in pieces]
+    missing = [index for index in range(total) if not reused[index]]
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = total - len(missing)
+    if completed and progress:
+        progress(completed, total)
+
+    async def run(index: int) -> None:
+        nonlocal completed
+        pieces[index] = await _synthesize_one_async(tts, segments, index, semaphore, retries,
+                                                    store, keys[index] if keys else None)
+        completed += 1
+        if progress:
+            progress(completed, total)
+
+    tasks = [asyncio.ensure_future(run(index)) for index in missing]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await asyncio.to_thread(_save_manifest, store, episode_id, segments, keys, reused)
+    return pieces
+
+
+def decode_piece(piece: bytes, input_format: str = TTS_AUDIO_FORMAT):
+    """
+    将一段TTS音频转换为 PCM_SAMPLE_RATE 单声道int16采样
+
+    原始PCM和WAV直接读取采样，只有MP3需要借助 pydub（ffmpeg）解码。
+    原始PCM没有文件头，无法可靠地识别格式，因此由调用方指明请求TTS时使用的格式。
+
+    Args:
+        piece: TTS返回的一段音频
+        input_format: pcm / wav / mp3
+
+    Returns:
+        numpy.ndarray: int16采样
+    """
+    import numpy as np
+
+    if input_format == 'wav':
+        with wave.open(io.BytesIO(piece), 'rb') as wav:
+            if wav.getsampwidth() != PCM_SAMPLE_WIDTH:
+                raise ValueError(f"不支持的WAV采样位宽: {wav.getsampwidth() * 8}")
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        if rate != PCM_SAMPLE_RATE and len(samples):
+            # 线性插值重采样，TTS各段采样率一致时不会走到这里
+            positions = np.arange(0, len(samples), rate / PCM_SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+        return samples
+    if input_format != 'pcm':
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(io.BytesIO(piece), format=input_format)
+        segment = segment.set_frame_rate(PCM_SAMPLE_RATE).set_channels(PCM_CHANNELS).set_sample_width(PCM_SAMPLE_WIDTH)
+        return np.frombuffer(segment.raw_data, dtype='<i2')
+    return np.frombuffer(piece[:len(piece) - len(piece) % PCM_SAMPLE_WIDTH], dtype='<i2')
+
+
+def assemble_pcm(pieces: List[bytes], input_format: str = TTS_AUDIO_FORMAT):
+    """
+    按顺序拼接各段音频的采样
+
+    Args:
+        pieces: 每段的音频
+        input_format: 各段音频的格式，见 decode_piece
+
+    Returns:
+        numpy.ndarray: 整期音频的int16采样
+    """
+    import numpy as np
+
+    arrays = [decode_piece(piece, input_format) for piece in pieces if piece]
+    if not arrays:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(arrays)
+
+
+def encode_audio(samples, output_format: str = 'mp3') -> bytes:
+    """
+    将int16采样编码为指定格式，整期音频只编码这一次
+
+    Args:
+        samples: assemble_pcm 返回的采样
+        output_format: mp3 / wav / pcm，其他格式交给 ffmpeg
+
+    Returns:
+        bytes: 编码后的音频
+    """
+    data = samples.astype('<i2', copy=False).tobytes()
+    if output_format == 'pcm':
+        return data
+    if output_format == 'wav':
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(PCM_CHANNELS)
+            wav.setsampwidth(PCM_SAMPLE_WIDTH)
+            wav.setframerate(PCM_SAMPLE_RATE)
+            wav.writeframes(data)
+        return buffer.getvalue()
+
+    from pydub import AudioSegment
+    segment = AudioSegment(data=data, sample_width=PCM_SAMPLE_WIDTH, frame_rate=PCM_SAMPLE_RATE, channels=PCM_CHANNELS)
+    buffer = io.BytesIO()
+    segment.export(buffer, format=output_format, bitrate="128k" if output_format == 'mp3' else None)
+    return buffer.getvalue()
+
+
+def render_audio(pieces: List[bytes], output_format: str = 'mp3',
+                 input_format: str = TTS_AUDIO_FORMAT) -> Tuple[bytes, float]:
+    """
+    拼接各段音频并编码为一个文件
+    编码是阻塞操作，在 async 路由中应通过 run_in_pool('audio', ...) 调用
+
+    Args:
+        pieces: 每段的音频
+        output_format: 输出格式
+        input_format: 各段音频的格式（pcm / wav / mp3），默认与请求TTS时的格式一致
+
+    Returns:
+        Tuple[bytes, float]: 编码后的音频和时长（秒）
+    """
+    samples = assemble_pcm(pieces, input_format)
+    return encode_audio(samples, output_format), round(len(samples) / PCM_SAMPLE_RATE, 1)
+
+
+async def synthesize_stream(tts, segments: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                            retries: Optional[int] = None, window: Optional[int] = None,
+                            store=None, episode_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    按脚本顺序逐段产出音频，前面的段一完成就产出，不等待整期合成结束
+
+    只为当前位置之后的 window 段提前发起合成，已产出的段不再保留，
+    内存中最多同时存在 window 段音频。其余参数同 synthesize_async。
+    TTS客户端开启流式合成（streaming 为真）且请求的是原始PCM时，逐块产出音频，
+    当前段的每一块到达后立即产出。
+
+    Args:
+        tts: MiniMaxTTS 客户端
+        segments: build_segments 返回的音频段
+        concurrency: 同时进行的请求数，默认 TTS_CONCURRENCY
+        retries: 单段失败后的重试次数，默认 TTS_MAX_RETRIES
+        window: 提前合成的段数，默认 TTS_STREAM_WINDOW，不小于 concurrency
+        store: SegmentStore，传入时复用已缓存的段并保存新合成的段
+        episode_id: 节目ID，与 store 一起传入时在全部产出后保存渲染清单
+
+    Yields:
+        bytes: 按顺序排列的音频，每段一次或逐块产出
+    """
+    chunked = bool(getattr(tts, 'streaming', False)) and TTS_AUDIO_FORMAT == 'pcm'
+    concurrency = max(1, concurrency or TTS_CONCURRENCY)
+    retries = TTS_MAX_RETRIES if retries is None else retries
+    window = max(concurrency, window or TTS_STREAM_WINDOW)
+    total = len(segments)
+    keys: List[str] = []
+    reused = [False] * total
+    if store is not None:
+        from webapp.segment_store import segment_key
+        keys = [segment_key(segment, TTS_AUDIO_FORMAT) for segment in segments]
+        reused = await asyncio.to_thread(lambda: [store.has(key) for key in keys])
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: Dict[int, asyncio.Task] = {}
+    queues: Dict[int, asyncio.Queue] = {}
+    scheduled = 0
+
+    def schedule(index: int) -> None:
+        key = keys[index] if keys else None
+        if chunked:
+            queues[index] = asyncio.Queue()
+            tasks[index] = asyncio.ensure_future(_stream_one_async(tts, segments, index, semaphore, retries,
+                                                                   queues[index], store, key))
+        else:
+            tasks[index] = asyncio.ensure_future(_synthesize_one_async(tts, segments, index, semaphore, retries,
+                                                                       store, key))
+
+    try:
+        for index in range(total):
+            while scheduled < min(total, index + window):
+                if not reused[scheduled]:
+                    schedule(scheduled)
+                scheduled += 1
+            piece = None
+            if reused[index]:
+                piece = await asyncio.to_thread(store.get, keys[index])
+                if piece is None:
+                    # 检查之后被淘汰，改为重新合成
+                    reused[index] = False
+                    schedule(index)
+            if piece is not None:
+                yield piece
+            elif chunked:
+                chunks = queues.pop(index)
+                while True:
+                    chunk = await chunks.get()
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    if chunk is None:
+                        break
+                    yield chunk
+                await tasks.pop(index)
+            else:
+                yield await tasks.pop(index)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    await asyncio.to_thread(_save_manifest, store, episode_id, segments, keys, reused)
+
+
+class StreamEncoder:
+    """
+    增量编码器：逐段送入采样，返回已经可以发送的编码数据
+
+    wav 写入长度未知的文件头后直接输出采样；mp3 通过 ffmpeg 管道编码，
+    由后台线程读取 ffmpeg 的输出，写入和读取互不阻塞。
+    feed 和 close 是阻塞操作，在 async 代码中应通过 run_in_pool('audio', ...) 调用。
+    """
+
+    def __init__(self, output_format: str = 'mp3'):
+        """
+        Args:
+            output_format: mp3 / wav / pcm
+
+        Raises:
+            ValueError: 不支持的格式
+            RuntimeError: 输出MP3但未安装 ffmpeg
+        """
+        if output_format not in STREAM_MEDIA_TYPES:
+            raise ValueError(f"不支持流式输出的格式: {output_format}")
+        self.output_format = output_format
+        self.media_type = STREAM_MEDIA_TYPES[output_format]
+        self._header_sent = False
+        self._process = None
+        if output_format == 'mp3':
+            ffmpeg = shutil.which('ffmpeg')
+            if ffmpeg is None:
+                raise RuntimeError("流式MP3编码需要安装 ffmpeg")
+            self._process = subprocess.Popen(
+                [ffmpeg, '-loglevel', 'error', '-f', 's16le', '-ar', str(PCM_SAMPLE_RATE), '-ac', str(PCM_CHANNELS),
+                 '-i', 'pipe:0', '-f', 'mp3', '-b:a', '128k', 'pipe:1'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            self._output: queue.Queue = queue.Queue()
+            self._reader = threading.Thread(target=self._read_output, daemon=True)
+            self._reader.start()
+
+    def _read_output(self) -> None:
+        for chunk in iter(lambda: self._process.stdout.read1(64 * 1024), b''):
+            self._output.put(chunk)
+
+    def _drain(self) -> bytes:
+        chunks = []
+        while True:
+            try:
+                chunks.append(self._output.get_nowait())
+            except queue.Empty:
+                return b''.join(chunks)
+
+    def _wav_header(self) -> bytes:
+        # 长度字段填最大值，表示长度未知，播放器会一直读到连接结束
+        byte_rate = PCM_SAMPLE_RATE * PCM_CHANNELS * PCM_SAMPLE_WIDTH
+        return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+                + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, PCM_CHANNELS, PCM_SAMPLE_RATE, byte_rate,
+                                        PCM_CHANNELS * PCM_SAMPLE_WIDTH, PCM_SAMPLE_WIDTH * 8)
+                + b'data' + struct.pack('<I', 0xFFFFFFFF))
+
+    def feed(self, samples) -> bytes:
+        """
+        送入一段采样
+
+        Args:
+            samples: int16采样
+
+        Returns:
+            bytes: 当前可以发送的编码数据，可能为空
+        """
+        data = samples.astype('<i2', copy=False).tobytes()
+        if self._process is not None:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+            return self._drain()
+        if self.output_format == 'wav' and not self._header_sent:
+            self._header_sent = True
+            return self._wav_header() + data
+        return data
+
+    def close(self) -> bytes:
+        """结束编码，返回剩余的编码数据"""
+        if self._process is None:
+            if self.output_format == 'wav' and not self._header_sent:
+                self._header_sent = True
+                return self._wav_header()
+            return b''
+        self._process.stdin.close()
+        self._reader.join()
+        self._process.wait()
+        return self._drain()
+
+    def abort(self) -> None:
+        """客户端断开或合成失败时终止编码进程"""
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+async def stream_audio(tts, segments: List[Dict[str, Any]], encoder: StreamEncoder,
+                       input_format: str = TTS_AUDIO_FORMAT, **kwargs) -> AsyncIterator[bytes]:
+    """
+    边合成边编码，按顺序产出可以直接发送给客户端的音频数据
+
+    Args:
+        tts: MiniMaxTTS 客户端
+        segments: build_segments 返回的音频段
+        encoder: StreamEncoder，在开始响应前创建，便于提前报告格式或 ffmpeg 的问题
+        input_format: 各段音频的格式，见 decode_piece
+        **kwargs: 传给 synthesize_stream 的参数
+
+    Yields:
+        bytes: 编码后的音频数据
+    """
+    from webapp.concurrency import run_in_pool
+
+    carry = b''
+
+    def encode(piece: bytes) -> bytes:
+        nonlocal carry
+        if input_format == 'pcm':
+            # 流式合成的音频块可能在一个采样的中间断开，多出的字节留到下一块
+            piece = carry + piece
+            cut = len(piece) - len(piece) % PCM_SAMPLE_WIDTH
+            piece, carry = piece[:cut], piece[cut:]
+        return encoder.feed(decode_piece(piece, input_format)) if piece else b''
+
+    finished = False
+    try:
+        async for piece in synthesize_stream(tts, segments, **kwargs):
+            data = await run_in_pool('audio', encode, piece)
+            if data:
+                yield data
+        data = await run_in_pool('audio', encoder.close)
+        finished = True
+        if data:
+            yield data
+    finally:
+        if not finished:
+            encoder.abort()
@@ -0,0 +1,70 @@
+"""
+阻塞任务的执行器
+
+文件提取、LLM调用和音频编解码都是阻塞操作，直接在 async 路由中调用会卡住整个事件循环。
+这里按用途维护几个大小可配置的线程池，路由通过 run_in_pool 把阻塞调用交给对应的线程池，
+某一类任务排满时不会占用其他类任务的线程。
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# 各线程池的默认大小，可用环境变量覆盖
+POOL_SIZES = {
+    'extract': int(os.getenv('EXTRACT_POOL_WORKERS', '4')),
+    'llm': int(os.getenv('LLM_POOL_WORKERS', '8')),
+    'audio': int(os.getenv('AUDIO_POOL_WORKERS', '2')),
+}
+
+_lock = threading.Lock()
+_pools: Dict[str, ThreadPoolExecutor] = {}
+
+
+def get_pool(name: str) -> ThreadPoolExecutor:
+    """
+    获取指定用途的线程池，首次使用时创建
+
+    Args:
+        name: 线程池名称（extract / llm / audio）
+
+    Returns:
+        ThreadPoolExecutor: 线程池
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(name)
+            if pool is None:
+                if name not in POOL_SIZES:
+                    raise ValueError(f"未知的线程池: {name}")
+                pool = ThreadPoolExecutor(max_workers=max(1, POOL_SIZES[name]), thread_name_prefix=f"{name}-pool")
+                _pools[name] = pool
+    return pool
+
+
+async def run_in_pool(name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在指定线程池中执行阻塞函数，并在事件循环中等待结果
+
+    Args:
+        name: 线程池名称
+        func: 阻塞函数
+        *args, **kwargs: 传给函数的参数
+
+    Returns:
+        函数的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(name), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """关闭所有线程池，应用退出时调用"""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
@@ -0,0 +1,345 @@
+"""
+后台任务
+
+提取、脚本生成和音频合成可以作为后台任务提交：任务写入本地SQLite，
+工作线程从数据库中按提交顺序领取排队的任务并更新进度，HTTP请求只负责提交和查询。
+服务重启后，排队中的任务继续执行，重启前正在执行的任务重新排队。
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+_COLUMNS = ('id', 'kind', 'status', 'progress', 'done', 'total', 'params', 'result', 'result_path',
+            'error', 'text_preview', 'voice_id', 'duration', 'created_at', 'updated_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    result TEXT,
+    result_path TEXT,
+    error TEXT,
+    text_preview TEXT,
+    voice_id TEXT,
+    duration REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobStore:
+    """基于SQLite的任务存储，可在多个线程之间共享"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, args: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, args)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def create(self, kind: str, params: Dict[str, Any], text_preview: str = '', voice_id: str = '') -> Dict[str, Any]:
+        """
+        创建排队中的任务
+
+        Args:
+            kind: 任务类型（extract / script / audio）
+            params: 任务参数，需可JSON序列化
+            text_preview: 任务列表中显示的文本摘要
+            voice_id: 音频任务使用的音色
+
+        Returns:
+            Dict: 新建的任务
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, params, text_preview, voice_id, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), text_preview[:100], voice_id or '', now, now)
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, limit: int = 50, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出任务"""
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        args = ()
+        if kind:
+            sql += " WHERE kind = ?"
+            args = (kind,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        return [self._to_dict(row) for row in self._execute(sql, args + (limit,)).fetchall()]
+
+    def claim_next(self, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        领取最早提交的排队任务并标记为执行中
+
+        使用 BEGIN IMMEDIATE 加写锁，多个进程共用同一个数据库时也不会重复领取。
+
+        Args:
+            kinds: 只领取这些类型的任务，None表示全部类型
+
+        Returns:
+            Optional[Dict]: 领取到的任务，没有排队任务时返回None
+        """
+        sql = "SELECT id FROM jobs WHERE status = ?"
+        args = (QUEUED,)
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            args += tuple(kinds)
+        sql += " ORDER BY created_at LIMIT 1"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(sql, args).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                                       (PROCESSING, time.time(), row['id']))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def update_progress(self, job_id: str, done: int, total: int) -> None:
+        """记录任务进度，例如已合成的音频段数 / 总段数"""
+        progress = round(100.0 * done / total, 1) if total else 0.0
+        self._execute("UPDATE jobs SET done = ?, total = ?, progress = ?, updated_at = ? WHERE id = ?",
+                      (done, total, progress, time.time(), job_id))
+
+    def complete(self, job_id: str, result: Any = None, result_path: Optional[str] = None,
+                 duration: Optional[float] = None) -> None:
+        """标记任务完成并保存结果"""
+        self._execute(
+            "UPDATE jobs SET status = ?, progress = 100, result = ?, result_path = ?, duration = ?, updated_at = ? "
+            "WHERE id = ?",
+            (COMPLETED, json.dumps(result, ensure_ascii=False) if result is not None else None,
+             result_path, duration, time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """标记任务失败"""
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                      (FAILED, error, time.time(), job_id))
+
+    def requeue_interrupted(self) -> int:
+        """
+        将上次退出时仍在执行的任务重新排队
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        cursor = self._execute("UPDATE jobs SET status = ?, done = 0, progress = 0, updated_at = ? WHERE status = ?",
+                               (QUEUED, time.time(), PROCESSING))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobContext:
+    """传给任务处理函数的上下文，用于读取参数和汇报进度"""
+
+    def __init__(self, store: JobStore, job: Dict[str, Any]):
+        self.store = store
+        self.job = job
+        self.id = job['id']
+        self.params = job['params']
+
+    def progress(self, done: int, total: int) -> None:
+        self.store.update_progress(self.id, done, total)
+
+
+# 任务处理函数：接收 JobContext，返回 {"result": ..., "result_path": ..., "duration": ...}
+JobHandler = Callable[[JobContext], Dict[str, Any]]
+
+
+class JobQueue:
+    """
+    从 JobStore 领取任务的工作线程池
+
+    数据库本身就是队列：提交任务只是写入一行记录并唤醒工作线程，
+    工作线程空闲时也会定期检查数据库，其他进程提交的任务同样会被执行。
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], workers: int = 2,
+                 poll_interval: float = 1.0):
+        """
+        Args:
+            store: 任务存储
+            handlers: 任务类型到处理函数的映射
+            workers: 工作线程数
+            poll_interval: 空闲时检查数据库的间隔（秒）
+        """
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> 'JobQueue':
+        """重新排队中断的任务并启动工作线程"""
+        if self._threads:
+            return self
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            print(f"DEBUG: 重新排队 {requeued} 个中断的任务")
+        self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止领取新任务，等待执行中的任务结束"""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, params: Dict[str, Any], **fields) -> Dict[str, Any]:
+        """
+        提交任务
+
+        Args:
+            kind: 任务类型，必须已注册处理函数
+            params: 任务参数
+            **fields: text_preview、voice_id 等任务列表显示字段
+
+        Returns:
+            Dict: 新建的任务
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"未知的任务类型: {kind}")
+        job = self.store.create(kind, params, **fields)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def _run(self) -> None:
+        while not self._stopping:
+            job = self.store.claim_next(list(self.handlers))
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        context = JobContext(self.store, job)
+        try:
+            outcome = self.handlers[job['kind']](context) or {}
+            self.store.complete(job['id'], outcome.get('result'), outcome.get('result_path'), outcome.get('duration'))
+        except Exception as e:
+            traceback.print_exc()
+            self.store.fail(job['id'], str(e))
+
+
+def default_handlers(data_dir: str, segment_store=None) -> Dict[str, JobHandler]:
+    """
+    提取、脚本生成和音频合成任务的处理函数
+
+    Args:
+        data_dir: 任务文件目录，上传文件和生成的音频保存在这里
+        segment_store: 逐句音频缓存，传入时音频任务复用已合成的段，重新执行中断的任务时不会重复请求TTS
+
+    Returns:
+        Dict[str, JobHandler]: 任务类型到处理函数的映射
+    """
+    from webapp.services import get_extractor, get_podcast_generator, get_tts_client
+
+    def run_extract(context: JobContext) -> Dict[str, Any]:
+        params = context.params
+        context.progress(0, 1)
+        options = {key: params.get(key) for key in ('max_chars', 'max_tokens')}
+        if params.get('url'):
+            result = get_extractor().process_url(params['url'], **options)
+        else:
+            try:
+                result = get_extractor().process_file(params['file_path'], **options)
+            finally:
+                # 上传文件只在任务执行期间保留
+                shutil.rmtree(os.path.dirname(params['file_path']), ignore_errors=True)
+        context.progress(1, 1)
+        return {"result": result}
+
+    def run_script(context: JobContext) -> Dict[str, Any]:
+        from webapp.utils import strip_code_fences
+        params = dict(context.params)
+        content = params.pop('content')
+        context.progress(0, 1)
+        script, info = get_podcast_generator().generate_podcast_script(content, return_info=True, **params)
+        context.progress(1, 1)
+        return {"result": {"podcast_script": strip_code_fences(script), "cached": info["cached"]}}
+
+    def run_audio(context: JobContext) -> Dict[str, Any]:
+        from webapp.audio import build_segments, render_audio, synthesize
+        params = context.params
+        segments = build_segments(params['text'], params['options'])
+        if not segments:
+            raise ValueError("脚本中没有可合成的文本")
+        context.progress(0, len(segments))
+        episode_id = params.get('episode_id') or context.id
+        pieces = synthesize(get_tts_client(), segments, context.progress,
+                            store=segment_store, episode_id=episode_id)
+        audio_bytes, duration = render_audio(pieces)
+        output_dir = os.path.join(data_dir, 'audio')
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"{context.id}.mp3")
+        with open(path, 'wb') as f:
+            f.write(audio_bytes)
+        result = {"audio_url": f"/api/jobs/{context.id}/result", "episode_id": episode_id}
+        manifest = segment_store.load_manifest(episode_id) if segment_store is not None else None
+        if manifest:
+            result.update(reused=manifest['reused'], synthesized=manifest['synthesized'],
+                          lines_synthesized=manifest.get('lines_synthesized', 0))
+        return {"result": result, "result_path": path, "duration": duration}
+
+    return {'extract': run_extract, 'script': run_script, 'audio': run_audio}
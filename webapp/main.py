@@ -17,6 +17,24 @@ app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__
 app.include_router(views.router)
 app.include_router(api.router)
 
+
+@app.on_event("startup")
+async def startup():
+    # 启动后台任务工作线程，继续执行上次退出时未完成的任务
+    from webapp.services import get_job_queue
+    get_job_queue()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 停止后台任务，关闭阻塞任务线程池和TTS异步客户端
+    from webapp import minimax_tts
+    from webapp.concurrency import shutdown_pools
+    from webapp.services import stop_job_queue
+    stop_job_queue()
+    if minimax_tts.tts_client is not None:
+        await minimax_tts.tts_client.aclose()
+    shutdown_pools(wait=False)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
@@ -1,61 +1,51 @@
 import os
 import time
-import requests
+import asyncio
 import json
 import base64
-from typing import Dict, Any, List
+import binascii
+from typing import AsyncIterator, Dict, Any, Iterator, List, Optional
 from dotenv import load_dotenv
 import sys
 import io
 import traceback
-from pydub import AudioSegment
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from webapp.tts_transport import TTSTransport
 
 load_dotenv()
 
 class MiniMaxTTS:
-    """MiniMax 同步语音合成 HTTP 客户端，支持分段拼接和voice_id查询"""
-    def __init__(self):
+    """
+    MiniMax 同步语音合成 HTTP 客户端，支持分段拼接和voice_id查询
+    请求经由 TTSTransport 发送：复用连接、按套餐配额限流、失败时退避重试
+
+    设置 MINIMAX_STREAM=1 时使用流式合成：接口以SSE逐块返回音频，每块到达后立即解码，
+    不必等待并保存整段音频的hex字符串（大小是音频的两倍）。
+    """
+    def __init__(self, transport: Optional[TTSTransport] = None):
         self.api_key = os.getenv("MINIMAX_API_KEY")
         self.group_id = os.getenv("MINIMAX_GROUP_ID")
         self.base_url = "https://api.minimaxi.com/v1/t2a_v2"
         self.voice_url = "https://api.minimaxi.com/v1/get_voice"
         if not self.api_key or not self.group_id:
             raise ValueError("请配置 MINIMAX_API_KEY 和 MINIMAX_GROUP_ID 环境变量")
+        self.transport = transport or TTSTransport.from_env()
+        self.streaming = os.getenv("MINIMAX_STREAM", "0") == "1"
+        # 异步HTTP客户端绑定创建它的事件循环，首次异步调用时创建
+        self._async_client = None
+        self._async_loop = None
 
-    def get_available_voices(self, model="speech-02-turbo"):
-        url = "https://api.minimaxi.com/v1/get_voice"
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        data = {"voice_type": "all"}
-        resp = requests.post(url, headers=headers, json=data, timeout=30)
-        print("TTS原始返回：", resp.text)
-        result = resp.json()
-        print("MiniMax get_voice API 返回：", result)
-        # 兼容不同返回结构
-        if 'system_voice' in result and isinstance(result['system_voice'], list):
-            return result['system_voice']
-        elif 'voices' in result and isinstance(result['voices'], list):
-            return result['voices']
-        else:
-            return []
 
-    def synthesize_text_sync(self, text: str, voice_id: str, model: str = "speech-02-turbo", speed: float = 1.0, volume: float = 1.0, pitch: float = 0.0, emotion: str = "neutral", format: str = "mp3", language: str = "zh") -> bytes:
-        """
-        同步合成单段文本，返回音频二进制（新版接口，参数嵌套，音频为hex编码）
-        """
-        print("本次合成文本长度：", len(text))
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        url = f"https://api.minimaxi.com/v1/t2a_v2?GroupId={self.group_id}"
-        data = {
+    def _synthesis_payload(self, text: str, voice_id: str, model: str, speed: float, volume: float, pitch: float, emotion: str, format: str, language: str, stream: bool = False) -> Dict[str, Any]:
+        payload = {
             "model": model,
             "text": str(text),
-            "stream": False,
+            "stream": stream,
             "language_boost": language,
             "output_format": "hex",
             "voice_setting": {
@@ -72,45 +62,166 @@ class MiniMaxTTS:
                 "channel": 1
             }
         }
+        if stream:
+            # 流式模式最后一条默认附带整段音频的汇总，前面的块已经收到，不需要再传一遍
+            payload["stream_options"] = {"exclude_aggregated_audio": True}
+        return payload
+
+    @staticmethod
+    def _parse_voices(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # 兼容不同返回结构
+        if 'system_voice' in result and isinstance(result['system_voice'], list):
+            return result['system_voice']
+        elif 'voices' in result and isinstance(result['voices'], list):
+            return result['voices']
+        else:
+            return []
+
+    @staticmethod
+    def _parse_audio(result: Dict[str, Any]) -> bytes:
+        if 'data' in result and result['data'] and 'audio' in result['data']:
+            return bytes.fromhex(result['data']['audio'])
+        raise Exception(f"TTS返回内容异常: {result}")
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[bytes]:
+        """
+        解析流式合成的一行SSE
+
+        Args:
+            line: 响应中的一行
+
+        Returns:
+            Optional[bytes]: 这一块的音频，非音频行或汇总行返回None
+        """
+        if not line.startswith("data:"):
+            return None
+        event = json.loads(line[5:])
+        base_resp = event.get("base_resp") or {}
+        if base_resp.get("status_code"):
+            raise Exception(f"TTS返回错误: {base_resp}")
+        data = event.get("data") or {}
+        # status 为2的是合成结束时的整段汇总，其中的音频与前面的块重复
+        if data.get("status") == 2 or not data.get("audio"):
+            return None
+        return binascii.unhexlify(data["audio"])
+
+    def _get_async_client(self):
+        """获取当前事件循环的异步HTTP客户端，连接在同一事件循环的请求之间复用"""
+        import httpx
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0))
+            self._async_loop = loop
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """关闭异步HTTP客户端"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    def get_available_voices(self, model="speech-02-turbo"):
+        data = {"voice_type": "all"}
+        result = self.transport.post(self.voice_url, self._headers(), data, limited=False)
+        print("MiniMax get_voice API 返回：", result)
+        return self._parse_voices(result)
+
+    async def get_available_voices_async(self) -> List[Dict[str, Any]]:
+        """异步查询可用音色，不阻塞事件循环"""
+        result = await self.transport.post_async(self._get_async_client(), self.voice_url, self._headers(),
+                                                 {"voice_type": "all"}, limited=False)
+        return self._parse_voices(result)
+
+    def iter_synthesize_text(self, text: str, voice_id: str, model: str = "speech-02-turbo", speed: float = 1.0, volume: float = 1.0, pitch: float = 0.0, emotion: str = "neutral", format: str = "mp3", language: str = "zh") -> Iterator[bytes]:
+        """
+        流式合成单段文本，逐块返回音频二进制，每块到达后立即解码
+        """
+        url = f"{self.base_url}?GroupId={self.group_id}"
+        data = self._synthesis_payload(text, voice_id, model, speed, volume, pitch, emotion, format, language, stream=True)
+        received = False
+        for line in self.transport.stream_lines(url, self._headers(), data, chars=len(text)):
+            chunk = self._parse_stream_line(line)
+            if chunk:
+                received = True
+                yield chunk
+        if not received:
+            raise Exception("TTS流式响应中没有音频")
+
+    async def iter_synthesize_text_async(self, text: str, voice_id: str, model: str = "speech-02-turbo", speed: float = 1.0, volume: float = 1.0, pitch: float = 0.0, emotion: str = "neutral", format: str = "mp3", language: str = "zh") -> AsyncIterator[bytes]:
+        """
+        异步流式合成单段文本，参数和行为同 iter_synthesize_text
+        """
+        url = f"{self.base_url}?GroupId={self.group_id}"
+        data = self._synthesis_payload(text, voice_id, model, speed, volume, pitch, emotion, format, language, stream=True)
+        received = False
+        async for line in self.transport.stream_lines_async(self._get_async_client(), url, self._headers(), data,
+                                                            chars=len(text)):
+            chunk = self._parse_stream_line(line)
+            if chunk:
+                received = True
+                yield chunk
+        if not received:
+            raise Exception("TTS流式响应中没有音频")
+
+    def synthesize_text_sync(self, text: str, voice_id: str, model: str = "speech-02-turbo", speed: float = 1.0, volume: float = 1.0, pitch: float = 0.0, emotion: str = "neutral", format: str = "mp3", language: str = "zh") -> bytes:
+        """
+        同步合成单段文本，返回音频二进制（新版接口，参数嵌套，音频为hex编码）
+        """
+        print("本次合成文本长度：", len(text))
+        if self.streaming:
+            return b"".join(self.iter_synthesize_text(text, voice_id, model, speed, volume, pitch, emotion, format, language))
+        url = f"{self.base_url}?GroupId={self.group_id}"
+        data = self._synthesis_payload(text, voice_id, model, speed, volume, pitch, emotion, format, language)
         print("TTS请求参数data:", data, flush=True)
         try:
-            resp = requests.post(url, headers=headers, json=data, timeout=60)
-            print("TTS原始返回：", resp.text)
-            result = resp.json()
-            if 'data' in result and 'audio' in result['data']:
-                audio_hex = result['data']['audio']
-                audio_bytes = bytes.fromhex(audio_hex)
-                return audio_bytes
-            else:
-                raise Exception(f"TTS返回内容异常: {result}")
+            result = self.transport.post(url, self._headers(), data, chars=len(text))
+            return self._parse_audio(result)
         except Exception as e:
             print("TTS请求异常：", e)
             import traceback; traceback.print_exc()
             raise Exception(f"同步TTS失败: {str(e)}")
 
-    def synthesize_long_text(self, text: str, voice_id: str, model: str = "speech-02-turbo", max_length: int = 800, emotion: str = "neutral", format: str = "mp3", language: str = "zh", **kwargs) -> bytes:
+    async def synthesize_text_async(self, text: str, voice_id: str, model: str = "speech-02-turbo", speed: float = 1.0, volume: float = 1.0, pitch: float = 0.0, emotion: str = "neutral", format: str = "mp3", language: str = "zh") -> bytes:
         """
-        长文本分段合成并拼接音频，返回完整音频二进制
+        异步合成单段文本，等待接口返回时不阻塞事件循环
         """
-        segments = [text[i:i+max_length] for i in range(0, len(text), max_length)]
-        
-        # 使用 pydub 进行专业的音频拼接
-        combined_audio = AudioSegment.empty()
-
-        for idx, seg in enumerate(segments):
-            print(f"正在合成第{idx+1}段，共{len(segments)}段...")
-            audio_piece_bytes = self.synthesize_text_sync(seg, voice_id, model, kwargs.get('speed', 1.0), kwargs.get('volume', 1.0), kwargs.get('pitch', 0.0), emotion, format, language)
-            
-            # 将二进制音频转换为pydub的AudioSegment对象
-            segment = AudioSegment.from_file(io.BytesIO(audio_piece_bytes), format="mp3")
-            combined_audio += segment
-        
-        # 将拼接好的音频导出为二进制格式
-        buffer = io.BytesIO()
-        combined_audio.export(buffer, format="mp3")
-        buffer.seek(0)
-        
-        return buffer.read()
+        if self.streaming:
+            chunks = [chunk async for chunk in self.iter_synthesize_text_async(
+                text, voice_id, model, speed, volume, pitch, emotion, format, language)]
+            return b"".join(chunks)
+        url = f"{self.base_url}?GroupId={self.group_id}"
+        data = self._synthesis_payload(text, voice_id, model, speed, volume, pitch, emotion, format, language)
+        try:
+            result = await self.transport.post_async(self._get_async_client(), url, self._headers(), data,
+                                                     chars=len(text))
+            return self._parse_audio(result)
+        except Exception as e:
+            print("TTS请求异常：", e)
+            raise Exception(f"异步TTS失败: {str(e)}")
+
+    def synthesize_long_text(self, text: str, voice_id: str, model: str = "speech-02-turbo", max_length: Optional[int] = None, emotion: str = "neutral", format: str = "mp3", language: str = "zh", **kwargs) -> bytes:
+        """
+        长文本分段并发合成并按顺序拼接音频，返回 format 格式的完整音频二进制
+        文本只在句子或分句边界处分段，每段长度上限默认按语言确定，见 webapp.segmenter
+        各段以PCM请求并在内存中拼接，只在最后编码一次
+        同时进行的请求数和单段重试次数见 webapp.audio 的 TTS_CONCURRENCY / TTS_MAX_RETRIES
+        """
+        from webapp.audio import render_audio, synthesize
+        from webapp.segmenter import pack_text
+
+        segments = [
+            {
+                "text": chunk, "voice_id": voice_id, "model": model,
+                "speed": kwargs.get('speed', 1.0), "volume": kwargs.get('volume', 1.0), "pitch": kwargs.get('pitch', 0.0),
+                "emotion": emotion, "language": language
+            }
+            for chunk in pack_text([text], language, max_length)
+        ]
+        pieces = synthesize(self, segments, progress=lambda done, total: print(f"已合成{done}段，共{total}段..."))
+        audio_bytes, _ = render_audio(pieces, format)
+        return audio_bytes
 
 tts_client = None
 
@@ -121,6 +232,8 @@ def get_tts_client() -> MiniMaxTTS:
     return tts_client 
 
 if __name__ == "__main__":
+    # 仅在命令行直接运行时切换输出编码，避免导入时替换宿主进程的 stdout
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     tts = get_tts_client()
     voices = tts.get_available_voices()
     print(voices)  # 打印所有voice_id
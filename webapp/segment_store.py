@@ -0,0 +1,202 @@
+"""
+逐句音频缓存与渲染清单
+
+每段台词合成后按（文本、音色、语速、音量、音调、情绪、语言、模型、格式）的摘要保存到磁盘，
+重新渲染时只合成改动过或缺失的段，其余直接复用；渲染中途失败或服务重启后，
+已完成的段同样不会再次请求TTS。每期节目另有一份清单，记录各段和脚本每一行台词对应的缓存键
+以及本次的复用情况。
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 缓存键格式版本，键的组成变化时递增以使旧条目失效
+SEGMENT_KEY_VERSION = 1
+
+# 参与缓存键计算的合成参数
+SEGMENT_KEY_FIELDS = ('text', 'voice_id', 'speed', 'volume', 'pitch', 'emotion', 'language', 'model', 'format')
+
+_EPISODE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def segment_key(segment: Dict[str, Any], audio_format: str) -> str:
+    """
+    计算一段音频的缓存键
+
+    Args:
+        segment: build_segments 返回的音频段
+        audio_format: 向TTS请求的音频格式，段内未指定时使用
+
+    Returns:
+        str: 十六进制摘要
+    """
+    fields = {name: segment.get(name) for name in SEGMENT_KEY_FIELDS}
+    fields['format'] = fields['format'] or audio_format
+    payload = json.dumps({"version": SEGMENT_KEY_VERSION, "segment": fields}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_valid_episode_id(episode_id: Optional[str]) -> bool:
+    """节目ID用作清单文件名，只允许字母、数字、下划线和连字符"""
+    return bool(episode_id and _EPISODE_ID.match(episode_id))
+
+
+class SegmentStore:
+    """
+    内容寻址的音频段磁盘缓存
+
+    每段音频保存为一个文件，读取时刷新修改时间；
+    总大小超过上限时按修改时间淘汰最久未使用的段，清单不参与淘汰。
+    """
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 音频段的最大总字节数
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._segments_dir = os.path.join(root, 'segments')
+        self._episodes_dir = os.path.join(root, 'episodes')
+        os.makedirs(self._segments_dir, exist_ok=True)
+        os.makedirs(self._episodes_dir, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path in self._iter_segments())
+
+    def _path_for(self, key: str) -> str:
+        # 按前两位分目录，避免单个目录下文件过多
+        return os.path.join(self._segments_dir, key[:2], f"{key}.audio")
+
+    def _iter_segments(self):
+        for root, _, files in os.walk(self._segments_dir):
+            for name in files:
+                if name.endswith('.audio'):
+                    yield os.path.join(root, name)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._path_for(key))
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """按顺序读取多段音频，未缓存的位置为None"""
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, data: bytes) -> None:
+        """保存一段音频，先写临时文件再原子替换，进程中途退出也不会留下不完整的段"""
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """按最近使用时间淘汰音频段，直到总大小降到上限的90%以下"""
+        entries = []
+        for path in self._iter_segments():
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+        entries.sort()
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _manifest_path(self, episode_id: str) -> str:
+        if not is_valid_episode_id(episode_id):
+            raise ValueError(f"无效的节目ID: {episode_id}")
+        return os.path.join(self._episodes_dir, f"{episode_id}.json")
+
+    def load_manifest(self, episode_id: str) -> Optional[Dict[str, Any]]:
+        """读取节目的渲染清单，不存在时返回None"""
+        try:
+            with open(self._manifest_path(episode_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_manifest(self, episode_id: str, segments: List[Dict[str, Any]], keys: List[str],
+                      reused: List[bool], audio_format: str = 'pcm') -> Dict[str, Any]:
+        """
+        保存节目的渲染清单
+
+        除了各段之外，清单按脚本行记录每一句台词：行的键由这一行的文本和语音参数计算，
+        segments 是覆盖这一行的段，reused 表示这些段是否全部直接复用了缓存。
+
+        Args:
+            episode_id: 节目ID
+            segments: 按顺序排列的音频段，lines 字段记录各段覆盖的台词
+            keys: 各段的缓存键
+            reused: 各段是否直接复用了缓存
+            audio_format: 向TTS请求的音频格式，用于计算行的键
+
+        Returns:
+            Dict: 清单内容
+        """
+        previous = self.load_manifest(episode_id) or {}
+        lines: Dict[int, Dict[str, Any]] = {}
+        for index, (segment, was_reused) in enumerate(zip(segments, reused)):
+            covered = segment.get('lines') or [{"index": index, "text": segment['text']}]
+            for line in covered:
+                entry = lines.setdefault(line['index'], {
+                    "index": line['index'], "key": segment_key(dict(segment, text=line['text']), audio_format),
+                    "text": line['text'], "voice_id": segment.get('voice_id'), "segments": [], "reused": True,
+                })
+                entry["segments"].append(index)
+                entry["reused"] = entry["reused"] and was_reused
+        lines_reused = sum(entry["reused"] for entry in lines.values())
+        manifest = {
+            "episode_id": episode_id,
+            "revision": previous.get("revision", 0) + 1,
+            "updated_at": time.time(),
+            "reused": sum(reused),
+            "synthesized": len(keys) - sum(reused),
+            "segments": [
+                {"index": index, "key": key, "text": segment['text'], "voice_id": segment.get('voice_id'),
+                 "reused": was_reused}
+                for index, (segment, key, was_reused) in enumerate(zip(segments, keys, reused))
+            ],
+            "lines_reused": lines_reused,
+            "lines_synthesized": len(lines) - lines_reused,
+            "lines": [lines[index] for index in sorted(lines)],
+        }
+        path = self._manifest_path(episode_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return manifest
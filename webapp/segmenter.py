@@ -0,0 +1,162 @@
+"""
+TTS文本分段
+
+把同一说话人的连续台词合并为尽可能长的段，每段不超过所用语言的长度上限，
+只在句子边界处断开；单句超长时退到分句（逗号、分号等）边界，仍然超长才按空格或字数切开。
+
+合并只在固定的行窗口内进行（同一说话人的连续台词从第一行起每 SEGMENT_MAX_LINES 行一个窗口），
+段的边界总是落在窗口边界上。修改某一行的文字只会改变它所在窗口的段，
+其他段的文本不变，逐段缓存（segment_store）仍可复用。
+"""
+import os
+import re
+from typing import List, Optional, Tuple
+
+# MiniMax 单次请求的文本长度上限（字符）
+MINIMAX_TEXT_LIMIT = 10000
+
+# 各语言每段的最大字符数。中文每个字符对应的朗读时长远长于英文字母，
+# 上限按相近的音频时长设置；未列出的语言使用中文的上限
+SEGMENT_MAX_CHARS = {
+    'zh': int(os.getenv('TTS_SEGMENT_MAX_CHARS_ZH', '1500')),
+    'en': int(os.getenv('TTS_SEGMENT_MAX_CHARS_EN', '4000')),
+}
+
+# 每个合并窗口最多包含的台词行数，越大请求越少，但修改一行时需要重新合成的文本越多
+SEGMENT_MAX_LINES = int(os.getenv('TTS_SEGMENT_MAX_LINES', '8'))
+
+_SENTENCE_END = re.compile(r'(?:[。！？!?…]+|[.;；](?=\s|$))[”’"\'」』）)]*')
+_CLAUSE_END = re.compile(r'[，、：；—]+|[,:;](?=\s)')
+_TERMINAL = tuple('。！？!?…；;.，,：:、”’"\'」』）)')
+
+
+def segment_limit(language: str) -> int:
+    """
+    每段的最大字符数
+
+    Args:
+        language: 语言代码（zh / en）
+
+    Returns:
+        int: 最大字符数，不超过 MiniMax 的单次请求上限
+    """
+    limit = SEGMENT_MAX_CHARS.get(language, SEGMENT_MAX_CHARS['zh'])
+    return max(1, min(limit, MINIMAX_TEXT_LIMIT - 1))
+
+
+def _joiner(language: str) -> str:
+    return ' ' if language == 'en' else ''
+
+
+def _split_after(text: str, pattern: re.Pattern) -> List[str]:
+    """在每个匹配之后断开，保留标点"""
+    parts, start = [], 0
+    for match in pattern.finditer(text):
+        parts.append(text[start:match.end()])
+        start = match.end()
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按句末标点和换行拆分句子，标点保留在句子末尾
+
+    Args:
+        text: 文本
+
+    Returns:
+        List[str]: 句子列表
+    """
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(_split_after(line, _SENTENCE_END))
+    return sentences
+
+
+def _pack(parts: List[str], max_length: int, joiner: str) -> List[str]:
+    """贪心地把相邻的部分合并为不超过 max_length 的段"""
+    chunks, current = [], ''
+    for part in parts:
+        candidate = f"{current}{joiner}{part}" if current else part
+        if len(candidate) <= max_length:
+            current = candidate
+        else:
+            if current:
+                chunks.append(current)
+            current = part
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_long(sentence: str, max_length: int, language: str) -> List[str]:
+    """拆分超长的句子：先按分句，再按空格，最后按字数"""
+    if len(sentence) <= max_length:
+        return [sentence]
+    joiner = _joiner(language)
+    chunks = []
+    for chunk in _pack(_split_after(sentence, _CLAUSE_END), max_length, joiner):
+        if len(chunk) <= max_length:
+            chunks.append(chunk)
+        elif ' ' in chunk:
+            words = chunk.split()
+            chunks.extend(piece for word_chunk in _pack(words, max_length, ' ')
+                          for piece in _hard_split(word_chunk, max_length))
+        else:
+            chunks.extend(_hard_split(chunk, max_length))
+    return chunks
+
+
+def _hard_split(text: str, max_length: int) -> List[str]:
+    return [text[i:i + max_length] for i in range(0, len(text), max_length)]
+
+
+def _terminate(text: str, language: str) -> str:
+    """没有结尾标点的句子（台词或行的末尾）补上句号，合并后相邻台词之间仍有停顿"""
+    if text.endswith(_TERMINAL):
+        return text
+    return text + ('.' if language == 'en' else '。')
+
+
+def pack_text(texts: List[str], language: str = 'zh', max_length: Optional[int] = None) -> List[str]:
+    """
+    把同一说话人的连续台词合并为尽量少的段，只在句子或分句边界断开
+
+    Args:
+        texts: 按顺序排列的台词
+        language: 语言代码，决定长度上限和句子间的连接方式
+        max_length: 每段的最大字符数，默认 segment_limit(language)
+
+    Returns:
+        List[str]: 合成用的文本段
+    """
+    max_length = max_length or segment_limit(language)
+    sentences = []
+    for text in texts:
+        for sentence in split_sentences(text):
+            sentences.extend(_split_long(_terminate(sentence, language), max_length, language))
+    return _pack(sentences, max_length, _joiner(language))
+
+
+def pack_lines(texts: List[str], language: str = 'zh', max_lines: Optional[int] = None,
+               max_length: Optional[int] = None) -> List[Tuple[str, List[int]]]:
+    """
+    按固定的行窗口合并同一说话人的连续台词，段的边界不会跨越窗口
+
+    Args:
+        texts: 按顺序排列的台词
+        language: 语言代码
+        max_lines: 每个窗口的行数，默认 SEGMENT_MAX_LINES
+        max_length: 每段的最大字符数，默认 segment_limit(language)
+
+    Returns:
+        List[Tuple[str, List[int]]]: 合成用的文本段，以及该段所在窗口包含的行在 texts 中的下标
+    """
+    max_lines = max(1, max_lines or SEGMENT_MAX_LINES)
+    packed = []
+    for start in range(0, len(texts), max_lines):
+        window = list(range(start, min(len(texts), start + max_lines)))
+        for chunk in pack_text([texts[index] for index in window], language, max_length):
+            packed.append((chunk, window))
+    return packed
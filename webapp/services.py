@@ -0,0 +1,118 @@
+"""
+Web服务共享的单例
+
+提取器、缓存、脚本生成器、TTS客户端和后台任务队列在首次使用时创建，
+api 和 views 两个路由共用同一份实例，导入本模块不会加载任何重型依赖。
+"""
+import os
+import threading
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.RLock()
+_instances = {}
+
+
+def _get_or_create(name, factory):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def get_extraction_cache():
+    """提取结果缓存：重复上传相同内容的文件时直接返回缓存结果"""
+    def create():
+        from content_extractor.cache import ExtractionCache
+        return ExtractionCache(
+            cache_dir=os.getenv('EXTRACTION_CACHE_DIR', os.path.join(current_dir, 'cache', 'extraction')),
+            max_memory_entries=int(os.getenv('EXTRACTION_CACHE_MEMORY_ENTRIES', '128')),
+            max_disk_bytes=int(os.getenv('EXTRACTION_CACHE_DISK_MB', '512')) * 1024 * 1024
+        )
+    return _get_or_create('extraction_cache', create)
+
+
+def get_extractor():
+    """共享的内容提取器，各文件提取器在首次处理对应格式时才导入"""
+    def create():
+        from content_extractor.extractor import ContentExtractor
+        return ContentExtractor(
+            cache=get_extraction_cache(),
+            http_cache_dir=os.getenv('HTTP_CACHE_DIR', os.path.join(current_dir, 'cache', 'http'))
+        )
+    return _get_or_create('extractor', create)
+
+
+def get_batch_extractor():
+    """批量网页提取：全局并发上限、每个主机的连接数与请求间隔、单个URL超时"""
+    def create():
+        from content_extractor.batch import BatchURLExtractor
+        return BatchURLExtractor(
+            get_extractor().web_extractor,
+            max_concurrency=int(os.getenv('BATCH_MAX_CONCURRENCY', '10')),
+            per_host_limit=int(os.getenv('BATCH_PER_HOST_LIMIT', '2')),
+            per_host_delay=float(os.getenv('BATCH_PER_HOST_DELAY', '0.5')),
+            timeout=float(os.getenv('BATCH_URL_TIMEOUT', '20'))
+        )
+    return _get_or_create('batch_extractor', create)
+
+
+def get_podcast_generator():
+    """播客脚本生成器"""
+    def create():
+        from ai_parser.podcast_generator import PodcastGenerator
+        return PodcastGenerator()
+    return _get_or_create('podcast_generator', create)
+
+
+def get_tts_client():
+    """MiniMax TTS客户端，单例由 minimax_tts 模块维护"""
+    from webapp.minimax_tts import get_tts_client as _get_tts_client
+    return _get_tts_client()
+
+
+def get_segment_store():
+    """逐句音频缓存：重新渲染时只合成改动过的台词，中断的渲染从中断处继续"""
+    def create():
+        from webapp.segment_store import SegmentStore
+        return SegmentStore(
+            os.getenv('SEGMENT_STORE_DIR') or os.path.join(current_dir, 'data', 'segments'),
+            max_bytes=int(os.getenv('SEGMENT_STORE_MB', '1024')) * 1024 * 1024
+        )
+    return _get_or_create('segment_store', create)
+
+
+def get_job_store():
+    """后台任务的SQLite存储"""
+    def create():
+        from webapp.jobs import JobStore
+        return JobStore(os.getenv('JOB_DB_PATH', os.path.join(get_job_data_dir(), 'jobs.sqlite3')))
+    return _get_or_create('job_store', create)
+
+
+def get_job_data_dir():
+    """后台任务的上传文件和生成音频的保存目录"""
+    return os.getenv('JOB_DATA_DIR', os.path.join(current_dir, 'data', 'jobs'))
+
+
+def get_job_queue():
+    """后台任务队列，首次使用时启动工作线程"""
+    def create():
+        from webapp.jobs import JobQueue, default_handlers
+        return JobQueue(
+            get_job_store(),
+            default_handlers(get_job_data_dir(), get_segment_store()),
+            workers=int(os.getenv('JOB_WORKERS', '2'))
+        ).start()
+    return _get_or_create('job_queue', create)
+
+
+def stop_job_queue(timeout=5):
+    """停止已启动的后台任务队列，未启动时不做任何事"""
+    queue = _instances.get('job_queue')
+    if queue is not None:
+        queue.stop(timeout=timeout)
@@ -235,6 +235,57 @@ document.addEventListener('DOMContentLoaded', async function() {
     }
 
     // 生成播客脚本后渲染到script-editor
+    // 流式生成脚本：逐段显示已生成的内容，返回 done 事件中的完整结果
+    async function streamGenerateScript(genPayload) {
+        const resp = await fetch('/api/generate_podcast_script_stream', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(genPayload)
+        });
+        if (!resp.ok || !resp.body) {
+            const data = await resp.json().catch(() => ({}));
+            throw new Error(data.error || resp.statusText);
+        }
+        const progress = loading.querySelector('p');
+        const originalText = progress ? progress.textContent : '';
+        const reader = resp.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let received = '';
+        let result = {};
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let event = 'message';
+                    let data = '';
+                    block.split('\n').forEach(line => {
+                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data += line.slice(5).trim();
+                    });
+                    if (!data) continue;
+                    const payload = JSON.parse(data);
+                    if (event === 'delta') {
+                        received += payload.text;
+                        if (progress) progress.textContent = received.slice(-120);
+                    } else if (event === 'done') {
+                        result = payload;
+                    } else if (event === 'error') {
+                        throw new Error(payload.error);
+                    }
+                }
+            }
+        } finally {
+            if (progress) progress.textContent = originalText;
+        }
+        return result;
+    }
+
     async function handleGenerateScript(genData, mode, singleRoleName) {
         let arr = genData.podcast_script;
         let tryCount = 0;
@@ -351,12 +402,7 @@ document.addEventListener('DOMContentLoaded', async function() {
                 genPayload.role1_style = 'mild';
             }
             console.log('生成脚本请求payload:', genPayload);
-            const genResp = await fetch('/api/generate_podcast_script', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(genPayload)
-            });
-            const genData = await genResp.json();
+            const genData = await streamGenerateScript(genPayload);
             if (genData.podcast_script) {
                 handleGenerateScript(genData, podcastMode, (document.getElementById('role1-name')?.value || '').trim());
             } else {
@@ -397,6 +443,8 @@ document.addEventListener('DOMContentLoaded', async function() {
     });
 
     // 语音合成按钮
+    // 同一份脚本重复合成时沿用节目ID，后端只合成改动过的台词
+    let audioEpisodeId = null;
     synthesizeBtn.addEventListener('click', async () => {
         let textForTTS = JSON.stringify(getScriptJsonFromDOM());
         if (!textForTTS || textForTTS === '[]') {
@@ -479,6 +527,9 @@ document.addEventListener('DOMContentLoaded', async function() {
             formData.append('text', textForTTS);
             formData.append('language', language);
         }
+        if (audioEpisodeId) {
+            formData.append('episode_id', audioEpisodeId);
+        }
         // 显示进度条等原有逻辑
         synthesisProgress.style.display = 'block';
         audioPlayer.style.display = 'none';
@@ -486,21 +537,27 @@ document.addEventListener('DOMContentLoaded', async function() {
         progressFill.style.width = '0%';
         progressText.textContent = '正在合成...';
         try {
-            const response = await fetch('/api/generate_audio', {
+            // 提交后台合成任务，轮询进度，避免长时间占用连接
+            const response = await fetch('/api/jobs/audio', {
                 method: 'POST',
                 body: formData
             });
-            if (!response.ok) {
-                const errorData = await response.json();
-                throw new Error(errorData.error || '语音合成接口请求失败');
+            const submitData = await response.json();
+            if (!response.ok || !submitData.job_id) {
+                throw new Error(submitData.error || '语音合成接口请求失败');
             }
-            const audioBlob = await response.blob();
-            console.log("音频数据大小（字节）：", audioBlob.size);
-            const audioUrl = URL.createObjectURL(audioBlob);
-            audioElement.src = audioUrl;
+            audioEpisodeId = submitData.episode_id || audioEpisodeId;
+            const task = await waitForJob(submitData.job_id, (job) => {
+                progressFill.style.width = `${job.progress || 0}%`;
+                progressText.textContent = job.total
+                    ? `正在合成... ${job.done}/${job.total}`
+                    : (job.status === 'queued' ? '排队中...' : '正在合成...');
+            });
+            audioElement.src = task.audio_url;
             audioPlayer.style.display = 'block';
             progressFill.style.width = '100%';
             progressText.textContent = '合成完成！';
+            loadTaskHistory();
 
             // 新增：后端收到text参数后打印前200字符
             const text = textForTTS.trim();
@@ -535,6 +592,22 @@ document.addEventListener('DOMContentLoaded', async function() {
         });
     }
 
+    // 轮询后台任务直到完成或失败
+    async function waitForJob(jobId, onProgress, interval = 1000) {
+        while (true) {
+            const resp = await fetch(`/api/jobs/${jobId}`);
+            const data = await resp.json();
+            if (!resp.ok || !data.task) {
+                throw new Error(data.error || '查询任务状态失败');
+            }
+            const job = data.task;
+            if (job.status === 'completed') return job;
+            if (job.status === 'failed') throw new Error(job.error || '任务失败');
+            if (onProgress) onProgress(job);
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    }
+
     // 加载历史任务列表
     async function loadTaskHistory() {
         try {
@@ -551,24 +624,27 @@ document.addEventListener('DOMContentLoaded', async function() {
                     
                     const statusClass = task.status === 'completed' ? 'completed' : 
                                       task.status === 'failed' ? 'failed' : 'processing';
+                    const statusText = task.status === 'processing' && task.total
+                        ? `${getStatusText(task.status)} ${Math.round(task.progress)}%`
+                        : getStatusText(task.status);
                     
-                    taskElement.innerHTML = `
-                        <div class="task-header">
-                            <span class="task-status ${statusClass}">${getStatusText(task.status)}</span>
-                            <span class="task-time">${formatTime(task.created_at)}</span>
-                        </div>
-                        <div class="task-text">${task.text_preview}</div>
-                        <div class="task-meta">
-                            <span>音色: ${getVoiceName(task.voice_id)}</span>
-                            ${task.duration ? `<span>时长: ${task.duration}秒</span>` : ''}
-                        </div>
-                        ${task.audio_url ? `
-                            <div class="task-actions">
-                                <button class="btn btn-primary" onclick="playAudio('${task.audio_url}')">播放</button>
-                                <button class="btn btn-secondary" onclick="downloadAudio('${task.audio_url}')">下载</button>
-                            </div>
-                        ` : ''}
-                    `;
+                    // 任务字段来自用户提交的内容，只通过 textContent 写入，不拼接HTML
+                    const header = appendElement(taskElement, 'div', 'task-header');
+                    appendElement(header, 'span', `task-status ${statusClass}`, statusText);
+                    appendElement(header, 'span', 'task-time', formatTime(task.created_at));
+                    appendElement(taskElement, 'div', 'task-text', task.text_preview || '');
+                    const meta = appendElement(taskElement, 'div', 'task-meta');
+                    appendElement(meta, 'span', '', `音色: ${getVoiceName(task.voice_id)}`);
+                    if (task.duration) {
+                        appendElement(meta, 'span', '', `时长: ${task.duration}秒`);
+                    }
+                    if (task.audio_url) {
+                        const actions = appendElement(taskElement, 'div', 'task-actions');
+                        const playButton = appendElement(actions, 'button', 'btn btn-primary', '播放');
+                        playButton.addEventListener('click', () => playAudio(task.audio_url));
+                        const downloadButton = appendElement(actions, 'button', 'btn btn-secondary', '下载');
+                        downloadButton.addEventListener('click', () => downloadAudio(task.audio_url));
+                    }
                     
                     taskList.appendChild(taskElement);
                 });
@@ -580,9 +656,19 @@ document.addEventListener('DOMContentLoaded', async function() {
         }
     }
 
+    // 创建子元素并追加到父元素，文本通过 textContent 写入
+    function appendElement(parent, tag, className, text) {
+        const element = document.createElement(tag);
+        if (className) element.className = className;
+        if (text !== undefined) element.textContent = text;
+        parent.appendChild(element);
+        return element;
+    }
+
     // 获取状态文本
     function getStatusText(status) {
         const statusMap = {
+            'queued': '排队中',
             'processing': '处理中',
             'completed': '已完成',
             'failed': '失败'
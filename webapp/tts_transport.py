@@ -0,0 +1,374 @@
+"""
+MiniMax TTS 的HTTP传输层
+
+同步请求共用一个带连接池的 requests.Session，异步请求共用 httpx 客户端；
+发出请求前按账户的每分钟请求数和每分钟字符数配额排队（令牌桶），
+遇到429、5xx、网络错误或MiniMax的限流错误码时按带抖动的指数退避重试。
+流式请求只在收到响应头之前重试，开始读取内容后的错误直接抛出。
+限流等待时间、重试次数等指标可通过 stats() 查看。
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 需要重试的HTTP状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 需要重试的MiniMax错误码：1000 未知错误、1001 超时、1002 触发限流、1024 内部错误、1039 触发TPM限流
+RETRY_API_CODES = {1000, 1001, 1002, 1024, 1039}
+
+
+class RetryableError(Exception):
+    """可以重试的请求失败"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    reserve 预先扣除令牌并返回需要等待的秒数，令牌不足时允许欠账，
+    后来的请求按顺序排在欠账之后，调用方自行选择同步或异步等待。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，即允许的突发量
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        预留令牌
+
+        Args:
+            tokens: 需要的令牌数，可以大于桶容量
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """按每分钟请求数和每分钟字符数限流，并记录等待时间"""
+
+    def __init__(self, requests_per_minute: float = 0, chars_per_minute: float = 0, burst: float = 1):
+        """
+        Args:
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            chars_per_minute: 每分钟合成字符数上限，0表示不限制
+            burst: 允许连续发出的请求数
+        """
+        self.request_bucket = TokenBucket(requests_per_minute / 60, burst) if requests_per_minute > 0 else None
+        self.char_bucket = TokenBucket(chars_per_minute / 60, chars_per_minute) if chars_per_minute > 0 else None
+        self._lock = threading.Lock()
+        self._counters = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def reserve(self, chars: int = 0) -> float:
+        """预留一次请求的配额，返回需要等待的秒数"""
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.char_bucket is not None and chars:
+            wait = max(wait, self.char_bucket.reserve(chars))
+        with self._lock:
+            self._counters["acquired"] += 1
+            if wait > 0:
+                self._counters["waited"] += 1
+                self._counters["wait_seconds"] += wait
+                self._counters["max_wait_seconds"] = max(self._counters["max_wait_seconds"], wait)
+        return wait
+
+    def acquire(self, chars: int = 0) -> float:
+        """同步等待配额，返回等待的秒数"""
+        wait = self.reserve(chars)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, chars: int = 0) -> float:
+        """异步等待配额，等待期间不阻塞事件循环"""
+        wait = self.reserve(chars)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["avg_wait_seconds"] = stats["wait_seconds"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+
+class TTSTransport:
+    """带连接池、限流和重试的TTS请求发送器，同步和异步请求共用同一个限流器"""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, max_retries: int = 4, backoff_base: float = 0.5,
+                 backoff_max: float = 20.0, pool_size: int = 10, timeout: float = 60.0):
+        """
+        Args:
+            limiter: 限流器，None表示不限流
+            max_retries: 可重试错误的最大重试次数
+            backoff_base: 首次重试的退避上限（秒），之后逐次翻倍
+            backoff_max: 单次退避的最大秒数
+            pool_size: 连接池大小，应不小于同时进行的TTS请求数
+            timeout: 单次请求超时（秒）
+        """
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls) -> 'TTSTransport':
+        """
+        根据 MiniMax 套餐的配额创建，见 env.example 中的 MINIMAX_* 配置
+
+        限流需要显式开启：MINIMAX_RPM 和 MINIMAX_CHARS_PER_MINUTE 默认都为0（不限制），
+        未配置时只有重试，与之前的部署行为一致
+        """
+        limiter = RateLimiter(
+            requests_per_minute=float(os.getenv('MINIMAX_RPM', '0')),
+            chars_per_minute=float(os.getenv('MINIMAX_CHARS_PER_MINUTE', '0')),
+            burst=float(os.getenv('MINIMAX_BURST', '5'))
+        )
+        return cls(
+            limiter,
+            max_retries=int(os.getenv('MINIMAX_MAX_RETRIES', '4')),
+            backoff_base=float(os.getenv('MINIMAX_BACKOFF_BASE', '0.5')),
+            pool_size=int(os.getenv('MINIMAX_POOL_SIZE', '10'))
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第 attempt 次重试前的等待秒数：全抖动指数退避，服务端给出 Retry-After 时不少于该值"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def _check_status(status_code: int, headers) -> None:
+        """可重试的HTTP状态码抛出 RetryableError，带上服务端要求的等待时间"""
+        if status_code in RETRY_STATUS:
+            retry_after = headers.get('Retry-After')
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise RetryableError(f"HTTP {status_code}", retry_after)
+
+    @classmethod
+    def _check(cls, status_code: int, headers, body: Any) -> Any:
+        """检查响应，可重试的失败抛出 RetryableError，否则返回解析后的JSON"""
+        cls._check_status(status_code, headers)
+        result = body()
+        base_resp = result.get('base_resp') if isinstance(result, dict) else None
+        if base_resp and base_resp.get('status_code') in RETRY_API_CODES:
+            raise RetryableError(f"MiniMax错误 {base_resp.get('status_code')}: {base_resp.get('status_msg')}")
+        return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], chars: int = 0,
+             limited: bool = True) -> Any:
+        """
+        同步发送请求并返回JSON结果
+
+        Args:
+            url: 请求地址
+            headers: 请求头
+            payload: JSON请求体
+            chars: 本次合成的字符数，计入每分钟字符配额
+            limited: 是否计入限流配额，查询音色等接口不计入
+
+        Returns:
+            响应的JSON
+
+        Raises:
+            Exception: 不可重试的错误，或重试次数用尽
+        """
+        for attempt in range(self.max_retries + 1):
+            if limited:
+                self.limiter.acquire(chars)
+            self._count("requests")
+            try:
+                resp = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+                return self._check(resp.status_code, resp.headers, resp.json)
+            except (RetryableError, requests.ConnectionError, requests.Timeout) as e:
+                time.sleep(self._retry_or_raise(attempt, e))
+
+    async def post_async(self, client, url: str, headers: Dict[str, str], payload: Dict[str, Any], chars: int = 0,
+                         limited: bool = True) -> Any:
+        """异步发送请求，client 为 httpx.AsyncClient，其余参数和行为同 post"""
+        import httpx
+        for attempt in range(self.max_retries + 1):
+            if limited:
+                await self.limiter.acquire_async(chars)
+            self._count("requests")
+            try:
+                resp = await client.post(url, headers=headers, json=payload, timeout=self.timeout)
+                return self._check(resp.status_code, resp.headers, resp.json)
+            except (RetryableError, httpx.TransportError) as e:
+                await asyncio.sleep(self._retry_or_raise(attempt, e))
+
+    def _retry_or_raise(self, attempt: int, error: Exception) -> float:
+        """记录一次失败，返回重试前的等待秒数，重试次数用尽时抛出异常"""
+        if attempt == self.max_retries:
+            self._count("failures")
+            raise Exception(f"TTS请求重试{self.max_retries}次后仍失败: {error}")
+        delay = self.backoff(attempt, getattr(error, 'retry_after', None))
+        print(f"WARNING: TTS请求失败，{delay:.1f}秒后重试: {error}")
+        self._count("retries")
+        return delay
+
+    @staticmethod
+    def _is_event_stream(headers) -> bool:
+        return 'text/event-stream' in (headers.get('content-type') or '')
+
+    @staticmethod
+    def _check_stream_line(line: Optional[str]) -> None:
+        """检查流式响应的第一行，可重试的MiniMax错误码抛出 RetryableError"""
+        if not line or not line.startswith('data:'):
+            return
+        try:
+            event = json.loads(line[5:])
+        except ValueError:
+            return
+        base_resp = event.get('base_resp') if isinstance(event, dict) else None
+        if base_resp and base_resp.get('status_code') in RETRY_API_CODES:
+            raise RetryableError(f"MiniMax错误 {base_resp.get('status_code')}: {base_resp.get('status_msg')}")
+
+    def _stream_error(self, status_code: int, body: Any) -> Exception:
+        self._count("failures")
+        return Exception(f"TTS请求失败: HTTP {status_code}: {str(body)[:200]}")
+
+    def stream_lines(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                     chars: int = 0) -> Iterator[str]:
+        """
+        同步发送流式请求，逐行返回响应内容（SSE）
+
+        在返回第一行之前检查响应：429/5xx、网络错误和第一条事件中的限流错误码会重试；
+        其他非2xx状态直接报错；返回普通JSON（通常是错误信息）时按非流式响应检查，
+        并转换为一行 data: 事件交给调用方解析。
+
+        Args:
+            url: 请求地址
+            headers: 请求头
+            payload: JSON请求体
+            chars: 本次合成的字符数，计入每分钟字符配额
+
+        Yields:
+            str: 响应的每一行
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(chars)
+            self._count("requests")
+            resp = None
+            try:
+                resp = self.session.post(url, headers=headers, json=payload, timeout=self.timeout, stream=True)
+                self._check_status(resp.status_code, resp.headers)
+                if not 200 <= resp.status_code < 300:
+                    raise self._stream_error(resp.status_code, resp.text)
+                lines = (line.decode('utf-8') for line in resp.iter_lines() if line)
+                if self._is_event_stream(resp.headers):
+                    first = next(lines, None)
+                    self._check_stream_line(first)
+                else:
+                    first = 'data: ' + json.dumps(self._check(resp.status_code, resp.headers, resp.json))
+                    lines = iter(())
+                break
+            except Exception as e:
+                if resp is not None:
+                    resp.close()
+                if not isinstance(e, (RetryableError, requests.ConnectionError, requests.Timeout)):
+                    raise
+                time.sleep(self._retry_or_raise(attempt, e))
+        with resp:
+            if first:
+                yield first
+            yield from lines
+
+    async def stream_lines_async(self, client, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                                 chars: int = 0) -> AsyncIterator[str]:
+        """异步发送流式请求，client 为 httpx.AsyncClient，其余参数和行为同 stream_lines"""
+        import httpx
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async(chars)
+            self._count("requests")
+            resp = None
+            try:
+                request = client.build_request('POST', url, headers=headers, json=payload, timeout=self.timeout)
+                resp = await client.send(request, stream=True)
+                self._check_status(resp.status_code, resp.headers)
+                if not 200 <= resp.status_code < 300:
+                    raise self._stream_error(resp.status_code, (await resp.aread()).decode('utf-8', 'replace'))
+                lines = (line async for line in resp.aiter_lines() if line)
+                if self._is_event_stream(resp.headers):
+                    try:
+                        first = await lines.__anext__()
+                    except StopAsyncIteration:
+                        first = None
+                    self._check_stream_line(first)
+                else:
+                    await resp.aread()
+                    first = 'data: ' + json.dumps(self._check(resp.status_code, resp.headers, resp.json))
+                    lines = None
+                break
+            except Exception as e:
+                if resp is not None:
+                    await resp.aclose()
+                if not isinstance(e, (RetryableError, httpx.TransportError)):
+                    raise
+                await asyncio.sleep(self._retry_or_raise(attempt, e))
+        try:
+            if first:
+                yield first
+            if lines is not None:
+                async for line in lines:
+                    yield line
+        finally:
+            await resp.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取传输层统计信息
+
+        Returns:
+            Dict: 请求/重试/失败计数及限流等待时间
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats["limiter"] = self.limiter.stats()
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,6 +1,63 @@
 # 工具函数，可根据需要扩展
+import json
+import os
+import re
+import shutil
+import tempfile
+from content_extractor.upload import UploadSpool, UPLOAD_CHUNK_SIZE
+
+# 上传文件不超过该大小时只保存在内存中，超过后转存到独立的临时目录
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY_MB', '8')) * 1024 * 1024
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR') or None
 
 def allowed_file(filename: str, allowed_exts=None) -> bool:
     if allowed_exts is None:
         allowed_exts = {'.pdf', '.docx', '.txt'}
-    return any(filename.lower().endswith(ext) for ext in allowed_exts) 
\ No newline at end of file
+    return any(filename.lower().endswith(ext) for ext in allowed_exts)
+
+async def spool_upload(upload) -> UploadSpool:
+    """
+    分块读取上传文件写入暂存区，读取的同时计算内容摘要
+    调用方负责关闭返回的暂存区（可用 with 语句）
+    """
+    spool = UploadSpool(upload.filename, max_memory=UPLOAD_SPOOL_MAX_MEMORY, temp_dir=UPLOAD_SPOOL_DIR)
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    return spool
+
+def strip_code_fences(text: str) -> str:
+    """去除LLM输出首尾的 markdown 代码块标记"""
+    if not isinstance(text, str):
+        return text
+    text = re.sub(r"^```[a-zA-Z]*\s*", "", text.strip())
+    text = re.sub(r"```$", "", text.strip())
+    return text.strip()
+
+def sse_event(event: str, data: dict) -> str:
+    """按 text/event-stream 格式编码一条事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def save_job_upload(spool: UploadSpool, data_dir: str) -> str:
+    """
+    将暂存区中的上传内容保存到任务目录下的独立子目录，供后台提取任务读取
+
+    Returns:
+        str: 保存后的文件路径
+    """
+    uploads_dir = os.path.join(data_dir, 'uploads')
+    os.makedirs(uploads_dir, exist_ok=True)
+    path = os.path.join(tempfile.mkdtemp(prefix="upload-", dir=uploads_dir), spool.filename)
+    source = spool.source
+    if isinstance(source, str):
+        shutil.copyfile(source, path)
+    else:
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(source, f)
+    return path
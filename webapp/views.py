@@ -1,18 +1,13 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
-from content_extractor import ContentExtractor
-from ai_parser.podcast_generator import PodcastGenerator
-import shutil
-import os
 
 # 从 config.py 导入 templates 实例
 from .config import templates
+from .concurrency import run_in_pool
+from .services import get_extractor, get_podcast_generator
+from .utils import spool_upload
 
 router = APIRouter()
-extractor = ContentExtractor()
-podcast_generator = PodcastGenerator()
-UPLOAD_DIR = '/tmp/content_uploads'
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.get('/', response_class=HTMLResponse)
 def index(request: Request):
@@ -34,29 +29,22 @@ async def extract(request: Request,
                  ):
     print("DEBUG: /extract endpoint hit.")
     extracted_content = None
-    file_path = None
 
     if file and file.filename:
         filename = file.filename
-        file_path = os.path.join(UPLOAD_DIR, filename)
         print(f"DEBUG: Processing file upload: {filename}")
         try:
-            with open(file_path, 'wb') as f:
-                shutil.copyfileobj(file.file, f)
-            print(f"DEBUG: File saved to {file_path}. Starting extraction...")
-            extracted_content = extractor.process_file(file_path)
+            with await spool_upload(file) as spool:
+                print(f"DEBUG: Upload received ({spool.size} bytes, {'memory' if spool.in_memory else spool.path}). Starting extraction...")
+                extracted_content = await run_in_pool('extract', get_extractor().process_upload, spool)
             print("DEBUG: File extraction complete.")
         except Exception as e:
             print(f"ERROR: File processing failed: {e}")
             raise HTTPException(status_code=400, detail=f"文件处理失败: {e}")
-        finally:
-            if file_path and os.path.exists(file_path) and os.path.isfile(file_path):
-                os.remove(file_path)
-                print(f"DEBUG: Temporary file {file_path} removed.")
     elif url:
         print(f"DEBUG: Processing URL: {url}")
         try:
-            extracted_content = extractor.process_url(url)
+            extracted_content = await run_in_pool('extract', get_extractor().process_url, url)
             print("DEBUG: URL extraction complete.")
         except Exception as e:
             print(f"ERROR: URL processing failed: {e}")
@@ -71,7 +59,9 @@ async def extract(request: Request,
 
     print("DEBUG: Content extracted successfully. Starting podcast script generation...")
     try:
-        podcast_script = podcast_generator.generate_podcast_script(
+        podcast_script = await run_in_pool(
+            'llm',
+            get_podcast_generator().generate_podcast_script,
             extracted_content,
             podcast_title=podcast_title,
             next_episode_preview=next_episode_preview,